@@ -0,0 +1,78 @@
+"""
+Measures validation of the largest allowed imports (10 000 couriers or orders)
+by CouriersPostRequestSchema and OrdersPostRequestSchema, and the duplicate ids
+check alone with UniqueIdsValidator and with the previous list.count scan.
+
+    python -m benchmarks.import_validation --items 10000
+"""
+import argparse
+from time import perf_counter
+
+from marshmallow import ValidationError
+
+from store.api.domain import UniqueIdsValidator
+from store.api.schema import CouriersPostRequestSchema, OrdersPostRequestSchema
+from store.utils.testing.couriers_testing import generate_couriers
+from store.utils.testing.orders_testing import generate_orders
+
+
+parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+parser.add_argument('--items', type=int, default=10000, help='Items per payload')
+parser.add_argument('--repeat', type=int, default=3, help='Runs per check, the best one is reported')
+
+
+def find_duplicates_quadratic(ids):
+    ids_set, ids_list = set(ids), list(ids)
+    return [item for item in ids_set if ids_list.count(item) > 1]
+
+
+def find_duplicates_linear(ids):
+    try:
+        UniqueIdsValidator.validate_unique_ids(ids)
+    except ValidationError as err:
+        return err.messages
+    return []
+
+
+def load(schema, payload):
+    try:
+        schema.load(payload)
+    except ValidationError:
+        pass
+
+
+def measure(func, *args, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = perf_counter()
+        func(*args)
+        best = min(best, perf_counter() - started)
+    return best
+
+
+def main():
+    args = parser.parse_args()
+    half = args.items // 2
+
+    payloads = {
+        'couriers': (CouriersPostRequestSchema(), 'courier_id', generate_couriers(
+            couriers_num=args.items, regions=[1, 2, 3], working_hours=['09:00-13:00', '14:00-18:00']
+        )),
+        'orders': (OrdersPostRequestSchema(), 'order_id', generate_orders(orders_num=args.items)),
+    }
+
+    print('{:>10} {:>12} {:>14} {:>14} {:>14}'.format('payload', 'ids', 'schema, s', 'list.count, s', 'linear, s'))
+    for name, (schema, id_field, items) in payloads.items():
+        for title, ids in (('unique', [item[id_field] for item in items]),
+                           ('duplicated', [i % half for i in range(args.items)])):
+            payload_items = [{**item, id_field: id_} for item, id_ in zip(items, ids)]
+            print('{:>10} {:>12} {:>14.4f} {:>14.4f} {:>14.4f}'.format(
+                name, title,
+                measure(load, schema, {'data': payload_items}, repeat=args.repeat),
+                measure(find_duplicates_quadratic, ids, repeat=args.repeat),
+                measure(find_duplicates_linear, ids, repeat=args.repeat),
+            ))
+
+
+if __name__ == '__main__':
+    main()
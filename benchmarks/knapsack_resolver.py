@@ -0,0 +1,56 @@
+"""
+Compares CouriersOrdersResolver (pure python table) with
+CouriersOrdersVectorizedResolver (numpy rolling row) on random candidate sets.
+
+    python -m benchmarks.knapsack_resolver --orders 100 500 2000 --capacity 10 15 50
+"""
+import argparse
+import asyncio
+from random import randint, seed
+from time import perf_counter
+
+from store.api.domain import CouriersOrdersResolver, CouriersOrdersVectorizedResolver
+
+
+parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+parser.add_argument('--orders', type=int, nargs='+', default=[100, 500, 2000],
+                    help='Numbers of candidate orders')
+parser.add_argument('--capacity', type=int, nargs='+', default=[10, 15, 50],
+                    help='Courier carrying capacities, kg')
+parser.add_argument('--repeat', type=int, default=3,
+                    help='Runs per engine, the best one is reported')
+parser.add_argument('--skip-python', action='store_true',
+                    help='Do not run the pure python engine (it is slow on big inputs)')
+
+
+async def measure(resolver, orders, capacity, repeat):
+    best, ids = float('inf'), None
+    for _ in range(repeat):
+        started = perf_counter()
+        ids = await resolver(orders_=orders, max_weight=capacity).resolve_orders()
+        best = min(best, perf_counter() - started)
+    return best, ids
+
+
+async def main():
+    args = parser.parse_args()
+    seed(0)
+
+    print('{:>8} {:>9} {:>12} {:>12} {:>9}'.format('orders', 'capacity', 'python, s', 'numpy, s', 'speedup'))
+    for n in args.orders:
+        orders = {order_id: randint(1, 5000) / 100 for order_id in range(n)}
+        for capacity in args.capacity:
+            numpy_time, numpy_ids = await measure(CouriersOrdersVectorizedResolver, orders, capacity, args.repeat)
+            if args.skip_python:
+                print('{:>8} {:>9} {:>12} {:>12.4f} {:>9}'.format(n, capacity, '-', numpy_time, '-'))
+                continue
+
+            python_time, python_ids = await measure(CouriersOrdersResolver, orders, capacity, args.repeat)
+            assert python_ids == numpy_ids, 'engines returned different orders'
+            print('{:>8} {:>9} {:>12.4f} {:>12.4f} {:>8.1f}x'.format(
+                n, capacity, python_time, numpy_time, python_time / numpy_time
+            ))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
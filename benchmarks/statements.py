@@ -0,0 +1,108 @@
+"""
+Compares CPU time handlers spend preparing SQL for a request: building and
+compiling SQLAlchemy queries with asyncpgsa (as handlers did before the
+statements registry) and taking precompiled SQL from STATEMENTS, for which
+only the arguments are converted.
+
+Queries of every request kind are the ones its handler executes. No database
+is needed, the time is measured with time.process_time:
+
+    python -m benchmarks.statements --runs 10000
+"""
+import argparse
+from datetime import datetime
+from time import process_time
+
+from asyncpg import Range
+from asyncpgsa.connection import compile_query
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import INT4RANGE
+
+from store.api.handlers.query import (
+    COURIERS_QUERY, ORDERS_QUERY, AVAILABLE_ORDERS_QUERY, COURIERS_STATS_QUERY, COURIERS_ORDERS_LAST_COMPLETION_TIME,
+    STATEMENTS
+)
+from store.db.schema import couriers_table, orders_table, delivery_hours_table
+from store.utils.pg import any_of, equals_any
+
+
+parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+parser.add_argument('--runs', type=int, default=10000, help='Requests of every kind')
+
+NOW = datetime(2021, 1, 1)
+WORKING_HOURS = [Range(600, 720), Range(900, 1080)]
+REGIONS = [1, 2, 3]
+ORDERS_IDS = list(range(1, 11))
+
+# Запросы SQLAlchemy, которые обработчик строит на каждый запрос
+SQLALCHEMY = {
+    'GET /couriers/{id}': lambda: [
+        COURIERS_QUERY.where(couriers_table.c.courier_id == 1),
+        COURIERS_STATS_QUERY.where(couriers_table.c.courier_id == 1),
+    ],
+    'POST /orders/assign': lambda: [
+        COURIERS_QUERY.where(couriers_table.c.courier_id == 1),
+        ORDERS_QUERY.where(orders_table.c.courier_id == 1),
+        AVAILABLE_ORDERS_QUERY.where(and_(
+            equals_any(orders_table.c.region, REGIONS),
+            delivery_hours_table.c.time_range.op('&&')(any_of(WORKING_HOURS, INT4RANGE)),
+            orders_table.c.courier_id == None,
+            orders_table.c.weight <= 50
+        )),
+        orders_table.update().values({'courier_id': 1, 'assignment_time': NOW}).where(
+            equals_any(orders_table.c.order_id, ORDERS_IDS)
+        ),
+    ],
+    'POST /orders/complete': lambda: [
+        orders_table.select().where(and_(orders_table.c.courier_id == 1, orders_table.c.order_id == 1)),
+        COURIERS_ORDERS_LAST_COMPLETION_TIME.where(and_(
+            orders_table.c.completion_time != None, orders_table.c.assignment_time == NOW,
+            orders_table.c.courier_id == 1
+        )),
+        orders_table.update().values({'delivery_start_time': NOW}).where(orders_table.c.order_id == 1),
+        orders_table.update().values({'completion_time': NOW}).where(orders_table.c.order_id == 1),
+    ],
+}
+
+# Те же запросы из реестра
+STATEMENTS_CALLS = {
+    'GET /couriers/{id}': [
+        ('courier', {'courier_id': 1}),
+        ('courier_stats', {'courier_id': 1}),
+    ],
+    'POST /orders/assign': [
+        ('courier', {'courier_id': 1}),
+        ('courier_orders', {'courier_id': 1}),
+        ('available_orders', {'regions': REGIONS, 'working_hours': WORKING_HOURS, 'max_weight': 50}),
+        ('assign_orders', {'orders_ids': ORDERS_IDS, 'assigned_courier_id': 1, 'assignment_time': NOW}),
+    ],
+    'POST /orders/complete': [
+        ('courier_order', {'courier_id': 1, 'order_id': 1}),
+        ('last_completion_time', {'courier_id': 1, 'assignment_time': NOW}),
+        ('set_delivery_start_time', {'order_id': 1, 'delivery_start_time': NOW}),
+        ('set_completion_time', {'order_id': 1, 'completion_time': NOW}),
+    ],
+}
+
+
+def measure(prepare, runs):
+    started = process_time()
+    for _ in range(runs):
+        prepare()
+    return (process_time() - started) / runs * 1_000_000
+
+
+def main():
+    args = parser.parse_args()
+
+    print('{:>24} {:>16} {:>16} {:>10}'.format('request', 'sqlalchemy, us', 'statements, us', 'speedup'))
+    for request, make_queries in SQLALCHEMY.items():
+        calls = STATEMENTS_CALLS[request]
+        compiled = measure(lambda: [compile_query(query) for query in make_queries()], args.runs)
+        precompiled = measure(lambda: [(STATEMENTS[name].sql, STATEMENTS[name].args(values))
+                                       for name, values in calls], args.runs)
+        print('{:>24} {:>16.1f} {:>16.1f} {:>9.1f}x'.format(request, compiled, precompiled, compiled / precompiled))
+
+
+if __name__ == '__main__':
+    main()
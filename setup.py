@@ -47,7 +47,11 @@ setup(
     python_requires='>=3.8',
     packages=find_packages(exclude=['tests']),
     install_requires=load_requirements('requirements.txt'),
-    extras_require={'dev': load_requirements('requirements.dev.txt')},
+    extras_require={
+        'dev': load_requirements('requirements.dev.txt'),
+        # Необязательный event loop, включается параметром --event-loop=uvloop
+        'uvloop': ['uvloop~=0.15.2'],
+    },
     entry_points={
         'console_scripts': [
             # f-strings в setup.py не используются из-за соображений
@@ -57,7 +61,8 @@ setup(
             # ранних версий Python. Не стоит лишать пользователей этой
             # возможности.
             '{0}-api = {0}.api.__main__:main'.format(module_name),
-            '{0}-db = {0}.db.__main__:main'.format(module_name)
+            '{0}-db = {0}.db.__main__:main'.format(module_name),
+            '{0}-stats = {0}.db.stats:main'.format(module_name)
         ]
     },
     include_package_data=True
@@ -15,8 +15,15 @@ from setproctitle import setproctitle
 from yarl import URL
 
 from store.api.app import create_app
-from store.utils.argparse import clear_environ, positive_int
+from store.api.payloads import DEFAULT_ENCODER, ENCODERS
+from store.utils.argparse import (
+    clear_environ, non_negative_float, non_negative_int, positive_float, positive_int, sample_rate
+)
+from store.utils.loop import DEFAULT_EVENT_LOOP, EVENT_LOOPS, set_event_loop
+from store.utils.metrics import mark_process_dead
 from store.utils.pg import DEFAULT_PG_URL
+from store.utils.prefork import Master, split_pool_size
+from store.utils.solver import EXECUTORS
 
 
 ENV_VAR_PREFIX = 'STORE_'
@@ -34,14 +41,89 @@ group.add_argument('--api-address', default='0.0.0.0',
                    help='IPv4/IPv6 address API server would listen on')
 group.add_argument('--api-port', type=positive_int, default=8080,
                    help='TCP port API server would listen on')
+group.add_argument('--streaming-imports', action='store_true',
+                   help='Parse and validate imported couriers and orders '
+                        'while reading the request body')
+group.add_argument('--workers', type=positive_int, default=1,
+                   help='Number of API server processes accepting connections '
+                        'on the same socket, more than 1 starts a master '
+                        'process restarting them (SIGHUP restarts all of them '
+                        'one by one)')
+group.add_argument('--event-loop', choices=tuple(EVENT_LOOPS), default=DEFAULT_EVENT_LOOP,
+                   help='Event loop implementation, uvloop is available if '
+                        'installed with the uvloop extra (store[uvloop])')
+group.add_argument('--json-encoder', choices=tuple(ENCODERS), default=DEFAULT_ENCODER,
+                   help='JSON encoder for responses, json is used if orjson '
+                        'is not installed')
 
 group = parser.add_argument_group('PostgreSQL options')
 group.add_argument('--pg-url', type=URL, default=URL(DEFAULT_PG_URL),
                    help='URL to use to connect to the database')
 group.add_argument('--pg-pool-min-size', type=int, default=10,
-                   help='Minimum database connections')
+                   help='Minimum database connections of all API processes')
 group.add_argument('--pg-pool-max-size', type=int, default=10,
-                   help='Maximum database connections')
+                   help='Maximum database connections of all API processes, '
+                        'split between --workers. Every process also keeps a '
+                        'LISTEN connection for couriers cache invalidations '
+                        'and --pg-replica-url staleness notifications (if '
+                        'either is enabled)')
+group.add_argument('--pg-max-queries', type=positive_int, default=50000,
+                   help='Queries after which a database connection is '
+                        'replaced with a new one')
+group.add_argument('--pg-max-inactive-connection-lifetime', type=non_negative_float, default=300.0,
+                   help='Seconds after which an idle database connection is '
+                        'closed, 0 keeps them open')
+group.add_argument('--pg-statement-cache-size', type=non_negative_int, default=100,
+                   help='Prepared statements cached by every database '
+                        'connection, 0 disables the cache')
+group.add_argument('--pg-command-timeout', type=positive_float, default=None,
+                   help='Seconds to wait for a query result, not limited by '
+                        'default')
+group.add_argument('--pg-replica-url', type=URL, default=None,
+                   help='URL of a streaming replica to read couriers and '
+                        'orders in GET handlers from, uses the same pool '
+                        'options')
+group.add_argument('--pg-replica-staleness', type=positive_float, default=5.0,
+                   help='Seconds after a write during which changed couriers '
+                        'and orders are read from primary, replica lagging '
+                        'more is not used')
+group.add_argument('--pg-pool-monitor-interval', type=non_negative_float, default=10.0,
+                   help='Seconds between warnings about saturated database '
+                        'pool (all connections are busy), 0 disables them')
+group.add_argument('--pg-denormalized-reads', action='store_true',
+                   help='Read couriers regions and working hours and orders '
+                        'delivery hours from denormalized array columns')
+
+group = parser.add_argument_group('Couriers cache options')
+group.add_argument('--couriers-cache-size', type=non_negative_int, default=10000,
+                   help='Maximum couriers profiles cached by every process, '
+                        '0 disables the cache')
+group.add_argument('--couriers-cache-ttl', type=positive_float, default=60.0,
+                   help='Seconds to keep courier profile in the cache')
+
+group = parser.add_argument_group('Solver options')
+group.add_argument('--solver-executor', choices=tuple(EXECUTORS), default='process',
+                   help='Executor to run order assignment optimization in')
+group.add_argument('--solver-workers', type=positive_int, default=os.cpu_count(),
+                   help='Number of solver threads or processes of all API '
+                        'processes, split between --workers')
+group.add_argument('--solver-timeout', type=positive_float, default=5.0,
+                   help='Seconds to wait for the exact solution before '
+                        'falling back to the greedy one')
+group.add_argument('--solver-exact-threshold', type=positive_int, default=10_000_000,
+                   help='Biggest problem size (orders * carrying capacity * 100) '
+                        'solved exactly, greedy algorithm is used for bigger ones')
+
+group = parser.add_argument_group('Tracing options')
+group.add_argument('--trace-sample-rate', type=sample_rate, default=0.0,
+                   help='Fraction of requests to trace (handler, database '
+                        'queries and solver spans), 0 disables tracing except '
+                        'for requests with X-Trace-Request header')
+group.add_argument('--slow-request-threshold', type=non_negative_float, default=1.0,
+                   help='Seconds after which a traced request is kept for '
+                        'GET /debug/slow')
+group.add_argument('--slow-requests-size', type=non_negative_int, default=100,
+                   help='Slow requests traces kept by every process')
 
 group = parser.add_argument_group('Logging options')
 group.add_argument('--log-level', default='info',
@@ -68,7 +150,10 @@ def main():
     # записи в stderr или файл - логи можно буфферизовать и обрабатывать в
     # отдельном потоке (aiomisc.basic_config настроит буфферизацию
     # автоматически).
-    basic_config(args.log_level, args.log_format, buffered=True)
+    # Поток буферизации не переживает fork(), поэтому в pre-fork режиме
+    # мастер пишет логи без буферизации, а рабочие процессы настраивают
+    # буферизацию заново.
+    basic_config(args.log_level, args.log_format, buffered=args.workers == 1)
 
     # Аллоцируем сокет из под привиллегированного пользователя отдельным шагом,
     # чтобы была возможность перед запуском приложения сменить пользователя ОС.
@@ -85,10 +170,31 @@ def main():
         os.setuid(args.user.pw_uid)
 
     # В списке процессов намного удобнее видеть название текущего приложения
-    setproctitle(os.path.basename(argv[0]))
-
-    app = create_app(args)
-    run_app(app, sock=sock)
+    title = os.path.basename(argv[0])
+    setproctitle(title)
+
+    # Политика event loop наследуется рабочими процессами в pre-fork режиме,
+    # сами event loop'ы создаются в каждом из них
+    set_event_loop(args.event_loop)
+
+    if args.workers == 1:
+        app = create_app(args)
+        run_app(app, sock=sock)
+        return
+
+    # Соединения с БД и процессы (потоки) solver делятся между рабочими
+    # процессами поровну
+    args.pg_pool_min_size = split_pool_size(args.pg_pool_min_size, args.workers)
+    args.pg_pool_max_size = split_pool_size(args.pg_pool_max_size, args.workers)
+    args.solver_workers = split_pool_size(args.solver_workers, args.workers)
+
+    def serve():
+        # Приложение (event loop, пул соединений с БД, пул процессов solver)
+        # создается в каждом рабочем процессе после fork()
+        basic_config(args.log_level, args.log_format, buffered=True)
+        run_app(create_app(args), sock=sock, print=None)
+
+    Master(args.workers, serve, title, on_exit=mark_process_dead).run()
 
 
 if __name__ == '__main__':
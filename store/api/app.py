@@ -8,20 +8,17 @@ from aiohttp.web_app import Application
 from aiohttp_apispec import setup_aiohttp_apispec, validation_middleware
 from configargparse import Namespace
 
-from store.api.handlers import HANDLERS
-from store.api.middleware import error_middleware, handle_validation_error
-from store.api.payloads import AsyncGenJSONListPayload, JsonPayload
+from store.api.handlers import HANDLERS, STREAMING_HANDLERS
+from store.api.middleware import error_middleware, handle_validation_error, metrics_middleware, tracing_middleware
+from store.api.payloads import AsyncGenJSONListPayload, JsonPayload, set_encoder
+from store.api.schema import MAX_REQUEST_SIZE
+from store.utils.cache import setup_couriers_cache, setup_listener
 from store.utils.pg import setup_pg
+from store.utils.replica import setup_replica
+from store.utils.solver import setup_solver
+from store.utils.tracing import SlowRequests
 
 
-# По умолчанию размер запроса к aiohttp ограничен 1 мегабайтом:
-# https://docs.aiohttp.org/en/stable/web_reference.html#aiohttp.web.Application
-# Размер запроса со 10 000 жителей и 2000 связей (с учетом максимальной длины
-# строк и кодировки json с параметром ensure_ascii=True) может занимать
-# ~63 мегабайт:
-MEGABYTE = 1024 ** 2
-MAX_REQUEST_SIZE = 70 * MEGABYTE
-
 log = logging.getLogger(__name__)
 
 
@@ -31,14 +28,43 @@ def create_app(args: Namespace) -> Application:
     """
     app = Application(
         client_max_size=MAX_REQUEST_SIZE,
-        middlewares=[error_middleware, validation_middleware]
+        # metrics_middleware первым, чтобы учитывать ответы с ошибками,
+        # сформированные error_middleware
+        middlewares=[metrics_middleware, tracing_middleware, error_middleware, validation_middleware]
     )
 
+    # Трассировка медленных запросов (GET /debug/slow)
+    app['trace_sample_rate'] = args.trace_sample_rate
+    app['slow_requests'] = SlowRequests(size=args.slow_requests_size, threshold=args.slow_request_threshold)
+
     # Подключение на старте к postgres и отключение при остановке
     app.cleanup_ctx.append(partial(setup_pg, args=args))
+    app['denormalized_reads'] = args.pg_denormalized_reads
+
+    # Каналы LISTEN/NOTIFY, на которые подписываются реплика и кеш курьеров
+    app['pg_subscriptions'] = []
+
+    # Реплика для GET обработчиков (если указан --pg-replica-url)
+    app.cleanup_ctx.append(partial(setup_replica, args=args))
+
+    # Кеш профилей курьеров, согласованный между процессами через
+    # LISTEN/NOTIFY
+    app.cleanup_ctx.append(partial(setup_couriers_cache, args=args))
+
+    # Одно LISTEN соединение на процесс для всех подписок: уведомления
+    # доставляются в порядке отправки
+    app.cleanup_ctx.append(partial(setup_listener, args=args))
+
+    # Пул процессов (или потоков) для решения задачи о назначении заказов
+    app.cleanup_ctx.append(partial(setup_solver, args=args))
 
-    # Регистрация обработчиков
-    for handler in HANDLERS:
+    # Регистрация обработчиков. В режиме потокового импорта тело запроса
+    # читается обработчиком по частям, поэтому ограничение client_max_size
+    # на него не действует.
+    handlers = {handler.URL_PATH: handler for handler in HANDLERS}
+    if args.streaming_imports:
+        handlers.update({handler.URL_PATH: handler for handler in STREAMING_HANDLERS})
+    for handler in handlers.values():
         log.debug('Registering handler %r as %r', handler, handler.URL_PATH)
         app.router.add_route('*', handler.URL_PATH, handler)
 
@@ -47,6 +73,7 @@ def create_app(args: Namespace) -> Application:
                           error_callback=handle_validation_error)
 
     # Автоматическая сериализация в json данных в HTTP ответах
+    set_encoder(args.json_encoder)
     PAYLOAD_REGISTRY.register(AsyncGenJSONListPayload,
                               (AsyncGeneratorType, AsyncIterable))
     PAYLOAD_REGISTRY.register(JsonPayload, (Mapping, MappingProxyType))
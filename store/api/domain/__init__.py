@@ -1,8 +1,12 @@
 from .time_intarvals_converter import TimeIntervalsConverter
 from .couriers_orders_resolver import CouriersOrdersResolver
+from .couriers_orders_vectorized_resolver import CouriersOrdersVectorizedResolver
+from .couriers_orders_greedy_resolver import CouriersOrdersGreedyResolver
 from .courier_configurator import CourierConfigurator
 from .iso_datetime_formats_converter import ISODatetimeFormatConverter
+from .unique_ids_validator import UniqueIdsValidator
 
 DOMAIN = (
-    TimeIntervalsConverter, CouriersOrdersResolver, CourierConfigurator, ISODatetimeFormatConverter
+    TimeIntervalsConverter, CouriersOrdersResolver, CouriersOrdersVectorizedResolver, CouriersOrdersGreedyResolver,
+    CourierConfigurator, ISODatetimeFormatConverter, UniqueIdsValidator
 )
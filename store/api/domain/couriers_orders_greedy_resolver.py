@@ -0,0 +1,36 @@
+from .couriers_orders_resolver import CouriersOrdersResolver
+
+
+class CouriersOrdersGreedyResolver(CouriersOrdersResolver):
+    """
+    Takes orders by the best value per weight unit while they fit into the
+    knapsack, then compares the result with the single most valuable order
+    that fits and keeps the better one. That is O(n log n) and guarantees at
+    least 1/2 of the optimal sum of p. When all values are equal (as they are
+    for order assignment) taking the lightest orders first is optimal.
+    """
+    def solve_knapsack_problem(self):
+        """
+        Fills the knapsack greedily
+        :return: sum of p of the taken items
+        """
+        items = sorted(range(1, self.n + 1), key=lambda i: (-self.val[i - 1] / max(self.orders[i]['weight'], 1), i))
+        capacity, total = self.w, 0
+        for i in items:
+            if self.orders[i]['weight'] <= capacity:
+                capacity -= self.orders[i]['weight']
+                total += self.val[i - 1]
+                self.ans.append(i)
+
+        fitting = [i for i in items if self.orders[i]['weight'] <= self.w]
+        if fitting:
+            best = max(fitting, key=lambda i: self.val[i - 1])
+            if self.val[best - 1] > total:
+                self.ans = [best]
+                total = self.val[best - 1]
+        return total
+
+    def find_ans(self, k, s):
+        """
+        items are already chosen by solve_knapsack_problem
+        """
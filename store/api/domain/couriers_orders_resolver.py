@@ -13,7 +13,7 @@ class CouriersOrdersResolver:
         self.w = int(max_weight * 100)
         self.n = len(orders_)
         self.val = [1 for i in range(len(orders_))] if values_ is None else values_
-        self.k = [[0 for x in range(self.w + 1)] for x in range(self.n + 1)]
+        self.choices = None
         self.ans = []
 
     async def resolve_orders(self):
@@ -21,44 +21,52 @@ class CouriersOrdersResolver:
         main method for resolver
         :return: items ids
         """
-        await self.solve_knapsack_problem()
-        await self.find_ans(self.n, self.w)
+        return self.resolve()
+
+    def resolve(self):
+        """
+        synchronous version of resolve_orders, as the work is CPU bound it may be run in executor
+        :return: items ids
+        """
+        self.solve_knapsack_problem()
+        self.find_ans(self.n, self.w)
         ids_ = []
         for item in self.ans:
             ids_.append(self.orders[item]['id'])
         ids_.sort()
         return ids_
 
-    async def solve_knapsack_problem(self):
+    def solve_knapsack_problem(self):
         """
-        Build table k[][] in bottom up manner
+        Build table k[][] in bottom up manner. Only the last row of the table is kept,
+        and for each item a bitset of capacities where it is taken (k[i][w] != k[i - 1][w])
         :return: last value in table, which is the biggest sum of p
         """
-        for i in range(self.n + 1):
-            for w in range(self.w + 1):
-                if i == 0 or w == 0:
-                    self.k[i][w] = 0
-                elif self.orders[i]['weight'] <= w:
-                    self.k[i][w] = \
-                        max(self.val[i - 1] + self.k[i - 1][w - self.orders[i]['weight']], self.k[i - 1][w])
-                else:
-                    self.k[i][w] = self.k[i - 1][w]
-        return self.k[self.n][self.w]
+        row = [0] * (self.w + 1)
+        self.choices = [None] * (self.n + 1)
+        for i in range(1, self.n + 1):
+            weight, value = self.orders[i]['weight'], self.val[i - 1]
+            taken = bytearray(self.w // 8 + 1)
+            # going from the biggest capacity down, row[w - weight] still holds the value of the previous row
+            for w in range(self.w, weight - 1, -1):
+                candidate = value + row[w - weight]
+                if candidate > row[w]:
+                    row[w] = candidate
+                    taken[w >> 3] |= 1 << (w & 7)
+            self.choices[i] = taken
+        return row[self.w]
 
-    async def find_ans(self, k, s):
+    def find_ans(self, k, s):
         """
         forms list ans of items that for the biggest sum of p
-        :param k:
-        :param s:
-        :return:
+        :param k: number of items to look through
+        :param s: knapsack capacity
         """
-        if self.k[k][s] == 0:
-            return
-        if self.k[k - 1][s] == self.k[k][s]:
-            await self.find_ans(k - 1, s)
-        else:
-            await self.find_ans(k - 1, s - self.orders[k]['weight'])
-            self.ans.append(k)
+        for i in range(k, 0, -1):
+            if self.choices[i][s >> 3] >> (s & 7) & 1:
+                self.ans.append(i)
+                s -= self.orders[i]['weight']
+        self.ans.reverse()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+import numpy as np
+
+from .couriers_orders_resolver import CouriersOrdersResolver
+
+
+class CouriersOrdersVectorizedResolver(CouriersOrdersResolver):
+    """
+    Solves the same 0/1 knapsack problem as CouriersOrdersResolver, but never
+    materializes the (n + 1) x (w + 1) table: a single 1-D row is rolled over
+    the items with numpy slice operations, and for reconstruction only one bit
+    per cell ("item i is taken for capacity w") is kept, packed 8 cells a byte.
+    Tie-breaking matches CouriersOrdersResolver, so both return the same ids.
+    """
+    def __init__(self, orders_, max_weight, values_=None):
+        super().__init__(orders_, max_weight, values_)
+        self.choices = None
+
+    def solve_knapsack_problem(self):
+        """
+        Rolls the dp row over all items, remembering the taken cells
+        :return: the biggest sum of p
+        """
+        row = np.zeros(self.w + 1, dtype=np.int64)
+        self.choices = np.zeros((self.n + 1, self.w // 8 + 1), dtype=np.uint8)
+        taken = np.zeros(self.w + 1, dtype=np.bool_)
+
+        for i in range(1, self.n + 1):
+            weight = self.orders[i]['weight']
+            if weight > self.w:
+                continue
+
+            # candidate[w - weight] is the value of the row with item i put
+            # into a knapsack of capacity w; it is computed before the row is
+            # updated, so it still refers to the previous item's row
+            candidate = row[:self.w + 1 - weight] + self.val[i - 1]
+            taken[:weight] = False
+            np.greater(candidate, row[weight:], out=taken[weight:])
+            np.maximum(row[weight:], candidate, out=row[weight:])
+            self.choices[i] = np.packbits(taken)
+
+        return int(row[self.w])
+
+    def find_ans(self, k, s):
+        """
+        forms list ans of items that for the biggest sum of p
+        :param k: number of items to look through
+        :param s: knapsack capacity
+        """
+        for i in range(k, 0, -1):
+            # np.packbits is big-endian: cell s is bit (7 - s % 8) of byte s // 8
+            if self.choices[i, s >> 3] >> (7 - (s & 7)) & 1:
+                self.ans.append(i)
+                s -= self.orders[i]['weight']
+        self.ans.reverse()
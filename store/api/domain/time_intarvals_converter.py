@@ -87,7 +87,7 @@ class TimeIntervalsConverter:
         :param i:
         :return:
         """
-        hours, minutes = int(time_mark.split(":")[0]), int(time_mark.split(":")[0])
+        hours, minutes = int(time_mark.split(":")[0]), int(time_mark.split(":")[1])
         if hours > 23:
             raise ValidationError(
                 'incorrect value for {} on index {}. {} is out of range'.format(value_title, i, hours)
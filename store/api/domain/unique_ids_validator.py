@@ -0,0 +1,50 @@
+from typing import Iterable, List
+
+from marshmallow import ValidationError
+
+
+class UniqueIdsValidator:
+    """
+    Finds ids that occur more than once in O(n). Ids may be added one by one
+    (while a request is streamed) or all at once with validate_unique_ids.
+    """
+    __slots__ = ('seen', 'duplicates')
+
+    def __init__(self):
+        self.seen = set()
+        self.duplicates = set()
+
+    def add(self, id_):
+        """
+        :param id_: id of the next item
+        """
+        if id_ in self.seen:
+            self.duplicates.add(id_)
+        else:
+            self.seen.add(id_)
+
+    def find_duplicates(self) -> List:
+        """
+        :return: ids that were added more than once, in the order of the set of all ids
+        """
+        if not self.duplicates:
+            return []
+        return [id_ for id_ in self.seen if id_ in self.duplicates]
+
+    def validate(self):
+        """
+        raises ValidationError with {'validation_error': [{'id': id}, ...]} for the data field if there are duplicates
+        """
+        duplicates = self.find_duplicates()
+        if duplicates:
+            raise ValidationError({'data': {'validation_error': [{'id': id_} for id_ in duplicates]}})
+
+    @staticmethod
+    def validate_unique_ids(ids: Iterable):
+        """
+        :param ids: ids of all items
+        """
+        validator = UniqueIdsValidator()
+        for id_ in ids:
+            validator.add(id_)
+        validator.validate()
@@ -1,15 +1,41 @@
 from .courier.couriers_imports import CouriersImportsView
 from .order.orders_imports import OrdersImportsView
+from .courier.couriers_streaming_imports import CouriersStreamingImportsView
+from .order.orders_streaming_imports import OrdersStreamingImportsView
 from .courier.couriers import CouriersView
 from .order.orders_assign import OrdersAssignmentView
+from .order.orders_assign_batch import OrdersBatchAssignmentView
 from .order.orders_complete import OrdersCompletionView
+from .order.orders_complete_batch import OrdersBatchCompletionView
 from .order.orders import OrdersView
+from .debug.cache import CacheStatsView
+from .debug.metrics import MetricsView
+from .debug.slow import SlowRequestsView
+from .base import BaseView
+
+from store.utils.metrics import register_query_names
 
 HANDLERS = (
     CouriersImportsView,  # POST /couriers
     CouriersView,  # PATCH /couriers/{id}
     OrdersImportsView,  # POST /orders
     OrdersAssignmentView,  # POST /orders/assign
+    OrdersBatchAssignmentView,  # POST /orders/assign/batch
     OrdersCompletionView,   # POST /orders/complete
-    OrdersView
+    OrdersBatchCompletionView,  # POST /orders/complete/batch
+    OrdersView,
+    CacheStatsView,  # GET /debug/cache
+    MetricsView,  # GET /metrics
+    SlowRequestsView,  # GET /debug/slow
+)
+
+# Заменяют обработчики импорта с тем же URL_PATH при запуске с
+# --streaming-imports
+STREAMING_HANDLERS = (
+    CouriersStreamingImportsView,  # POST /couriers
+    OrdersStreamingImportsView,  # POST /orders
 )
+
+# Имена SQL запросов обработчиков для метрик: OrdersBatchAssignmentView.assign_orders, ...
+for view in (BaseView, *HANDLERS, *STREAMING_HANDLERS):
+    register_query_names(view, prefix=view.__name__ + '.')
@@ -1,5 +1,19 @@
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+from aiohttp.web_exceptions import HTTPNotFound
 from aiohttp.web_urldispatcher import View
 from asyncpgsa import PG
+from sqlalchemy.sql import Select
+
+from store.utils.cache import CouriersCache
+from store.utils.pg import TimedAcquire
+from store.utils.replica import ReplicaRouter
+from store.utils.solver import OrdersSolver
+
+from ..query import COURIERS_QUERY, COURIERS_DENORMALIZED_QUERY, ORDERS_QUERY, ORDERS_DENORMALIZED_QUERY, \
+    DENORMALIZED
+
+T = TypeVar('T')
 
 
 class BaseView(View):
@@ -8,6 +22,100 @@ class BaseView(View):
     """
     URL_PATH: str
 
+    ACQUIRE_LOCK = 'SELECT pg_advisory_xact_lock($1)'
+    # Идентификаторы сортируются, чтобы избежать взаимных блокировок
+    ACQUIRE_LOCKS = 'SELECT pg_advisory_xact_lock(id) FROM (SELECT unnest($1::integer[]) AS id ORDER BY 1) AS ids'
+
     @property
     def pg(self) -> PG:
         return self.request.app['pg']
+
+    @property
+    def pg_router(self) -> ReplicaRouter:
+        return self.request.app['pg_router']
+
+    def read_connection(self, couriers: Iterable[int] = (), orders: Iterable[int] = ()) -> TimedAcquire:
+        """
+        connection for reads without transaction and locks: of replica, unless it lags or couriers or orders
+        were changed recently, else of primary
+        :param couriers: int ids of couriers to be read
+        :param orders: int ids of orders to be read
+        :return: connection context manager
+        """
+        return self.pg_router.choose(couriers, orders).acquire()
+
+    async def read(self, reader: Callable[..., Awaitable[T]],
+                   couriers: Iterable[int] = (), orders: Iterable[int] = ()) -> T:
+        """
+        calls reader with read connection, entities not found on replica are looked up on primary again
+        :param reader: coroutine function of connection, raising HTTPNotFound if there is no entity
+        :param couriers: int ids of couriers to be read
+        :param orders: int ids of orders to be read
+        :return: reader result
+        """
+        pg = self.pg_router.choose(couriers, orders)
+        async with pg.acquire() as conn:
+            try:
+                return await reader(conn)
+            except HTTPNotFound:
+                # Только что импортированных курьеров и заказов на реплике
+                # может еще не быть
+                if pg is self.pg:
+                    raise
+
+        async with self.pg.acquire() as conn:
+            return await reader(conn)
+
+    @classmethod
+    async def acquire_lock(cls, conn, courier_id):
+        """
+        takes transaction advisory lock of courier, so its orders and stats are changed sequentially
+        :param conn: sql connection
+        :param courier_id: int id
+        """
+        await conn.execute(cls.ACQUIRE_LOCK, courier_id)
+
+    @classmethod
+    async def acquire_locks(cls, conn, couriers_ids):
+        """
+        takes transaction advisory locks of couriers with one query, in order of ids to avoid deadlocks
+        :param conn: sql connection
+        :param couriers_ids: list of int ids
+        """
+        await conn.execute(cls.ACQUIRE_LOCKS, list(couriers_ids))
+
+    @property
+    def solver(self) -> OrdersSolver:
+        return self.request.app['solver']
+
+    @property
+    def couriers_cache(self) -> CouriersCache:
+        return self.request.app['couriers_cache']
+
+    @property
+    def couriers_query(self) -> Select:
+        """
+        query for couriers with regions and working hours, depends on storage layout to read from
+        """
+        if self.request.app['denormalized_reads']:
+            return COURIERS_DENORMALIZED_QUERY
+        return COURIERS_QUERY
+
+    @property
+    def orders_query(self) -> Select:
+        """
+        query for orders with delivery hours, depends on storage layout to read from
+        """
+        if self.request.app['denormalized_reads']:
+            return ORDERS_DENORMALIZED_QUERY
+        return ORDERS_QUERY
+
+    def read_statement(self, name: str) -> str:
+        """
+        name of registered statement reading couriers or orders, depends on storage layout to read from
+        :param name: name of statement reading normalized tables
+        :return: statement name
+        """
+        if self.request.app['denormalized_reads']:
+            return name + DENORMALIZED
+        return name
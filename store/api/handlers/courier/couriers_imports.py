@@ -2,64 +2,77 @@ from store.api.handlers.base import BaseView
 
 from http import HTTPStatus
 from typing import Generator
-from sqlalchemy import select
 
 from aiohttp.web_response import Response
 from aiohttp.web_exceptions import HTTPBadRequest
-from aiohttp_apispec import docs, request_schema, response_schema
-from aiomisc import chunk_list
-
-from store.api.schema import CouriersPostRequestSchema, CouriersIdsSchema
-from store.db.schema import couriers_table, working_hours_table, \
-    couriers_working_hours_table, regions_table, couriers_regions_table
-from store.utils.pg import MAX_QUERY_ARGS
+from aiohttp_apispec import docs, querystring_schema, request_schema, response_schema
+from sqlalchemy import and_, exists
+
+from store.api.domain import TimeIntervalsConverter
+from store.api.payloads import AsyncGenJSONListPayload, accepts_gzip
+from store.api.schema import (
+    CouriersPostRequestSchema, CouriersIdsSchema, CouriersListQuerySchema, CouriersListResponseSchema
+)
+from store.db.schema import CourierType, couriers_table, couriers_regions_table
+from store.utils.pg import SelectQuery
 from asyncpg.exceptions import UniqueViolationError
 
+from .couriers import CouriersView
+from ..query import keyset_page
+
 
 class CouriersImportsView(BaseView):
     URL_PATH = '/couriers'
-    # Так как данных может быть много, а postgres поддерживает только
-    # MAX_QUERY_ARGS аргументов в одном запросе, писать в БД необходимо
-    # частями.
-    # Максимальное кол-во строк для вставки можно рассчитать как отношение
-    # MAX_QUERY_ARGS к кол-ву вставляемых в таблицу столбцов.
-    MAX_COURIERS_PER_INSERT = MAX_QUERY_ARGS // len(couriers_table.columns)
-    MAX_REGIONS_PER_INSERT = MAX_QUERY_ARGS // len(regions_table.columns)
-    MAX_COURIER_REGIONS_PER_INSERT = MAX_QUERY_ARGS // len(couriers_regions_table.columns)
-    MAX_WORKING_HOURS_PER_INSERT = MAX_QUERY_ARGS // len(working_hours_table.columns)
-    MAX_COURIERS_WORKING_HOURS_PER_INSERT = MAX_QUERY_ARGS // len(couriers_working_hours_table.columns)
 
-    @classmethod
-    def make_couriers_table_rows(cls, couriers) -> Generator:
-        for courier in couriers:
-            yield {
-                'courier_id': courier['courier_id'],
-                'courier_type': courier['courier_type']
-            }
+    # Данные загружаются с помощью COPY (asyncpg copy_records_to_table): это
+    # быстрее многострочных INSERT и не ограничено MAX_QUERY_ARGS. Регионы и
+    # рабочие часы сначала копируются во временные таблицы, а затем
+    # переносятся в основные одним INSERT ... SELECT.
+    CREATE_STAGING_TABLES = (
+        'CREATE TEMPORARY TABLE couriers_regions_import '
+        '(courier_id integer, region_id integer) ON COMMIT DROP',
+        'CREATE TEMPORARY TABLE couriers_working_hours_import '
+        '(courier_id integer, time_start integer, time_finish integer) ON COMMIT DROP',
+    )
+
+    INSERT_REGIONS = """
+        INSERT INTO regions (region_id)
+        SELECT DISTINCT region_id FROM couriers_regions_import
+        ON CONFLICT DO NOTHING
+    """
+
+    INSERT_COURIERS_REGIONS = """
+        INSERT INTO couriers_regions (courier_id, region_id)
+        SELECT DISTINCT courier_id, region_id FROM couriers_regions_import
+    """
+
+    # Идентификаторы рабочих часов выделяются из последовательности заранее,
+    # чтобы одним запросом записать и рабочие часы, и связи с курьерами (и не
+    # рассчитывать на то, что вставленные строки получат идентификаторы
+    # first_id + i).
+    INSERT_WORKING_HOURS = """
+        WITH rows AS (
+            SELECT courier_id, time_start, time_finish,
+                   nextval(pg_get_serial_sequence('working_hours', 'working_hours_id')) AS working_hours_id
+            FROM couriers_working_hours_import
+        ), working_hours AS (
+            INSERT INTO working_hours (working_hours_id, time_start, time_finish)
+            SELECT working_hours_id, time_start, time_finish FROM rows
+        )
+        INSERT INTO couriers_working_hours (courier_id, working_hours_id)
+        SELECT courier_id, working_hours_id FROM rows
+    """
 
     @classmethod
-    def make_regions_table_rows(cls, couriers, regions) -> Generator:
-        current_regions, new_regions = set(), set()
-        for i in regions:
-            current_regions.add(i['region_id'])
-
+    def make_couriers_table_rows(cls, couriers) -> Generator:
         for courier in couriers:
-            for region in courier['regions']:
-                new_regions.add(region)
-
-        for region in new_regions - current_regions:
-            yield {
-                'region_id': region
-            }
+            yield courier['courier_id'], courier['courier_type']
 
     @classmethod
     def make_couriers_regions_table_rows(cls, couriers) -> Generator:
         for courier in couriers:
             for region in courier['regions']:
-                yield {
-                    'courier_id': courier['courier_id'],
-                    'region_id': region
-                }
+                yield courier['courier_id'], region
 
     @classmethod
     def make_couriers_ids(cls, couriers) -> Generator:
@@ -72,23 +85,99 @@ class CouriersImportsView(BaseView):
     def make_working_hours_table_rows(cls, couriers) -> Generator:
         for courier in couriers:
             for working_hour_interval in courier['working_hours']:
-                start_working, stop_working = working_hour_interval.split('-')[0], working_hour_interval.split('-')[1]
+                time_start, time_finish = TimeIntervalsConverter.string_to_int_interval(working_hour_interval)
+                yield courier['courier_id'], time_start, time_finish
+
+    @classmethod
+    async def create_staging_tables(cls, conn):
+        for query in cls.CREATE_STAGING_TABLES:
+            await conn.execute(query)
 
-                yield {
-                    'time_start': str(int(start_working.split(":")[0]) * 60 + int(start_working.split(":")[1])),
-                    'time_finish': str(int(stop_working.split(":")[0]) * 60 + int(stop_working.split(":")[1]))
-                }
+    @classmethod
+    async def copy_couriers_chunk(cls, conn, couriers):
+        """
+        copies couriers to db, their regions and working hours to staging tables
+        :param conn: sql connection
+        :param couriers: list of validated couriers
+        """
+        try:
+            await conn.copy_records_to_table(
+                'couriers', records=cls.make_couriers_table_rows(couriers),
+                columns=('courier_id', 'courier_type')
+            )
+        # if couriers already exist, throw 400 bad request
+        except UniqueViolationError:
+            raise HTTPBadRequest()
+
+        await conn.copy_records_to_table(
+            'couriers_regions_import', records=cls.make_couriers_regions_table_rows(couriers),
+            columns=('courier_id', 'region_id')
+        )
+        await conn.copy_records_to_table(
+            'couriers_working_hours_import', records=cls.make_working_hours_table_rows(couriers),
+            columns=('courier_id', 'time_start', 'time_finish')
+        )
 
     @classmethod
-    def make_couriers_working_hours_table_rows(cls, couriers, working_hours_ids) -> Generator:
-        id_counter = 0
-        for courier in couriers:
-            for i in range(len(courier['working_hours'])):
-                yield {
-                    'courier_id': courier['courier_id'],
-                    'working_hours_id': working_hours_ids[id_counter]
-                }
-                id_counter += 1
+    async def move_staging_rows(cls, conn):
+        """
+        moves regions and working hours from staging tables to db
+        :param conn: sql connection
+        """
+        await conn.execute(cls.INSERT_REGIONS)
+        await conn.execute(cls.INSERT_COURIERS_REGIONS)
+        await conn.execute(cls.INSERT_WORKING_HOURS)
+
+    @classmethod
+    async def copy_couriers(cls, conn, couriers):
+        """
+        writes couriers with regions and working hours to db
+        :param conn: sql connection
+        :param couriers: list of validated couriers
+        """
+        await cls.create_staging_tables(conn)
+        await cls.copy_couriers_chunk(conn, couriers)
+        await cls.move_staging_rows(conn)
+
+    @staticmethod
+    def make_list_query(query, after=None, limit=None, region=None, type=None):
+        """
+        builds query for page of couriers list
+        :param query: couriers query to read with
+        :param after: last courier id of the previous page
+        :param limit: page size, None for all the rest couriers
+        :param region: int id, only couriers working in region are listed
+        :param type: courier type value, only couriers of type are listed
+        :return: couriers page query
+        """
+        if region is not None:
+            # Отдельный псевдоним, чтобы подзапрос не связывался с
+            # couriers_regions из JOIN в COURIERS_QUERY
+            regions = couriers_regions_table.alias()
+            query = query.where(exists().where(and_(
+                regions.c.courier_id == couriers_table.c.courier_id, regions.c.region_id == region
+            )))
+        if type is not None:
+            query = query.where(couriers_table.c.courier_type == CourierType(type))
+        return keyset_page(query, couriers_table.c.courier_id, after, limit)
+
+    async def iterate_couriers(self, query):
+        """
+        reads couriers with server side cursor, so only prefetched rows are kept in memory
+        :param query: couriers page query
+        :return: async generator of courier entities for output
+        """
+        async for courier in SelectQuery(query, self.pg.transaction()):
+            yield CouriersView.format_courier(courier)
+
+    @docs(summary='List couriers ordered by id')
+    @querystring_schema(CouriersListQuerySchema())
+    @response_schema(CouriersListResponseSchema(), code=HTTPStatus.OK.value)
+    async def get(self):
+        query = self.make_list_query(self.couriers_query, **self.request['querystring'])
+        # Курьеры сериализуются и отправляются по мере чтения из курсора
+        body = AsyncGenJSONListPayload(self.iterate_couriers(query), gzip=accepts_gzip(self.request))
+        return Response(body=body)
 
     @docs(summary='Add import with couriers information')
     @request_schema(CouriersPostRequestSchema())
@@ -97,60 +186,11 @@ class CouriersImportsView(BaseView):
         # Транзакция требуется чтобы в случае ошибки (или отключения клиента,
         # не дождавшегося ответа) откатить частично добавленные изменения.
         async with self.pg.transaction() as conn:
-
-            query = select([regions_table.c.region_id]).select_from(regions_table)
-            regions = await self.pg.fetch(query)
-
             couriers = self.request['data']['data']
-            couriers_rows = self.make_couriers_table_rows(couriers)
-            couriers_ids = self.make_couriers_ids(couriers)
-            regions_rows = self.make_regions_table_rows(couriers, regions)
-            couriers_regions_rows = self.make_couriers_regions_table_rows(couriers)
-
-            working_hours_rows = self.make_working_hours_table_rows(couriers)
-
-            # Чтобы уложиться в ограничение кол-ва аргументов в запросе к
-            # postgres, а также сэкономить память и избежать создания полной
-            # копии данных присланных клиентом во время подготовки - используем
-            # генератор chunk_list.
-            # Он будет получать из генератора make_citizens_table_rows только
-            # необходимый для 1 запроса объем данных.
-            chunked_couriers_rows = chunk_list(couriers_rows, self.MAX_COURIERS_PER_INSERT)
-            chunked_regions_rows = chunk_list(regions_rows, self.MAX_REGIONS_PER_INSERT)
-            chunked_couriers_regions_rows = chunk_list(couriers_regions_rows, self.MAX_COURIER_REGIONS_PER_INSERT)
-            chunked_working_hours_rows = chunk_list(working_hours_rows, self.MAX_WORKING_HOURS_PER_INSERT)
-
-            query = couriers_table.insert()
-            for chunk in chunked_couriers_rows:
-                try:
-                    await conn.execute(query.values(list(chunk)))
-                # if couriers already exist, throw 400 bad request
-                except UniqueViolationError:
-                    raise HTTPBadRequest()
-
-            query = regions_table.insert()
-            for chunk in chunked_regions_rows:
-                await conn.execute(query.values(list(chunk)))
-
-            query = couriers_regions_table.insert()
-            for chunk in chunked_couriers_regions_rows:
-                await conn.execute(query.values(list(chunk)))
-
-            ids = []
-            query = working_hours_table.insert().returning(working_hours_table.c.working_hours_id)
-            for chunk in chunked_working_hours_rows:
-                first_id = await conn.fetchval(query.values(
-                    [{'time_start': int(i['time_start']), 'time_finish': int(i['time_finish'])} for i in list(chunk)]))
-                ids.append([first_id + i for i in range(len(list(chunk)))])
-            ids = [y for x in ids for y in x]
-
-            couriers_working_hours_table_rows = self.make_couriers_working_hours_table_rows(couriers, ids)
-            chunked_couriers_working_hours_table_rows = chunk_list(couriers_working_hours_table_rows,
-                                                                   self.MAX_COURIERS_WORKING_HOURS_PER_INSERT)
-
-            query = couriers_working_hours_table.insert()
-            for chunk in chunked_couriers_working_hours_table_rows:
-                await conn.execute(query.values(list(chunk)))
-
-            return Response(body={'couriers': list(couriers_ids)},
-                            status=HTTPStatus.CREATED)
+            await self.copy_couriers(conn, couriers)
+            couriers_ids = [courier['courier_id'] for courier in couriers]
+            await self.couriers_cache.notify(conn, couriers_ids)
+        self.couriers_cache.invalidate(couriers_ids)
+
+        return Response(body={'couriers': list(self.make_couriers_ids(couriers))},
+                        status=HTTPStatus.CREATED)
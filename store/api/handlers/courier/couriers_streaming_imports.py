@@ -0,0 +1,36 @@
+from http import HTTPStatus
+
+from aiohttp.web_response import Response
+from aiohttp_apispec import docs, response_schema
+
+from store.api.schema import CourierItemSchema, CouriersIdsSchema
+from store.api.streaming import StreamingItemsValidator
+
+from .couriers_imports import CouriersImportsView
+
+
+class CouriersStreamingImportsView(CouriersImportsView):
+    """
+    POST /couriers that validates couriers while the request body is being read
+    and copies them to db in chunks, so the body is never loaded into memory
+    as a whole
+    """
+    CHUNK_SIZE = 1000
+
+    @docs(summary='Add import with couriers information (streaming)')
+    @response_schema(CouriersIdsSchema(), code=HTTPStatus.CREATED.value)
+    async def post(self):
+        validator = StreamingItemsValidator(CourierItemSchema(), 'couriers', 'courier_id', self.CHUNK_SIZE)
+        couriers_ids = []
+
+        async with self.pg.transaction() as conn:
+            await self.create_staging_tables(conn)
+            async for couriers in validator.iterate_chunks(self.request.content):
+                await self.copy_couriers_chunk(conn, couriers)
+                couriers_ids.extend(self.make_couriers_ids(couriers))
+            await self.move_staging_rows(conn)
+            await self.couriers_cache.notify(conn, [courier['id'] for courier in couriers_ids])
+        self.couriers_cache.invalidate(courier['id'] for courier in couriers_ids)
+
+        return Response(body={'couriers': couriers_ids},
+                        status=HTTPStatus.CREATED)
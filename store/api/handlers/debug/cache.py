@@ -0,0 +1,12 @@
+from store.api.handlers.base import BaseView
+
+from aiohttp.web_response import Response
+from aiohttp_apispec import docs
+
+
+class CacheStatsView(BaseView):
+    URL_PATH = '/debug/cache'
+
+    @docs(summary='Get couriers cache hit and miss counters of this process')
+    async def get(self):
+        return Response(body={'couriers': self.couriers_cache.stats})
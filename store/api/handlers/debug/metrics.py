@@ -0,0 +1,15 @@
+from store.api.handlers.base import BaseView
+
+from aiohttp.web_response import Response
+from aiohttp_apispec import docs
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from store.utils.metrics import generate_metrics
+
+
+class MetricsView(BaseView):
+    URL_PATH = '/metrics'
+
+    @docs(summary='Get metrics in Prometheus text format')
+    async def get(self):
+        return Response(body=generate_metrics(), headers={'Content-Type': CONTENT_TYPE_LATEST})
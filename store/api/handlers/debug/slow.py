@@ -0,0 +1,12 @@
+from store.api.handlers.base import BaseView
+
+from aiohttp.web_response import Response
+from aiohttp_apispec import docs
+
+
+class SlowRequestsView(BaseView):
+    URL_PATH = '/debug/slow'
+
+    @docs(summary='Get traces of slow requests handled by this process, latest first')
+    async def get(self):
+        return Response(body={'requests': self.request.app['slow_requests'].list()})
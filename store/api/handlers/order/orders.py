@@ -5,12 +5,10 @@ from http import HTTPStatus
 from aiohttp.web_exceptions import HTTPNotFound
 from aiohttp.web_response import Response
 from aiohttp_apispec import docs, response_schema
-from sqlalchemy import and_
 
 from store.api.schema import OrderItemSchema
-from store.db.schema import orders_table
 
-from ..query import ORDERS_QUERY
+from ..query import STATEMENTS
 from ...domain import TimeIntervalsConverter
 
 
@@ -22,11 +20,19 @@ class OrdersView(BaseView):
         return int(self.request.match_info.get('order_id'))
 
     @classmethod
-    async def get_order(cls, conn, order_id):
-        query = ORDERS_QUERY.where(and_(orders_table.c.order_id == order_id))
-        order = await conn.fetchrow(query)
+    async def get_order(cls, conn, order_id, statement='order'):
+        order = await STATEMENTS.fetchrow(conn, statement, order_id=order_id)
         if not order:
             raise HTTPNotFound()
+        return cls.format_order(order)
+
+    @staticmethod
+    def format_order(order):
+        """
+        converts order row of orders query to output format
+        :param order: order record
+        :return: order entity for output
+        """
         return {
             'order_id': order['order_id'],
             'courier_id': -1 if not order['courier_id'] else order['courier_id'],
@@ -34,18 +40,26 @@ class OrdersView(BaseView):
             'region': order['region'],
             'delivery_hours': TimeIntervalsConverter.int_to_string_array(time_start_intervals=order['time_start'],
                                                                          time_finish_intervals=order['time_finish']),
-            'assign_time': "" if not order['assignment_time'] else order['assignment_time'],
-            'delivery_start_time': "" if not order['delivery_start_time'] else order['delivery_start_time'],
-            'complete_time': "" if not order['completion_time'] else order['completion_time']
+            'assign_time': OrdersView.format_time(order['assignment_time']),
+            'delivery_start_time': OrdersView.format_time(order['delivery_start_time']),
+            'complete_time': OrdersView.format_time(order['completion_time'])
         }
 
+    @staticmethod
+    def format_time(times):
+        """
+        formats time column of orders query, which is aggregated into array
+        :param times: empty or single element list of datetime
+        :return: ISO 8601 time string, empty if time is not set
+        """
+        return "" if not times else times[0].isoformat("T") + "Z"
+
     @docs(summary='Get courier information')
     # @request_schema()
     @response_schema(OrderItemSchema(), code=HTTPStatus.OK.value)
     async def get(self):
-        # Транзакция требуется чтобы в случае ошибки (или отключения клиента,
-        # не дождавшегося ответа) откатить частично добавленные изменения.
-        async with self.pg.transaction() as conn:
-            order = await self.get_order(conn, self.order_id)
-
-            return Response(body=order)
+        # Чтение без транзакции, с реплики, если заказ не изменялся недавно
+        order = await self.read(
+            lambda conn: self.get_order(conn, self.order_id, self.read_statement('order')), orders=[self.order_id]
+        )
+        return Response(body=order)
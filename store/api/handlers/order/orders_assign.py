@@ -4,12 +4,9 @@ from http import HTTPStatus
 from aiohttp.web_response import Response
 from aiohttp.web_exceptions import HTTPNotFound
 from aiohttp_apispec import docs, request_schema, response_schema
-from sqlalchemy import and_, or_
-
 from store.api.schema import OrdersAssignPostRequestSchema, OrdersAssignPostResponseSchema
-from store.db.schema import orders_table, couriers_table
 
-from ..query import COURIERS_QUERY, ORDERS_QUERY, AvailableOrdersDefiner
+from ..query import STATEMENTS, AvailableOrdersDefiner, fetch_courier
 from ...domain import ISODatetimeFormatConverter
 
 
@@ -17,13 +14,19 @@ class OrdersAssignmentView(BaseView):
     URL_PATH = r'/orders/assign'
 
     @staticmethod
-    async def get_courier(conn, courier_id):
-        query = COURIERS_QUERY.where(and_(
-            couriers_table.c.courier_id == courier_id,
-        ))
-        courier = await conn.fetchrow(query)
+    async def get_courier(conn, courier_id, statement='courier', cache=None):
+        courier = await fetch_courier(conn, courier_id, statement, cache)
         if courier is None:
             raise HTTPNotFound()
+        return OrdersAssignmentView.format_courier(courier)
+
+    @staticmethod
+    def format_courier(courier):
+        """
+        converts courier row of couriers query to the entity AvailableOrdersDefiner works with
+        :param courier: courier record
+        :return: courier entity with working hours as int intervals
+        """
         return {
             'courier_id': courier['courier_id'],
             'courier_type': courier['courier_type'],
@@ -34,16 +37,15 @@ class OrdersAssignmentView(BaseView):
         }
 
     @staticmethod
-    async def get_couriers_orders(conn, courier_id):
-        query = ORDERS_QUERY.where(and_(orders_table.c.courier_id == courier_id))
-        return await conn.fetch(query)
+    async def get_couriers_orders(conn, courier_id, statement='courier_orders'):
+        return await STATEMENTS.fetch(conn, statement, courier_id=courier_id)
 
     @staticmethod
     async def assign_orders(conn, orders_ids, courier_id, assignment_time):
-        values = {'courier_id': courier_id, 'assignment_time': assignment_time}
-        conditions = or_(*list([orders_table.c.order_id == order_id for order_id in orders_ids]))
-        query = orders_table.update().values(values).where(conditions)
-        await conn.execute(query)
+        await STATEMENTS.execute(
+            conn, 'assign_orders', orders_ids=orders_ids, assigned_courier_id=courier_id,
+            assignment_time=assignment_time
+        )
 
     @docs(summary='Assign orders to couriers')
     @request_schema(OrdersAssignPostRequestSchema())
@@ -53,19 +55,25 @@ class OrdersAssignmentView(BaseView):
         # не дождавшегося ответа) откатить частично добавленные изменения.
         async with self.pg.transaction() as conn:
             courier_id = self.request['data']['courier_id']
-            courier = await self.get_courier(conn, courier_id)
-            orders = await self.get_couriers_orders(conn, courier_id)
+            # Повторные запросы для одного курьера выполняются по очереди, иначе
+            # оба не увидят назначенных заказов и назначат курьеру новые
+            await self.acquire_lock(conn, courier_id)
+            courier = await self.get_courier(conn, courier_id, self.read_statement('courier'), self.couriers_cache)
+            orders = await self.get_couriers_orders(conn, courier_id, self.read_statement('courier_orders'))
             if orders:
                 return Response(body={'orders':
                                           [{'id': orders[i]['order_id']} for i in range(len(orders))],
                                       'assign_time': orders[0]['assignment_time'][0].isoformat("T") + "Z"})
 
-            orders_to_assign_ids = await AvailableOrdersDefiner().get_orders(conn, courier)
+            definer = AvailableOrdersDefiner(self.solver)
+            orders_to_assign_ids = await definer.get_orders(conn, courier)
             if len(orders_to_assign_ids) == 0:
-                return Response(body={'orders': []})
+                return Response(body={'orders': []}, headers=definer.headers)
 
             assignment_time = await ISODatetimeFormatConverter.get_now()
             await self.assign_orders(conn, orders_to_assign_ids, courier_id, assignment_time)
+            await self.pg_router.notify(conn, orders=orders_to_assign_ids)
 
             return Response(body={'orders': [{'id': id_} for id_ in orders_to_assign_ids],
-                                  'assign_time': await ISODatetimeFormatConverter.parse_datetime(assignment_time)})
+                                  'assign_time': await ISODatetimeFormatConverter.parse_datetime(assignment_time)},
+                            headers=definer.headers)
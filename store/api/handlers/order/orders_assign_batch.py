@@ -0,0 +1,114 @@
+from store.api.handlers.base import BaseView
+
+from collections import defaultdict
+from http import HTTPStatus
+
+from aiohttp.web_response import Response
+from aiohttp.web_exceptions import HTTPBadRequest
+from aiohttp_apispec import docs, request_schema, response_schema
+
+from store.api.schema import CouriersIdsSchema, OrdersAssignBatchPostResponseSchema
+
+from .orders_assign import OrdersAssignmentView
+from ..query import STATEMENTS, AvailableOrdersDefiner
+from ...domain import ISODatetimeFormatConverter
+
+
+class OrdersBatchAssignmentView(BaseView):
+    URL_PATH = r'/orders/assign/batch'
+
+    # Все назначения записываются одним UPDATE: пары (заказ, курьер)
+    # передаются двумя массивами одинаковой длины.
+    ASSIGN_ORDERS = """
+        UPDATE orders
+        SET courier_id = assignments.courier_id, assignment_time = $3
+        FROM unnest($1::integer[], $2::integer[]) AS assignments (order_id, courier_id)
+        WHERE orders.order_id = assignments.order_id
+    """
+
+    @classmethod
+    async def get_couriers(cls, conn, couriers_ids, statement='couriers'):
+        """
+        reads couriers with one query. If any of them is not found, returns 400 with their ids
+        :param conn: sql connection
+        :param couriers_ids: list of int ids
+        :param statement: name of couriers statement to read with
+        :return: list of courier entities in order of couriers_ids
+        """
+        couriers = {
+            courier['courier_id']: OrdersAssignmentView.format_courier(courier)
+            for courier in await STATEMENTS.fetch(conn, statement, couriers_ids=couriers_ids)
+        }
+
+        missing = [courier_id for courier_id in couriers_ids if courier_id not in couriers]
+        if missing:
+            raise HTTPBadRequest(body={'validation_error': {'couriers': [{'id': id_} for id_ in missing]}})
+        return [couriers[courier_id] for courier_id in couriers_ids]
+
+    @classmethod
+    async def get_couriers_orders(cls, conn, couriers_ids):
+        """
+        selects orders already assigned to couriers
+        :param conn: sql connection
+        :param couriers_ids: list of int ids
+        :return: dict of courier id to list of order records
+        """
+        couriers_orders = defaultdict(list)
+        for order in await STATEMENTS.fetch(conn, 'couriers_orders', couriers_ids=couriers_ids):
+            couriers_orders[order['courier_id']].append(order)
+        return couriers_orders
+
+    @classmethod
+    async def assign_orders(cls, conn, couriers_orders, assignment_time):
+        """
+        writes all assignments with one UPDATE
+        :param conn: sql connection
+        :param couriers_orders: dict of courier id to list of order ids
+        :param assignment_time: datetime
+        """
+        orders_ids, couriers_ids = [], []
+        for courier_id, ids in couriers_orders.items():
+            orders_ids.extend(ids)
+            couriers_ids.extend([courier_id] * len(ids))
+        if orders_ids:
+            await conn.execute(cls.ASSIGN_ORDERS, orders_ids, couriers_ids, assignment_time)
+
+    @docs(summary='Assign orders to many couriers at once')
+    @request_schema(CouriersIdsSchema())
+    @response_schema(OrdersAssignBatchPostResponseSchema(), code=HTTPStatus.OK.value)
+    async def post(self):
+        couriers_ids = list(dict.fromkeys(courier['id'] for courier in self.request['data']['couriers']))
+
+        # Транзакция требуется чтобы в случае ошибки (или отключения клиента,
+        # не дождавшегося ответа) откатить частично добавленные изменения.
+        async with self.pg.transaction() as conn:
+            await self.acquire_locks(conn, couriers_ids)
+            couriers = await self.get_couriers(conn, couriers_ids, self.read_statement('couriers'))
+
+            # Курьерам, у которых уже есть заказы, возвращаются их заказы, как
+            # и в POST /orders/assign
+            assigned = await self.get_couriers_orders(conn, couriers_ids)
+            definer = AvailableOrdersDefiner(self.solver)
+            couriers_orders = await definer.get_orders_batch(
+                conn, [courier for courier in couriers if courier['courier_id'] not in assigned])
+
+            assignment_time = await ISODatetimeFormatConverter.get_now()
+            await self.assign_orders(conn, couriers_orders, assignment_time)
+            await self.pg_router.notify(conn, orders=[id_ for ids in couriers_orders.values() for id_ in ids])
+
+        assign_time = await ISODatetimeFormatConverter.parse_datetime(assignment_time)
+        result = []
+        for courier_id in couriers_ids:
+            if courier_id in assigned:
+                orders = assigned[courier_id]
+                result.append({'courier_id': courier_id,
+                               'orders': [{'id': order['order_id']} for order in orders],
+                               'assign_time': orders[0]['assignment_time'].isoformat("T") + "Z"})
+            elif couriers_orders[courier_id]:
+                result.append({'courier_id': courier_id,
+                               'orders': [{'id': id_} for id_ in couriers_orders[courier_id]],
+                               'assign_time': assign_time})
+            else:
+                result.append({'courier_id': courier_id, 'orders': []})
+
+        return Response(body={'couriers': result}, headers=definer.headers)
@@ -5,13 +5,11 @@ from http import HTTPStatus
 from aiohttp.web_response import Response
 from aiohttp.web_exceptions import HTTPBadRequest
 from aiohttp_apispec import docs, request_schema, response_schema
-from sqlalchemy import and_
 
 from store.api.schema import OrdersCompletePostRequestSchema, OrdersCompletePostResponseSchema
-from store.db.schema import orders_table
 
 from ...domain import ISODatetimeFormatConverter
-from ..query import COURIERS_ORDERS_LAST_COMPLETION_TIME
+from ..query import STATEMENTS, ADD_DELIVERY_STATS, ADD_SEQUENCE_STATS
 
 
 class OrdersCompletionView(BaseView):
@@ -19,15 +17,24 @@ class OrdersCompletionView(BaseView):
 
     @classmethod
     async def define_delivery_start_time(cls, conn, courier_id, order):
-        query = COURIERS_ORDERS_LAST_COMPLETION_TIME.where(and_(
-            orders_table.c.completion_time != None, orders_table.c.assignment_time == order['assignment_time'],
-            orders_table.c.courier_id == courier_id)
+        time = await STATEMENTS.fetchval(
+            conn, 'last_completion_time', courier_id=courier_id, assignment_time=order['assignment_time']
         )
-        time = await conn.fetchval(query)
         delivery_start_time = order['assignment_time'] if not time else time
-        values = {'delivery_start_time': delivery_start_time}
-        query = orders_table.update().values(values).where(orders_table.c.order_id == order['order_id'])
-        await conn.execute(query)
+        await STATEMENTS.execute(
+            conn, 'set_delivery_start_time', order_id=order['order_id'], delivery_start_time=delivery_start_time
+        )
+
+    @staticmethod
+    async def update_stats(conn, courier_id, order):
+        """
+        adds completed order to courier stats
+        :param conn: sql connection
+        :param courier_id: int id
+        :param order: order record before completion
+        """
+        await conn.execute(ADD_DELIVERY_STATS, order['order_id'])
+        await conn.execute(ADD_SEQUENCE_STATS, courier_id, order['assignment_time'])
 
     @docs(summary='Set order as complete')
     @request_schema(OrdersCompletePostRequestSchema())
@@ -39,9 +46,12 @@ class OrdersCompletionView(BaseView):
             courier_id = self.request['data']['courier_id']
             order_id = self.request['data']['order_id']
 
-            query = orders_table.select().where(
-                and_(orders_table.c.courier_id == courier_id, orders_table.c.order_id == order_id))
-            order = await conn.fetchrow(query)
+            # Блокировка нужна, чтобы параллельно завершаемые заказы одного
+            # развоза увидели друг друга (время начала доставки и счетчик
+            # завершенных развозов)
+            await self.acquire_lock(conn, courier_id)
+
+            order = await STATEMENTS.fetchrow(conn, 'courier_order', courier_id=courier_id, order_id=order_id)
 
             if not order or not order['assignment_time']:
                 return HTTPBadRequest()
@@ -54,8 +64,8 @@ class OrdersCompletionView(BaseView):
 
                 await self.define_delivery_start_time(conn, courier_id, order)
 
-                query = orders_table.update()\
-                    .values({'completion_time': completion_time}).where(orders_table.c.order_id == order_id)
-                await conn.execute(query)
+                await STATEMENTS.execute(conn, 'set_completion_time', order_id=order_id, completion_time=completion_time)
+                await self.update_stats(conn, courier_id, order)
+                await self.pg_router.notify(conn, couriers=[courier_id], orders=[order_id])
 
             return Response(body={'order_id': order_id})
@@ -0,0 +1,132 @@
+from store.api.handlers.base import BaseView
+
+from http import HTTPStatus
+
+from aiohttp.web_response import Response
+from aiohttp_apispec import docs, request_schema, response_schema
+from iso8601 import ParseError
+
+from store.api.schema import OrdersCompleteBatchPostRequestSchema, OrdersCompleteBatchPostResponseSchema
+
+from ..query import ADD_DELIVERIES_STATS, ADD_SEQUENCE_STATS
+from ...domain import ISODatetimeFormatConverter
+
+
+class OrdersBatchCompletionView(BaseView):
+    URL_PATH = r'/orders/complete/batch'
+
+    SELECT_ORDERS = """
+        SELECT order_id, courier_id, assignment_time, completion_time
+        FROM orders
+        WHERE order_id = ANY($1::integer[])
+    """
+
+    # Время начала доставки заказа - время завершения предыдущего заказа того
+    # же развоза: последнего из уже завершенных или предыдущего (по времени
+    # завершения) в этом же запросе, а для первого заказа - время назначения.
+    # Цепочки для всех развозов считаются оконной функцией и записываются
+    # одним UPDATE.
+    COMPLETE_ORDERS = """
+        WITH items AS (
+            SELECT * FROM unnest($1::integer[], $2::timestamp[]) AS items (order_id, completion_time)
+        ), chains AS (
+            SELECT items.order_id, items.completion_time,
+                   greatest(
+                       orders.assignment_time,
+                       (
+                           SELECT max(completed.completion_time) FROM orders AS completed
+                           WHERE completed.courier_id = orders.courier_id
+                             AND completed.assignment_time = orders.assignment_time
+                       ),
+                       lag(items.completion_time) OVER (
+                           PARTITION BY orders.courier_id, orders.assignment_time
+                           ORDER BY items.completion_time, items.order_id
+                       )
+                   ) AS delivery_start_time
+            FROM items JOIN orders ON orders.order_id = items.order_id
+            WHERE orders.completion_time IS NULL
+        )
+        UPDATE orders
+        SET completion_time = chains.completion_time, delivery_start_time = chains.delivery_start_time
+        FROM chains
+        WHERE orders.order_id = chains.order_id
+        RETURNING orders.courier_id, orders.assignment_time
+    """
+
+    @classmethod
+    async def check_orders(cls, conn, items):
+        """
+        decides what to do with every item of the batch
+        :param conn: sql connection
+        :param items: list of {'courier_id': int, 'order_id': int, 'complete_time': str}
+        :return: list of statuses in order of items and dict of order id to completion time of orders to complete
+        """
+        orders = {
+            order['order_id']: order
+            for order in await conn.fetch(cls.SELECT_ORDERS, [item['order_id'] for item in items])
+        }
+
+        statuses, to_complete = [], {}
+        for item in items:
+            order = orders.get(item['order_id'])
+            if not order or order['courier_id'] != item['courier_id'] or not order['assignment_time']:
+                statuses.append('not_assigned')
+                continue
+            if order['completion_time']:
+                statuses.append('already_completed')
+                continue
+
+            try:
+                completion_time = await ISODatetimeFormatConverter.parse_iso_string(item['complete_time'])
+            except (ParseError, IndexError):
+                completion_time = None
+            if completion_time is None or \
+                    not await ISODatetimeFormatConverter.compare_iso_strings(order['assignment_time'], completion_time):
+                statuses.append('invalid_complete_time')
+                continue
+
+            statuses.append('completed')
+            to_complete[item['order_id']] = completion_time
+        return statuses, to_complete
+
+    @classmethod
+    async def complete_orders(cls, conn, to_complete):
+        """
+        sets completion and delivery start time of orders and adds them to couriers stats
+        :param conn: sql connection
+        :param to_complete: dict of order id to completion time
+        """
+        if not to_complete:
+            return
+
+        sequences = await conn.fetch(cls.COMPLETE_ORDERS, list(to_complete), list(to_complete.values()))
+        await conn.execute(ADD_DELIVERIES_STATS, list(to_complete))
+        # Каждый затронутый развоз проверяется один раз, после завершения всех
+        # его заказов из запроса
+        await conn.executemany(ADD_SEQUENCE_STATS, {
+            (sequence['courier_id'], sequence['assignment_time']) for sequence in sequences
+        })
+
+    @docs(summary='Set many orders as complete')
+    @request_schema(OrdersCompleteBatchPostRequestSchema())
+    @response_schema(OrdersCompleteBatchPostResponseSchema(), code=HTTPStatus.OK.value)
+    async def post(self):
+        items = self.request['data']['data']
+
+        # Транзакция требуется чтобы в случае ошибки (или отключения клиента,
+        # не дождавшегося ответа) откатить частично добавленные изменения.
+        async with self.pg.transaction() as conn:
+            # Блокировки курьеров, как и в POST /orders/complete
+            await self.acquire_locks(conn, {item['courier_id'] for item in items})
+
+            statuses, to_complete = await self.check_orders(conn, items)
+            await self.complete_orders(conn, to_complete)
+            await self.pg_router.notify(
+                conn, couriers={item['courier_id'] for item in items if item['order_id'] in to_complete},
+                orders=to_complete
+            )
+
+        return Response(body={'orders': [
+            {'order_id': item['order_id'], 'courier_id': item['courier_id'], 'status': status}
+            for item, status in zip(items, statuses)
+        ]})
@@ -4,28 +4,49 @@ from http import HTTPStatus
 from typing import Generator
 
 from aiohttp.web_response import Response
-from aiohttp_apispec import docs, request_schema, response_schema
-from aiomisc import chunk_list
+from aiohttp.web_exceptions import HTTPBadRequest
+from aiohttp_apispec import docs, querystring_schema, request_schema, response_schema
+from sqlalchemy import and_
 
-from store.api.schema import OrdersPostRequestSchema, OrdersIdsSchema
-from store.db.schema import orders_table, delivery_hours_table, orders_delivery_hours_table
-from store.utils.pg import MAX_QUERY_ARGS
+from store.api.domain import TimeIntervalsConverter
+from store.api.payloads import AsyncGenJSONListPayload, accepts_gzip
+from store.api.schema import OrdersPostRequestSchema, OrdersIdsSchema, OrdersListQuerySchema, OrdersListResponseSchema
+from store.db.schema import orders_table
+from store.utils.pg import SelectQuery
+from asyncpg.exceptions import UniqueViolationError
+
+from .orders import OrdersView
+from ..query import keyset_page
 
 
 class OrdersImportsView(BaseView):
     URL_PATH = '/orders'
-    MAX_ORDERS_PER_INSERT = MAX_QUERY_ARGS // len(orders_table.columns)
-    MAX_DELIVERY_HOURS_PER_INSERT = MAX_QUERY_ARGS // len(delivery_hours_table.columns)
-    MAX_COURIERS_DELIVERY_HOURS_PER_INSERT = MAX_QUERY_ARGS // len(orders_delivery_hours_table.columns)
+
+    # Заказы копируются сразу в orders, интервалы доставки - во временную
+    # таблицу, откуда переносятся одним INSERT ... SELECT (см.
+    # CouriersImportsView).
+    CREATE_STAGING_TABLE = (
+        'CREATE TEMPORARY TABLE orders_delivery_hours_import '
+        '(order_id integer, time_start integer, time_finish integer) ON COMMIT DROP'
+    )
+
+    INSERT_DELIVERY_HOURS = """
+        WITH rows AS (
+            SELECT order_id, time_start, time_finish,
+                   nextval(pg_get_serial_sequence('delivery_hours', 'delivery_hours_id')) AS delivery_hours_id
+            FROM orders_delivery_hours_import
+        ), delivery_hours AS (
+            INSERT INTO delivery_hours (delivery_hours_id, time_start, time_finish)
+            SELECT delivery_hours_id, time_start, time_finish FROM rows
+        )
+        INSERT INTO orders_delivery_hours (order_id, delivery_hours_id)
+        SELECT order_id, delivery_hours_id FROM rows
+    """
 
     @classmethod
     def make_orders_table_rows(cls, orders) -> Generator:
         for order in orders:
-            yield {
-                'order_id': order['order_id'],
-                'weight': order['weight'],
-                'region': order['region']
-            }
+            yield order['order_id'], order['weight'], order['region']
 
     @classmethod
     def make_orders_ids(cls, orders) -> Generator:
@@ -38,58 +59,105 @@ class OrdersImportsView(BaseView):
     def make_delivery_hours_table_rows(cls, orders) -> Generator:
         for order in orders:
             for delivery_hour_interval in order['delivery_hours']:
-                start_delivering, stop_delivering = \
-                    delivery_hour_interval.split('-')[0], delivery_hour_interval.split('-')[1]
+                time_start, time_finish = TimeIntervalsConverter.string_to_int_interval(delivery_hour_interval)
+                yield order['order_id'], time_start, time_finish
 
-                yield {
-                    'time_start': str(int(start_delivering.split(":")[0]) * 60 + int(start_delivering.split(":")[1])),
-                    'time_finish': str(int(stop_delivering.split(":")[0]) * 60 + int(stop_delivering.split(":")[1]))
-                }
+    @classmethod
+    async def create_staging_tables(cls, conn):
+        await conn.execute(cls.CREATE_STAGING_TABLE)
 
     @classmethod
-    def make_orders_delivery_hours_table_rows(cls, orders, delivery_hours_ids) -> Generator:
-        id_counter = 0
-        for order in orders:
-            for i in range(len(order['delivery_hours'])):
-                yield {
-                    'order_id': order['order_id'],
-                    'delivery_hours_id': delivery_hours_ids[id_counter]
-                }
-                id_counter += 1
+    async def copy_orders_chunk(cls, conn, orders):
+        """
+        copies orders to db and their delivery hours to staging table
+        :param conn: sql connection
+        :param orders: list of validated orders
+        """
+        try:
+            await conn.copy_records_to_table(
+                'orders', records=cls.make_orders_table_rows(orders),
+                columns=('order_id', 'weight', 'region')
+            )
+        # if orders already exist, throw 400 bad request
+        except UniqueViolationError:
+            raise HTTPBadRequest()
+
+        await conn.copy_records_to_table(
+            'orders_delivery_hours_import', records=cls.make_delivery_hours_table_rows(orders),
+            columns=('order_id', 'time_start', 'time_finish')
+        )
+
+    @classmethod
+    async def move_staging_rows(cls, conn):
+        """
+        moves delivery hours from staging table to db
+        :param conn: sql connection
+        """
+        await conn.execute(cls.INSERT_DELIVERY_HOURS)
+
+    @classmethod
+    async def copy_orders(cls, conn, orders):
+        """
+        writes orders with delivery hours to db
+        :param conn: sql connection
+        :param orders: list of validated orders
+        """
+        await cls.create_staging_tables(conn)
+        await cls.copy_orders_chunk(conn, orders)
+        await cls.move_staging_rows(conn)
+
+    # Условия фильтра state
+    STATES = {
+        'unassigned': orders_table.c.courier_id.is_(None),
+        'assigned': and_(orders_table.c.courier_id.isnot(None), orders_table.c.completion_time.is_(None)),
+        'completed': orders_table.c.completion_time.isnot(None),
+    }
+
+    @classmethod
+    def make_list_query(cls, query, after=None, limit=None, region=None, courier_id=None, state=None):
+        """
+        builds query for page of orders list
+        :param query: orders query to read with
+        :param after: last order id of the previous page
+        :param limit: page size, None for all the rest orders
+        :param region: int id, only orders in region are listed
+        :param courier_id: int id, only orders assigned to courier are listed
+        :param state: unassigned, assigned (but not completed) or completed
+        :return: orders page query
+        """
+        if region is not None:
+            query = query.where(orders_table.c.region == region)
+        if courier_id is not None:
+            query = query.where(orders_table.c.courier_id == courier_id)
+        if state is not None:
+            query = query.where(cls.STATES[state])
+        return keyset_page(query, orders_table.c.order_id, after, limit)
+
+    async def iterate_orders(self, query):
+        """
+        reads orders with server side cursor, so only prefetched rows are kept in memory
+        :param query: orders page query
+        :return: async generator of order entities for output
+        """
+        async for order in SelectQuery(query, self.pg.transaction()):
+            yield OrdersView.format_order(order)
+
+    @docs(summary='List orders ordered by id')
+    @querystring_schema(OrdersListQuerySchema())
+    @response_schema(OrdersListResponseSchema(), code=HTTPStatus.OK.value)
+    async def get(self):
+        query = self.make_list_query(self.orders_query, **self.request['querystring'])
+        # Заказы сериализуются и отправляются по мере чтения из курсора
+        body = AsyncGenJSONListPayload(self.iterate_orders(query), gzip=accepts_gzip(self.request))
+        return Response(body=body)
 
     @docs(summary='Add import with orders information')
     @request_schema(OrdersPostRequestSchema())
     @response_schema(OrdersIdsSchema(), code=HTTPStatus.CREATED.value)
     async def post(self):
         async with self.pg.transaction() as conn:
-
             orders = self.request['data']['data']
-            orders_rows = self.make_orders_table_rows(orders)
-            orders_ids = self.make_orders_ids(orders)
-            delivery_hours_rows = self.make_delivery_hours_table_rows(orders)
-
-            chunked_orders_rows = chunk_list(orders_rows, self.MAX_ORDERS_PER_INSERT)
-            chunked_delivery_hours_rows = chunk_list(delivery_hours_rows, self.MAX_ORDERS_PER_INSERT)
-
-            query = orders_table.insert()
-            for chunk in chunked_orders_rows:
-                await conn.execute(query.values(list(chunk)))
-
-            ids = []
-            query = delivery_hours_table.insert().returning(delivery_hours_table.c.delivery_hours_id)
-            for chunk in chunked_delivery_hours_rows:
-                first_id = await conn.fetchval(query.values(
-                    [{'time_start': int(i['time_start']), 'time_finish': int(i['time_finish'])} for i in list(chunk)]))
-                ids.append([first_id + i for i in range(len(list(chunk)))])
-            ids = [y for x in ids for y in x]
-
-            orders_delivery_hours_table_rows = self.make_orders_delivery_hours_table_rows(orders, ids)
-            chunked_orders_delivery_hours_table_rows = chunk_list(orders_delivery_hours_table_rows,
-                                                                  self.MAX_ORDERS_PER_INSERT)
-
-            query = orders_delivery_hours_table.insert()
-            for chunk in chunked_orders_delivery_hours_table_rows:
-                await conn.execute(query.values(list(chunk)))
-
-            return Response(body={'orders': list(orders_ids)},
+            await self.copy_orders(conn, orders)
+
+            return Response(body={'orders': list(self.make_orders_ids(orders))},
                             status=HTTPStatus.CREATED)
@@ -0,0 +1,34 @@
+from http import HTTPStatus
+
+from aiohttp.web_response import Response
+from aiohttp_apispec import docs, response_schema
+
+from store.api.schema import OrderItemSchema, OrdersIdsSchema
+from store.api.streaming import StreamingItemsValidator
+
+from .orders_imports import OrdersImportsView
+
+
+class OrdersStreamingImportsView(OrdersImportsView):
+    """
+    POST /orders that validates orders while the request body is being read
+    and copies them to db in chunks, so the body is never loaded into memory
+    as a whole
+    """
+    CHUNK_SIZE = 1000
+
+    @docs(summary='Add import with orders information (streaming)')
+    @response_schema(OrdersIdsSchema(), code=HTTPStatus.CREATED.value)
+    async def post(self):
+        validator = StreamingItemsValidator(OrderItemSchema(), 'orders', 'order_id', self.CHUNK_SIZE)
+        orders_ids = []
+
+        async with self.pg.transaction() as conn:
+            await self.create_staging_tables(conn)
+            async for orders in validator.iterate_chunks(self.request.content):
+                await self.copy_orders_chunk(conn, orders)
+                orders_ids.extend(self.make_orders_ids(orders))
+            await self.move_staging_rows(conn)
+
+            return Response(body={'orders': orders_ids},
+                            status=HTTPStatus.CREATED)
@@ -1,15 +1,38 @@
-from .couriers_query import COURIERS_QUERY
-from .orders_query import ORDERS_QUERY
-from .available_orders_query import AVAILABLE_ORDERS_QUERY
+from .couriers_query import COURIERS_QUERY, COURIERS_DENORMALIZED_QUERY
+from .orders_query import ORDERS_QUERY, ORDERS_DENORMALIZED_QUERY
+from .available_orders_query import AVAILABLE_ORDERS_QUERY, CLAIM_ORDERS
 from .available_orders import AvailableOrdersDefiner
 from .couriers_orders_query import COURIERS_ORDERS_SEQUENCES_QUERY, \
     COURIERS_ORDERS_REGIONS_QUERY, COURIERS_ORDERS_LAST_COMPLETION_TIME
+from .couriers_stats_query import COURIERS_STATS_QUERY, ADD_DELIVERY_STATS, ADD_DELIVERIES_STATS, ADD_SEQUENCE_STATS
+from .pagination import keyset_page
+from .statements import STATEMENTS, DENORMALIZED, fetch_courier
+from . import available_orders_query, couriers_orders_query, couriers_stats_query
+
+from store.utils.metrics import register_query_names
+
+# Имена SQL запросов для метрик: claim_orders, add_sequence_stats, ...
+# (запросы из STATEMENTS называются так же, как в реестре)
+for module in (available_orders_query, couriers_orders_query, couriers_stats_query):
+    register_query_names(module)
+
 QUERY = (
     COURIERS_QUERY,
+    COURIERS_DENORMALIZED_QUERY,
+    fetch_courier,
     ORDERS_QUERY,
+    ORDERS_DENORMALIZED_QUERY,
     AVAILABLE_ORDERS_QUERY,
+    CLAIM_ORDERS,
     AvailableOrdersDefiner,
     COURIERS_ORDERS_SEQUENCES_QUERY,
     COURIERS_ORDERS_REGIONS_QUERY,
-    COURIERS_ORDERS_LAST_COMPLETION_TIME
+    COURIERS_ORDERS_LAST_COMPLETION_TIME,
+    COURIERS_STATS_QUERY,
+    ADD_DELIVERY_STATS,
+    ADD_DELIVERIES_STATS,
+    ADD_SEQUENCE_STATS,
+    keyset_page,
+    STATEMENTS,
+    DENORMALIZED
 )
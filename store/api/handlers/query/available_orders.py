@@ -1,22 +1,45 @@
-from store.api.handlers.base import BaseView
-
+from collections import defaultdict
 from http import HTTPStatus
-from typing import Generator
+from typing import Dict, Generator, List
 from datetime import datetime
 from aiohttp.web_response import Response
 from aiohttp.web_exceptions import HTTPNotFound
 from aiohttp_apispec import docs, request_schema, response_schema
-from sqlalchemy import and_, or_
+from asyncpg import Range
 
 from store.api.schema import OrdersAssignPostRequestSchema, OrdersAssignPostResponseSchema
-from store.db.schema import orders_table, couriers_table, orders_delivery_hours_table, delivery_hours_table, \
-    working_hours_table, couriers_working_hours_table
+from store.db.schema import couriers_table, orders_delivery_hours_table, working_hours_table, \
+    couriers_working_hours_table
+
+from store.utils.solver import SolverResult
+from store.utils.tracing import span
 
-from ..query import AVAILABLE_ORDERS_QUERY
-from ...domain import CouriersOrdersResolver, CourierConfigurator
+from .available_orders_query import CLAIM_ORDERS
+from .statements import STATEMENTS
+from ...domain import CourierConfigurator
 
 
 class AvailableOrdersDefiner:
+    # Сколько раз решение пересчитывается без заказов, которые не удалось
+    # заблокировать, прежде чем довольствоваться заблокированными
+    CLAIM_ATTEMPTS = 3
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.result = None
+
+    @property
+    def headers(self):
+        """
+        solver metrics for the response: which strategy was used and how long it took
+        """
+        if self.result is None:
+            return {}
+        return {
+            'X-Solver-Strategy': self.result.strategy,
+            'X-Solver-Duration': '{:.6f}'.format(self.result.duration)
+        }
+
     @staticmethod
     async def get_available_orders(conn, courier, courier_id=None):
         if not courier:
@@ -25,54 +48,247 @@ class AvailableOrdersDefiner:
         if not courier['working_hours'] or not courier['regions']:
             return []
 
-        region_conditions = or_(*list([orders_table.c.region == region for region in courier['regions']]))
-
         # according to the task, ends of interval are not counted,
         # so working_hours and delivery_hours are intersected if
-        # min(working_finish, delivery_finish) - max(working_start, delivery_start) > 0
-        hours_conditions = []
-
-        for working_hours in courier['working_hours']:
-            hours_conditions.append(and_(
-                working_hours['time_start'] > delivery_hours_table.c.time_start,
-                working_hours['time_finish'] > delivery_hours_table.c.time_finish,
-                delivery_hours_table.c.time_finish - working_hours['time_start'] > 0
-            ))
-            hours_conditions.append(and_(
-                working_hours['time_start'] > delivery_hours_table.c.time_start,
-                working_hours['time_finish'] <= delivery_hours_table.c.time_finish,
-                # condition delivery_time_finish - delivery_time_start > 0,
-                # as it is checked in POST /orders request validation
-            ))
-            hours_conditions.append(and_(
-                working_hours['time_start'] <= delivery_hours_table.c.time_start,
-                working_hours['time_finish'] > delivery_hours_table.c.time_finish
-                # condition working_time_finish - working_time_start > 0,
-                # as it is checked in POST /couriers request validation
-            ))
-            hours_conditions.append(and_(
-                working_hours['time_start'] <= delivery_hours_table.c.time_start,
-                working_hours['time_finish'] <= delivery_hours_table.c.time_finish,
-                working_hours['time_finish'] - delivery_hours_table.c.time_start > 0
-            ))
-
-        query = AVAILABLE_ORDERS_QUERY.where(and_(
-            region_conditions,
-            or_(*hours_conditions),
-            orders_table.c.courier_id == courier_id,
-            orders_table.c.weight <= courier['carrying_capacity']
-        ))
-        return await conn.fetch(query)
-
-    async def get_orders(self, conn, courier, courier_id=None):
+        # min(working_finish, delivery_finish) - max(working_start, delivery_start) > 0,
+        # which is exactly what && checks for [time_start, time_finish) ranges.
+        # Regions and working hours are passed as array parameters, so the statement
+        # is the same for every courier and delivery_hours GiST index can be used.
+        working_hours = [Range(hours['time_start'], hours['time_finish']) for hours in courier['working_hours']]
+
+        if courier_id is None:
+            return await STATEMENTS.fetch(
+                conn, 'available_orders', regions=courier['regions'], working_hours=working_hours,
+                max_weight=courier['carrying_capacity']
+            )
+        return await STATEMENTS.fetch(
+            conn, 'courier_available_orders', courier_id=courier_id, regions=courier['regions'],
+            working_hours=working_hours, max_weight=courier['carrying_capacity']
+        )
+
+    async def get_orders(self, conn, courier, courier_id=None, strategy=None):
+        """
+        finds orders to assign to courier
+        :param conn: sql connection
+        :param courier: courier entity
+        :param courier_id: id of courier orders have to be assigned to (None for unassigned orders)
+        :param strategy: 'exact', 'greedy' or None to choose by problem size
+        :return: list of order ids
+        """
         courier['carrying_capacity'] = await CourierConfigurator.get_courier_carrying_capacity(courier['courier_type'])
 
-        orders = await self.get_available_orders(conn, courier, courier_id)
+        with span('AvailableOrdersDefiner.get_available_orders'):
+            orders = await self.get_available_orders(conn, courier, courier_id)
         if not orders:
             return []
 
-        orders_to_assign_ids = await CouriersOrdersResolver(
-            orders_={orders[i]['order_id']: orders[i]['weight'] for i in range(len(orders))},
-            max_weight=courier['carrying_capacity']).resolve_orders()
+        available = {orders[i]['order_id']: orders[i]['weight'] for i in range(len(orders))}
+        if courier_id is not None:
+            # Заказы уже назначены курьеру, конкурировать за них не с кем
+            self.result = await self.solver.resolve_orders(
+                orders=available, max_weight=courier['carrying_capacity'], strategy=strategy)
+            return self.result.ids
+
+        with span('AvailableOrdersDefiner.claim_orders', orders=len(available)):
+            return await self.claim_orders(conn, available, courier['carrying_capacity'], strategy)
+
+    @staticmethod
+    async def lock_orders(conn, orders_ids):
+        """
+        locks unassigned orders, skipping ones locked by concurrent transactions
+        :param conn: sql connection
+        :param orders_ids: list of int ids
+        :return: set of locked order ids
+        """
+        if not orders_ids:
+            return set()
+        return {row['order_id'] for row in await conn.fetch(CLAIM_ORDERS, list(orders_ids))}
+
+    async def claim_orders(self, conn, available, max_weight, strategy=None):
+        """
+        solves assignment and locks the chosen orders. Orders taken by concurrent
+        assignments are excluded and the assignment is solved again, at last on the
+        set of orders that were actually locked
+        :param conn: sql connection
+        :param available: dict of order id to weight
+        :param max_weight: courier carrying capacity
+        :param strategy: 'exact', 'greedy' or None to choose by problem size
+        :return: list of locked order ids to assign
+        """
+        locked = {}
+        for _ in range(self.CLAIM_ATTEMPTS):
+            if not available:
+                break
+            self.result = await self.solver.resolve_orders(orders=available, max_weight=max_weight,
+                                                           strategy=strategy)
+            to_lock = [id_ for id_ in self.result.ids if id_ not in locked]
+            locked.update((id_, available[id_]) for id_ in await self.lock_orders(conn, to_lock))
+
+            lost = [id_ for id_ in self.result.ids if id_ not in locked]
+            if not lost:
+                return self.result.ids
+            for id_ in lost:
+                del available[id_]
+
+        # Заблокированные, но не вошедшие в решение заказы освободятся при
+        # завершении транзакции
+        if not locked:
+            self.result = None
+            return []
+        self.result = await self.solver.resolve_orders(orders=locked, max_weight=max_weight, strategy=strategy)
+        return self.result.ids
+
+    @staticmethod
+    def intersects(order, working_hours):
+        """
+        checks if any of order delivery hours intersects with any of working hours, ends are not counted
+        :param order: order record with time_start and time_finish arrays
+        :param working_hours: list of {'time_start': int, 'time_finish': int}
+        :return: boolean
+        """
+        return any(
+            min(time_finish, hours['time_finish']) - max(time_start, hours['time_start']) > 0
+            for time_start, time_finish in zip(order['time_start'], order['time_finish'])
+            for hours in working_hours
+        )
+
+    @staticmethod
+    async def get_available_orders_batch(conn, couriers):
+        """
+        selects unassigned orders that may be available to any of couriers with one query
+        :param conn: sql connection
+        :param couriers: list of courier entities with carrying capacity
+        :return: list of order records, a superset of orders available to each courier
+        """
+        regions = sorted({region for courier in couriers for region in courier['regions']})
+        working_hours = sorted({
+            (hours['time_start'], hours['time_finish']) for courier in couriers for hours in courier['working_hours']
+        })
+        if not regions or not working_hours:
+            return []
+
+        working_hours = [Range(time_start, time_finish) for time_start, time_finish in working_hours]
+        return await STATEMENTS.fetch(
+            conn, 'available_orders', regions=regions, working_hours=working_hours,
+            max_weight=max(courier['carrying_capacity'] for courier in couriers)
+        )
+
+    async def distribute_orders(self, couriers, orders, strategy=None) -> Dict[int, List[int]]:
+        """
+        solves assignment for couriers one by one on the shared set of orders,
+        so every order goes to one courier at most
+        :param couriers: list of courier entities with carrying capacity
+        :param orders: list of candidate order records
+        :param strategy: 'exact', 'greedy' or None to choose by problem size
+        :return: dict of courier id to list of order ids
+        """
+        regions_orders = defaultdict(list)
+        for order in orders:
+            regions_orders[order['region']].append(order)
+
+        assigned = set()
+        results = []
+        couriers_orders = {}
+        for courier in couriers:
+            available = {
+                order['order_id']: order['weight']
+                for region in courier['regions'] for order in regions_orders[region]
+                if order['order_id'] not in assigned and order['weight'] <= courier['carrying_capacity']
+                and self.intersects(order, courier['working_hours'])
+            }
+            if not available:
+                couriers_orders[courier['courier_id']] = []
+                continue
+
+            result = await self.solver.resolve_orders(
+                orders=available, max_weight=courier['carrying_capacity'], strategy=strategy)
+            results.append(result)
+            assigned.update(result.ids)
+            couriers_orders[courier['courier_id']] = result.ids
+
+        if results:
+            self.result = SolverResult(
+                ids=list(assigned),
+                strategy=','.join(sorted({result.strategy for result in results})),
+                duration=sum(result.duration for result in results)
+            )
+        return couriers_orders
+
+    async def get_orders_batch(self, conn, couriers, strategy=None) -> Dict[int, List[int]]:
+        """
+        finds orders to assign to each of couriers with one query for candidates
+        :param conn: sql connection
+        :param couriers: list of courier entities
+        :param strategy: 'exact', 'greedy' or None to choose by problem size
+        :return: dict of courier id to list of order ids
+        """
+        for courier in couriers:
+            courier['carrying_capacity'] = \
+                await CourierConfigurator.get_courier_carrying_capacity(courier['courier_type'])
+
+        with span('AvailableOrdersDefiner.get_available_orders_batch'):
+            orders = await self.get_available_orders_batch(conn, couriers)
+        with span('AvailableOrdersDefiner.claim_orders_batch', couriers=len(couriers), orders=len(orders)):
+            return await self.claim_orders_batch(conn, couriers, orders, strategy)
+
+    async def claim_orders_batch(self, conn, couriers, orders, strategy=None) -> Dict[int, List[int]]:
+        """
+        distributes orders between couriers and locks only the chosen ones, so concurrent
+        assignments still see the rest. Couriers that lost orders to concurrent assignments
+        are solved again without them, at last on the set of orders that were actually locked
+        :param conn: sql connection
+        :param couriers: list of courier entities with carrying capacity
+        :param orders: list of candidate order records
+        :param strategy: 'exact', 'greedy' or None to choose by problem size
+        :return: dict of courier id to list of locked order ids
+        """
+        couriers_orders = {}
+        results = []
+        locked, lost = set(), set()
+        pending = couriers
+
+        async def distribute(candidates):
+            self.result = None
+            distributed = await self.distribute_orders(pending, candidates, strategy)
+            if self.result is not None:
+                results.append(self.result)
+            return distributed
+
+        for _ in range(self.CLAIM_ATTEMPTS):
+            if not pending:
+                break
+            taken = {id_ for ids in couriers_orders.values() for id_ in ids}
+            distributed = await distribute([
+                order for order in orders if order['order_id'] not in lost and order['order_id'] not in taken
+            ])
+            locked.update(await self.lock_orders(conn, [
+                id_ for ids in distributed.values() for id_ in ids if id_ not in locked
+            ]))
+
+            retry = []
+            for courier in pending:
+                ids = distributed[courier['courier_id']]
+                missing = [id_ for id_ in ids if id_ not in locked]
+                if missing:
+                    lost.update(missing)
+                    retry.append(courier)
+                else:
+                    couriers_orders[courier['courier_id']] = ids
+            pending = retry
+
+        if pending:
+            # Заблокированные, но не вошедшие в решение заказы освободятся при
+            # завершении транзакции
+            taken = {id_ for ids in couriers_orders.values() for id_ in ids}
+            couriers_orders.update(await distribute([
+                order for order in orders if order['order_id'] in locked and order['order_id'] not in taken
+            ]))
 
-        return orders_to_assign_ids
+        self.result = None
+        if results:
+            self.result = SolverResult(
+                ids=[id_ for ids in couriers_orders.values() for id_ in ids],
+                strategy=','.join(sorted({name for result in results for name in result.strategy.split(',')})),
+                duration=sum(result.duration for result in results)
+            )
+        return couriers_orders
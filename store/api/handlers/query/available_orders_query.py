@@ -29,3 +29,13 @@ AVAILABLE_ORDERS_QUERY = select(
 ).group_by(
     orders_table.c.order_id
 )
+
+# Блокирует те из заказов $1, которые еще не назначены и не заблокированы
+# другими транзакциями (назначающими их другим курьерам). Заблокированные
+# строки пропускаются, а не ожидаются, поэтому параллельные назначения в одном
+# регионе не выстраиваются в очередь.
+CLAIM_ORDERS = """
+    SELECT order_id FROM orders
+    WHERE order_id = ANY($1::integer[]) AND courier_id IS NULL
+    FOR UPDATE SKIP LOCKED
+"""
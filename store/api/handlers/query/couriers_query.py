@@ -1,4 +1,6 @@
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, func, literal_column, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import Integer
 from sqlalchemy.orm import join
 
 from store.db.schema import couriers_table, working_hours_table, couriers_working_hours_table, regions_table, couriers_regions_table
@@ -37,3 +39,22 @@ COURIERS_QUERY = select(
 ).group_by(
     couriers_table.c.courier_id
 )
+
+# Читает денормализованные столбцы couriers.regions и couriers.working_hours:
+# одна строка без JOIN и GROUP BY, в том же формате, что и COURIERS_QUERY.
+COURIERS_DENORMALIZED_QUERY = select(
+    [
+        couriers_table.c.courier_id,
+        couriers_table.c.courier_type,
+        couriers_table.c.regions,
+        literal_column(
+            'ARRAY(SELECT lower(hours) FROM unnest(couriers.working_hours) AS hours)', ARRAY(Integer)
+        ).label('time_start'),
+        literal_column(
+            'ARRAY(SELECT upper(hours) FROM unnest(couriers.working_hours) AS hours)', ARRAY(Integer)
+        ).label('time_finish')
+    ]
+).select_from(
+    couriers_table
+)
+
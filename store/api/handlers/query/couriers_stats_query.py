@@ -0,0 +1,61 @@
+from sqlalchemy import func, select
+
+from store.db.schema import couriers_table, couriers_stats_table, couriers_regions_stats_table
+
+
+# Рейтинг считается по минимальному среди регионов среднему времени доставки,
+# заработок - по кол-ву завершенных развозов. Оба значения читаются по
+# первичным ключам таблиц статистики.
+COURIERS_STATS_QUERY = select([
+    couriers_table.c.courier_id,
+    func.coalesce(couriers_stats_table.c.completed_sequences, 0).label('completed_sequences'),
+    select([
+        func.min(couriers_regions_stats_table.c.delivery_time_sum / couriers_regions_stats_table.c.deliveries_count)
+    ]).where(
+        couriers_regions_stats_table.c.courier_id == couriers_table.c.courier_id
+    ).as_scalar().label('delivery_time')
+]).select_from(
+    couriers_table.outerjoin(couriers_stats_table)
+)
+
+# Добавляет доставку завершенного заказа $1 в статистику региона
+ADD_DELIVERY_STATS = """
+    INSERT INTO couriers_regions_stats (courier_id, region, delivery_time_sum, deliveries_count)
+    SELECT courier_id, region, extract(epoch FROM completion_time - delivery_start_time), 1
+    FROM orders
+    WHERE order_id = $1
+    ON CONFLICT (courier_id, region) DO UPDATE SET
+        delivery_time_sum = couriers_regions_stats.delivery_time_sum + excluded.delivery_time_sum,
+        deliveries_count = couriers_regions_stats.deliveries_count + 1
+"""
+
+# То же для завершенных заказов $1 (массив), доставки в одном регионе
+# суммируются, чтобы INSERT не затронул одну строку дважды
+ADD_DELIVERIES_STATS = """
+    INSERT INTO couriers_regions_stats (courier_id, region, delivery_time_sum, deliveries_count)
+    SELECT courier_id, region, sum(extract(epoch FROM completion_time - delivery_start_time)), count(*)
+    FROM orders
+    WHERE order_id = ANY($1::integer[])
+    GROUP BY courier_id, region
+    ON CONFLICT (courier_id, region) DO UPDATE SET
+        delivery_time_sum = couriers_regions_stats.delivery_time_sum + excluded.delivery_time_sum,
+        deliveries_count = couriers_regions_stats.deliveries_count + excluded.deliveries_count
+"""
+
+# Засчитывает курьеру $1 развоз, назначенный в $2, если в нем есть
+# доставленные заказы и не осталось недоставленных. Вызывается после
+# завершения заказа и после снятия заказов с курьера (оставшиеся могут
+# оказаться доставлены), под advisory-блокировкой курьера.
+ADD_SEQUENCE_STATS = """
+    INSERT INTO couriers_stats (courier_id, completed_sequences)
+    SELECT $1, 1
+    WHERE EXISTS (
+        SELECT 1 FROM orders
+        WHERE courier_id = $1 AND assignment_time = $2 AND completion_time IS NOT NULL
+    ) AND NOT EXISTS (
+        SELECT 1 FROM orders
+        WHERE courier_id = $1 AND assignment_time = $2 AND completion_time IS NULL
+    )
+    ON CONFLICT (courier_id) DO UPDATE SET
+        completed_sequences = couriers_stats.completed_sequences + 1
+"""
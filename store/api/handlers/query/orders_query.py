@@ -1,4 +1,6 @@
-from sqlalchemy import func, select
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.types import Integer
 
 from store.db.schema import orders_table, delivery_hours_table, orders_delivery_hours_table
 
@@ -40,3 +42,25 @@ ORDERS_QUERY = select(
 ).group_by(
     orders_table.c.order_id
 )
+
+# Читает денормализованный столбец orders.delivery_hours без JOIN и GROUP BY,
+# в том же формате, что и ORDERS_QUERY.
+ORDERS_DENORMALIZED_QUERY = select(
+    [
+        orders_table.c.order_id,
+        orders_table.c.courier_id,
+        orders_table.c.weight,
+        orders_table.c.region,
+        func.array_remove(array([orders_table.c.assignment_time]), None).label('assignment_time'),
+        func.array_remove(array([orders_table.c.delivery_start_time]), None).label('delivery_start_time'),
+        func.array_remove(array([orders_table.c.completion_time]), None).label('completion_time'),
+        literal_column(
+            'ARRAY(SELECT lower(hours) FROM unnest(orders.delivery_hours) AS hours)', ARRAY(Integer)
+        ).label('time_start'),
+        literal_column(
+            'ARRAY(SELECT upper(hours) FROM unnest(orders.delivery_hours) AS hours)', ARRAY(Integer)
+        ).label('time_finish')
+    ]
+).select_from(
+    orders_table
+)
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from sqlalchemy import Column
+from sqlalchemy.sql import Select
+
+
+def keyset_page(query: Select, column: Column, after: Optional[int] = None, limit: Optional[int] = None) -> Select:
+    """
+    restricts query to one page ordered by unique column: rows with column value greater than after.
+    Unlike OFFSET, the page is read by index whatever its position is
+    :param query: select query
+    :param column: unique indexed column to order by, usually primary key
+    :param after: last column value of the previous page, None for the first page
+    :param limit: page size, None to read all the rest rows
+    :return: page query
+    """
+    if after is not None:
+        query = query.where(column > after)
+    query = query.order_by(column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
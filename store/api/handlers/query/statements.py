@@ -0,0 +1,153 @@
+from sqlalchemy import Integer, and_, bindparam, cast, func, select
+from sqlalchemy.dialects.postgresql import INT4RANGE, insert
+
+from store.db.schema import (
+    couriers_table, couriers_regions_table, couriers_working_hours_table, working_hours_table, orders_table,
+    delivery_hours_table, regions_table
+)
+from store.utils.pg import any_of, array_param, equals_any
+from store.utils.statements import StatementsRegistry
+
+from .couriers_query import COURIERS_QUERY, COURIERS_DENORMALIZED_QUERY
+from .orders_query import ORDERS_QUERY, ORDERS_DENORMALIZED_QUERY
+from .available_orders_query import AVAILABLE_ORDERS_QUERY
+from .couriers_orders_query import COURIERS_ORDERS_LAST_COMPLETION_TIME
+from .couriers_stats_query import COURIERS_STATS_QUERY
+
+# Суффикс запросов, читающих денормализованные столбцы (--pg-denormalized-reads)
+DENORMALIZED = '_denormalized'
+
+STATEMENTS = StatementsRegistry()
+
+# Чтение курьеров и заказов: по варианту на каждый способ хранения
+for suffix, couriers_query, orders_query in (
+    ('', COURIERS_QUERY, ORDERS_QUERY),
+    (DENORMALIZED, COURIERS_DENORMALIZED_QUERY, ORDERS_DENORMALIZED_QUERY),
+):
+    STATEMENTS.register('courier' + suffix, couriers_query.where(
+        couriers_table.c.courier_id == bindparam('courier_id')
+    ))
+    STATEMENTS.register('couriers' + suffix, couriers_query.where(
+        equals_any(couriers_table.c.courier_id, key='couriers_ids')
+    ))
+    STATEMENTS.register('order' + suffix, orders_query.where(
+        orders_table.c.order_id == bindparam('order_id')
+    ))
+    STATEMENTS.register('courier_orders' + suffix, orders_query.where(
+        orders_table.c.courier_id == bindparam('courier_id')
+    ))
+
+STATEMENTS.register('courier_stats', COURIERS_STATS_QUERY.where(
+    couriers_table.c.courier_id == bindparam('courier_id')
+))
+
+STATEMENTS.register('courier_incomplete_orders', orders_table.select().where(and_(
+    orders_table.c.courier_id == bindparam('courier_id'), orders_table.c.completion_time.is_(None)
+)))
+
+STATEMENTS.register('couriers_orders', orders_table.select().where(
+    equals_any(orders_table.c.courier_id, key='couriers_ids')
+).order_by(orders_table.c.order_id))
+
+STATEMENTS.register('courier_order', orders_table.select().where(and_(
+    orders_table.c.courier_id == bindparam('courier_id'), orders_table.c.order_id == bindparam('order_id')
+)))
+
+STATEMENTS.register('courier_working_hours', couriers_working_hours_table.select().where(
+    couriers_working_hours_table.c.courier_id == bindparam('courier_id')
+))
+
+STATEMENTS.register('update_courier_type', couriers_table.update().values(
+    courier_type=bindparam('courier_type')
+).where(couriers_table.c.courier_id == bindparam('courier_id')))
+
+# Добавление регионов и рабочих часов курьера (PATCH /couriers): значения
+# передаются массивами, INSERT ... SELECT unnest(...)
+STATEMENTS.register('add_regions', insert(regions_table).from_select(
+    [regions_table.c.region_id], select([func.unnest(array_param(key='regions_ids'))])
+).on_conflict_do_nothing())
+
+STATEMENTS.register('add_courier_regions', couriers_regions_table.insert().from_select(
+    [couriers_regions_table.c.courier_id, couriers_regions_table.c.region_id],
+    select([cast(bindparam('courier_id'), Integer), func.unnest(array_param(key='regions_ids'))])
+))
+
+STATEMENTS.register('add_working_hours', working_hours_table.insert().from_select(
+    [working_hours_table.c.time_start, working_hours_table.c.time_finish],
+    select([func.unnest(array_param(key='time_start')), func.unnest(array_param(key='time_finish'))])
+).returning(working_hours_table.c.working_hours_id))
+
+STATEMENTS.register('add_courier_working_hours', couriers_working_hours_table.insert().from_select(
+    [couriers_working_hours_table.c.courier_id, couriers_working_hours_table.c.working_hours_id],
+    select([cast(bindparam('courier_id'), Integer), func.unnest(array_param(key='working_hours_ids'))])
+))
+
+STATEMENTS.register('remove_courier_regions', couriers_regions_table.delete().where(and_(
+    couriers_regions_table.c.courier_id == bindparam('courier_id'),
+    equals_any(couriers_regions_table.c.region_id, key='regions_ids')
+)))
+
+STATEMENTS.register('remove_courier_working_hours', couriers_working_hours_table.delete().where(and_(
+    couriers_working_hours_table.c.courier_id == bindparam('courier_id'),
+    equals_any(couriers_working_hours_table.c.working_hours_id, key='working_hours_ids')
+)))
+
+STATEMENTS.register('remove_working_hours', working_hours_table.delete().where(
+    equals_any(working_hours_table.c.working_hours_id, key='working_hours_ids')
+))
+
+STATEMENTS.register('assign_orders', orders_table.update().values(
+    courier_id=bindparam('assigned_courier_id'), assignment_time=bindparam('assignment_time')
+).where(equals_any(orders_table.c.order_id, key='orders_ids')))
+
+STATEMENTS.register('unassign_orders', orders_table.update().values(
+    courier_id=None, assignment_time=None, delivery_start_time=None
+).where(equals_any(orders_table.c.order_id, key='orders_ids')))
+
+STATEMENTS.register('last_completion_time', COURIERS_ORDERS_LAST_COMPLETION_TIME.where(and_(
+    orders_table.c.completion_time.isnot(None),
+    orders_table.c.assignment_time == bindparam('assignment_time'),
+    orders_table.c.courier_id == bindparam('courier_id')
+)))
+
+STATEMENTS.register('set_delivery_start_time', orders_table.update().values(
+    delivery_start_time=bindparam('delivery_start_time')
+).where(orders_table.c.order_id == bindparam('order_id')))
+
+STATEMENTS.register('set_completion_time', orders_table.update().values(
+    completion_time=bindparam('completion_time')
+).where(orders_table.c.order_id == bindparam('order_id')))
+
+# Заказы, которые могут быть доставлены курьером: свободные и уже
+# назначенные ему (при изменении курьера). Регионы и рабочие часы передаются
+# массивами.
+for name, courier_condition in (
+    ('available_orders', orders_table.c.courier_id.is_(None)),
+    ('courier_available_orders', orders_table.c.courier_id == bindparam('courier_id')),
+):
+    STATEMENTS.register(name, AVAILABLE_ORDERS_QUERY.where(and_(
+        equals_any(orders_table.c.region, key='regions'),
+        delivery_hours_table.c.time_range.op('&&')(any_of(type_=INT4RANGE, key='working_hours')),
+        courier_condition,
+        orders_table.c.weight <= bindparam('max_weight')
+    )))
+
+
+async def fetch_courier(conn, courier_id, statement='courier', cache=None):
+    """
+    reads courier row with regions and working hours, through couriers cache if it is given
+    :param conn: sql connection
+    :param courier_id: int id
+    :param statement: name of couriers statement to read with
+    :param cache: CouriersCache or None
+    :return: courier record or None if courier does not exist
+    """
+    courier = cache.get(courier_id) if cache is not None else None
+    if courier is not None:
+        return courier
+
+    token = cache.token() if cache is not None else None
+    courier = await STATEMENTS.fetchrow(conn, statement, courier_id=courier_id)
+    if courier is not None and cache is not None:
+        cache.set(courier_id, courier, token)
+    return courier
@@ -1,5 +1,7 @@
 import logging
 from http import HTTPStatus
+from random import random
+from time import perf_counter
 from typing import Mapping, Optional
 
 from aiohttp.web_exceptions import (
@@ -7,11 +9,18 @@ from aiohttp.web_exceptions import (
 )
 from aiohttp.web_middlewares import middleware
 from aiohttp.web_request import Request
+from aiohttp.web_urldispatcher import MatchInfoError
 from marshmallow import ValidationError
 
 from store.api.payloads import JsonPayload
+from store.utils.metrics import REQUEST_DURATION, REQUESTS_IN_PROGRESS
+from store.utils.tracing import trace
 
 
+# Заголовок, с которым запрос трассируется и попадает в GET /debug/slow
+# независимо от --trace-sample-rate и времени выполнения
+TRACE_HEADER = 'X-Trace-Request'
+
 log = logging.getLogger(__name__)
 
 
@@ -49,6 +58,62 @@ def handle_validation_error(error: ValidationError, *_):
     raise format_validation_http_error(HTTPBadRequest, error.messages)
 
 
+def handler_name(request: Request) -> str:
+    if isinstance(request.match_info, MatchInfoError):
+        return 'unmatched'
+    return getattr(request.match_info.handler, '__name__', 'unknown')
+
+
+@middleware
+async def metrics_middleware(request: Request, handler):
+    """
+    Замеряет время обработки запросов и кол-во запросов в обработке по
+    обработчикам (View). Запросы на несуществующие URL учитываются вместе.
+    """
+    name = handler_name(request)
+    in_progress = REQUESTS_IN_PROGRESS.labels(name, request.method)
+    in_progress.inc()
+    started = perf_counter()
+    status = HTTPStatus.INTERNAL_SERVER_ERROR.value
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except HTTPException as err:
+        status = err.status
+        raise
+    finally:
+        in_progress.dec()
+        REQUEST_DURATION.labels(name, request.method, status).observe(perf_counter() - started)
+
+
+@middleware
+async def tracing_middleware(request: Request, handler):
+    """
+    Трассирует долю запросов --trace-sample-rate и запросы с заголовком
+    TRACE_HEADER, медленные трассы сохраняются в app['slow_requests'].
+    """
+    forced = TRACE_HEADER in request.headers
+    sample_rate = request.app['trace_sample_rate']
+    if not forced and (not sample_rate or random() >= sample_rate):
+        return await handler(request)
+
+    # trace() завершает корневой span при выходе из блока, поэтому статус
+    # ответа и трасса записываются уже снаружи него
+    status = HTTPStatus.INTERNAL_SERVER_ERROR.value
+    try:
+        with trace(handler_name(request), method=request.method, path=request.path) as root:
+            response = await handler(request)
+        status = response.status
+        return response
+    except HTTPException as err:
+        status = err.status
+        raise
+    finally:
+        root.attrs['status'] = status
+        request.app['slow_requests'].add(root, force=forced)
+
+
 @middleware
 async def error_middleware(request: Request, handler):
     try:
@@ -1,13 +1,21 @@
 import json
-from datetime import date
+import logging
+import zlib
+from datetime import date, datetime
 from decimal import Decimal
 from functools import partial, singledispatch
-from typing import Any
+from typing import Any, Callable, Optional
 
-from aiohttp.payload import JsonPayload as BaseJsonPayload, Payload
-from aiohttp.typedefs import JSONEncoder
+from aiohttp import hdrs
+from aiohttp.payload import BytesPayload, Payload
+from aiohttp.web_request import Request
 from asyncpg import Record
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 # from store.api.schema import BIRTH_DATE_FORMAT
 
 
@@ -43,6 +51,14 @@ def convert_date(value: date):
 """
 
 
+@convert.register(datetime)
+def convert_datetime(value: datetime):
+    """
+    Дата и время сериализуются в ISO 8601, так же как это делает orjson.
+    """
+    return value.isoformat()
+
+
 @convert.register(Decimal)
 def convert_decimal(value: Decimal):
     """
@@ -55,54 +71,127 @@ def convert_decimal(value: Decimal):
 dumps = partial(json.dumps, default=convert, ensure_ascii=False)
 
 
-class JsonPayload(BaseJsonPayload):
+def dumps_json(value: Any) -> bytes:
+    return dumps(value).encode('utf-8')
+
+
+def dumps_orjson(value: Any) -> bytes:
+    # orjson сам сериализует datetime, date и dataclass'ы, а для остальных
+    # объектов (asyncpg.Record, Decimal) вызывает convert.
+    return orjson.dumps(value, default=convert)
+
+
+# Функции сериализации в JSON (в кодировке utf-8), выбираются аргументом
+# --json-encoder. Если orjson не установлен, используется модуль json.
+ENCODERS = {
+    'json': dumps_json,
+    'orjson': dumps_orjson,
+}
+DEFAULT_ENCODER = 'orjson' if orjson is not None else 'json'
+
+# Формат gzip (а не zlib) для zlib.compressobj
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+log = logging.getLogger(__name__)
+
+encode = ENCODERS['json']
+
+
+def set_encoder(name: str) -> Callable[[Any], bytes]:
+    """
+    Выбирает функцию сериализации для JsonPayload и AsyncGenJSONListPayload.
+    """
+    global encode
+    if name == 'orjson' and orjson is None:
+        log.warning('orjson is not installed, falling back to json encoder')
+        name = 'json'
+    encode = ENCODERS[name]
+    return encode
+
+
+class JsonPayload(BytesPayload):
     """
     Заменяет функцию сериализации на более "умную" (умеющую упаковывать в JSON
-    объекты asyncpg.Record и другие сущности).
+    объекты asyncpg.Record и другие сущности) и быструю (см. set_encoder).
     """
     def __init__(self,
                  value: Any,
                  encoding: str = 'utf-8',
                  content_type: str = 'application/json',
-                 dumps: JSONEncoder = dumps,
                  *args: Any,
                  **kwargs: Any) -> None:
-        super().__init__(value, encoding, content_type, dumps, *args, **kwargs)
+        super().__init__(encode(value), content_type=content_type,
+                         encoding=encoding, *args, **kwargs)
 
 
 class AsyncGenJSONListPayload(Payload):
     """
     Итерируется по объектам AsyncIterable, частями сериализует данные из них
     в JSON и отправляет клиенту.
+
+    Сериализованные строки накапливаются в буфере и отправляются, когда его
+    размер достигает chunk_size байт (или в нем набирается chunk_rows строк),
+    чтобы не делать запись в транспорт и переключение корутин на каждую
+    строку. С gzip=True ответ сжимается по мере отправки.
     """
+    CHUNK_SIZE = 64 * 1024
+
     def __init__(self, value, encoding: str = 'utf-8',
                  content_type: str = 'application/json',
                  root_object: str = 'data',
+                 chunk_size: int = CHUNK_SIZE,
+                 chunk_rows: Optional[int] = None,
+                 gzip: bool = False,
                  *args, **kwargs):
         self.root_object = root_object
+        self.chunk_size = chunk_size
+        self.chunk_rows = chunk_rows
+        self.gzip = gzip
         super().__init__(value, content_type=content_type, encoding=encoding,
                          *args, **kwargs)
+        if gzip:
+            self.headers[hdrs.CONTENT_ENCODING] = 'gzip'
+            self.headers[hdrs.VARY] = hdrs.ACCEPT_ENCODING
 
     async def write(self, writer):
+        compressor = zlib.compressobj(wbits=GZIP_WBITS) if self.gzip else None
+
+        async def flush(data: bytes):
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                await writer.write(data)
+
         # Начало объекта
-        await writer.write(
-            ('{"%s":[' % self.root_object).encode(self._encoding)
-        )
+        buffer = bytearray(('{"%s":[' % self.root_object).encode(self._encoding))
+        rows = 0
 
-        first = True
         async for row in self._value:
-            # Перед первой строчкой запятая не нужнаа
-            if not first:
-                await writer.write(b',')
-            else:
-                first = False
+            # Перед первой строчкой запятая не нужна
+            if rows:
+                buffer += b','
+            buffer += encode(row)
+            rows += 1
 
-            await writer.write(dumps(row).encode(self._encoding))
+            if len(buffer) >= self.chunk_size or (self.chunk_rows and rows % self.chunk_rows == 0):
+                await flush(buffer)
+                buffer = bytearray()
 
         # Конец объекта
-        await writer.write(b']}')
+        buffer += b']}'
+        await flush(buffer)
+        if compressor is not None:
+            await writer.write(compressor.flush())
+
+
+def accepts_gzip(request: Request) -> bool:
+    """
+    Проверяет, что клиент готов принять ответ, сжатый gzip.
+    """
+    return 'gzip' in request.headers.get(hdrs.ACCEPT_ENCODING, '').lower()
 
 
 __all__ = (
-    'JsonPayload', 'AsyncGenJSONListPayload'
+    'JsonPayload', 'AsyncGenJSONListPayload', 'ENCODERS', 'DEFAULT_ENCODER',
+    'set_encoder', 'accepts_gzip'
 )
@@ -3,7 +3,19 @@ from marshmallow.fields import Float, Int, List, Nested, Str
 from marshmallow.validate import Length, OneOf, Range
 
 from store.db.schema import CourierType
-from store.api.domain import TimeIntervalsConverter
+from store.api.domain import TimeIntervalsConverter, UniqueIdsValidator
+
+
+# Максимальное кол-во курьеров (заказов) в одном импорте
+MAX_IMPORT_ITEMS = 10000
+
+# По умолчанию размер запроса к aiohttp ограничен 1 мегабайтом:
+# https://docs.aiohttp.org/en/stable/web_reference.html#aiohttp.web.Application
+# Размер запроса со 10 000 жителей и 2000 связей (с учетом максимальной длины
+# строк и кодировки json с параметром ensure_ascii=True) может занимать
+# ~63 мегабайт:
+MEGABYTE = 1024 ** 2
+MAX_REQUEST_SIZE = 70 * MEGABYTE
 
 
 class CouriersNested(Nested):
@@ -37,21 +49,11 @@ class CourierItemSchema(Schema):
 
 class CouriersPostRequestSchema(Schema):
     data = CouriersNested(CourierItemSchema, many=True, required=True,
-                          validate=Length(max=10000))
+                          validate=Length(max=MAX_IMPORT_ITEMS))
 
     @validates_schema
     def validate_unique_courier_id(self, data, **_):
-        courier_ids_set = set()
-        couriers_ids_list = list()
-        for courier in data['data']:
-            courier_ids_set.add(courier['courier_id'])
-            couriers_ids_list.append(courier['courier_id'])
-        if len(couriers_ids_list) != len(courier_ids_set):
-            raise ValidationError(
-                {'data': {'validation_error': [
-                    {'id': i
-                     } for i in [item for item in courier_ids_set if couriers_ids_list.count(item) > 1]
-                ]}})
+        UniqueIdsValidator.validate_unique_ids(courier['courier_id'] for courier in data['data'])
 
 
 class SingleIdSchema(Schema):
@@ -63,6 +65,22 @@ class CouriersIdsSchema(Schema):
                       validate=Length(max=10000))
 
 
+class ListQuerySchema(Schema):
+    # keyset pagination: page starts after the last id of the previous one,
+    # without limit all the rest is returned
+    after = Int(validate=Range(min=0))
+    limit = Int(validate=Range(min=1))
+
+
+class CouriersListQuerySchema(ListQuerySchema):
+    region = Int(validate=Range(min=0))
+    type = Str(validate=OneOf([courier_type.value for courier_type in CourierType]))
+
+
+class CouriersListResponseSchema(Schema):
+    data = Nested(CourierItemSchema, many=True, required=True)
+
+
 class CourierGetResponseSchema(CourierItemSchema):
     rating = Float(validate=Range(min=0), strict=True)
     earnings = Int(validate=Range(min=0), strict=True)
@@ -93,21 +111,11 @@ class OrderItemSchema(Schema):
 
 class OrdersPostRequestSchema(Schema):
     data = OrdersNested(OrderItemSchema, many=True, required=True,
-                        validate=Length(max=10000))
+                        validate=Length(max=MAX_IMPORT_ITEMS))
 
     @validates_schema
-    def validate_unique_courier_id(self, data, **_):
-        ids_set = set()
-        ids_list = list()
-        for order in data['data']:
-            ids_set.add(order['order_id'])
-            ids_list.append(order['order_id'])
-        if len(ids_list) != len(ids_set):
-            raise ValidationError(
-                {'data': {'validation_error': [
-                    {'id': i
-                     } for i in [item for item in ids_set if ids_list.count(item) > 1]
-                ]}})
+    def validate_unique_order_id(self, data, **_):
+        UniqueIdsValidator.validate_unique_ids(order['order_id'] for order in data['data'])
 
 
 class OrdersIdsSchema(Schema):
@@ -122,6 +130,19 @@ class OrdersGetResponseSchema(OrderItemSchema):
     complete_time = Str(strict=True)
 
 
+ORDER_STATES = ('unassigned', 'assigned', 'completed')
+
+
+class OrdersListQuerySchema(ListQuerySchema):
+    region = Int(validate=Range(min=0))
+    courier_id = Int(validate=Range(min=0))
+    state = Str(validate=OneOf(ORDER_STATES))
+
+
+class OrdersListResponseSchema(Schema):
+    data = Nested(OrdersGetResponseSchema, many=True, required=True)
+
+
 class OrdersAssignPostResponseSchema(Schema):
     # courier can't carry more than maximum amount of orders with minimal weight
     orders = Nested(SingleIdSchema, many=True, required=True,
@@ -129,6 +150,15 @@ class OrdersAssignPostResponseSchema(Schema):
     assign_time = Str()
 
 
+class CourierAssignmentSchema(OrdersAssignPostResponseSchema):
+    courier_id = Int(validate=Range(min=0), strict=True, required=True)
+
+
+class OrdersAssignBatchPostResponseSchema(Schema):
+    couriers = Nested(CourierAssignmentSchema, many=True, required=True,
+                      validate=Length(max=10000))
+
+
 class OrdersAssignPostRequestSchema(Schema):
     courier_id = Int(validate=Range(min=0), strict=True, required=True)
 
@@ -141,3 +171,26 @@ class OrdersCompletePostRequestSchema(Schema):
 
 class OrdersCompletePostResponseSchema(Schema):
     order_id = Int(validate=Range(min=0), strict=True, required=True)
+
+
+class OrdersCompleteBatchPostRequestSchema(Schema):
+    data = Nested(OrdersCompletePostRequestSchema, many=True, required=True,
+                  validate=Length(max=10000))
+
+    @validates_schema
+    def validate_unique_order_id(self, data, **_):
+        UniqueIdsValidator.validate_unique_ids(order['order_id'] for order in data['data'])
+
+
+ORDER_COMPLETION_STATUSES = ('completed', 'already_completed', 'not_assigned', 'invalid_complete_time')
+
+
+class OrderCompletionResultSchema(Schema):
+    order_id = Int(validate=Range(min=0), strict=True, required=True)
+    courier_id = Int(validate=Range(min=0), strict=True, required=True)
+    status = Str(validate=OneOf(ORDER_COMPLETION_STATUSES), required=True)
+
+
+class OrdersCompleteBatchPostResponseSchema(Schema):
+    orders = Nested(OrderCompletionResultSchema, many=True, required=True,
+                    validate=Length(max=10000))
@@ -0,0 +1,147 @@
+from typing import AsyncIterator, List, Mapping
+
+import ijson
+from aiohttp.streams import StreamReader
+from aiohttp.web_exceptions import HTTPBadRequest, HTTPRequestEntityTooLarge
+from marshmallow import Schema, ValidationError
+
+from store.api.domain import UniqueIdsValidator
+from store.api.schema import MAX_IMPORT_ITEMS, MAX_REQUEST_SIZE
+
+
+ROOT_FIELD = 'data'
+ITEM_PREFIX = ROOT_FIELD + '.item'
+
+
+class LimitedStream:
+    """
+    Ограничивает размер тела запроса, как client_max_size для запросов,
+    читаемых целиком.
+    """
+    __slots__ = ('stream', 'max_size', 'size')
+
+    def __init__(self, stream: StreamReader, max_size: int):
+        self.stream = stream
+        self.max_size = max_size
+        self.size = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        data = await self.stream.read(n)
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise HTTPRequestEntityTooLarge(max_size=self.max_size, actual_size=self.size)
+        return data
+
+
+async def iterate_items(stream: StreamReader) -> AsyncIterator:
+    """
+    Разбирает JSON вида {"data": [...]} по мере получения данных и отдает
+    элементы массива data по одному, не загружая тело запроса в память
+    целиком.
+    """
+    has_root_field = False
+    builder = None
+    try:
+        async for prefix, event, value in ijson.parse_async(stream, use_float=True):
+            if prefix == '' and event == 'map_key' and value != ROOT_FIELD:
+                # Как и схемы, не допускаем других полей запроса
+                raise ValidationError({value: ['Unknown field.']})
+
+            if prefix == ROOT_FIELD:
+                if event == 'start_array':
+                    has_root_field = True
+                elif event != 'end_array':
+                    raise ValidationError({ROOT_FIELD: ['Invalid type.']})
+                continue
+
+            if not prefix.startswith(ITEM_PREFIX):
+                continue
+
+            if builder is None:
+                if prefix == ITEM_PREFIX and event not in ('start_map', 'start_array'):
+                    # Скалярный элемент массива, он не пройдет валидацию схемой
+                    yield value
+                    continue
+                builder = ijson.ObjectBuilder()
+
+            builder.event(event, value)
+            if prefix == ITEM_PREFIX and event in ('end_map', 'end_array'):
+                yield builder.value
+                builder = None
+    except ijson.JSONError:
+        raise HTTPBadRequest()
+
+    if not has_root_field:
+        raise ValidationError({ROOT_FIELD: ['Missing data for required field.']})
+
+
+class StreamingItemsValidator:
+    """
+    Валидирует элементы массива data по одному (по мере чтения тела запроса)
+    и отдает провалидированные элементы пачками по chunk_size штук.
+
+    Ошибки формируются так же, как при валидации всего запроса схемами
+    CouriersPostRequestSchema и OrdersPostRequestSchema: после первой
+    некорректной записи пачки перестают отдаваться, но чтение и валидация
+    продолжаются, чтобы вернуть клиенту полный список некорректных записей.
+    """
+    __slots__ = ('item_schema', 'items_name', 'id_field', 'chunk_size',
+                 'max_items', 'max_size', 'invalid', 'unique_ids')
+
+    def __init__(self, item_schema: Schema, items_name: str, id_field: str,
+                 chunk_size: int, max_items: int = MAX_IMPORT_ITEMS,
+                 max_size: int = MAX_REQUEST_SIZE):
+        self.item_schema = item_schema
+        self.items_name = items_name
+        self.id_field = id_field
+        self.chunk_size = chunk_size
+        self.max_items = max_items
+        self.max_size = max_size
+        self.invalid = []
+        self.unique_ids = UniqueIdsValidator()
+
+    def validate_item(self, index: int, item) -> Mapping:
+        try:
+            item = self.item_schema.load(item)
+        except ValidationError:
+            self.invalid.append(index)
+            return None
+
+        self.unique_ids.add(item[self.id_field])
+        return item
+
+    def raise_errors(self):
+        if self.invalid:
+            raise ValidationError({ROOT_FIELD: {'validation_error': {
+                self.items_name: [{'id': i} for i in self.invalid]
+            }}})
+        self.unique_ids.validate()
+
+    async def iterate_chunks(self, stream: StreamReader) -> AsyncIterator[List[Mapping]]:
+        chunk = []
+        index = 0
+        async for item in iterate_items(LimitedStream(stream, self.max_size)):
+            if index == self.max_items:
+                # Дальше тело запроса не читается, транзакция импорта
+                # откатывается
+                raise ValidationError({ROOT_FIELD: [
+                    'Longer than maximum length {}.'.format(self.max_items)
+                ]})
+            item = self.validate_item(index, item)
+            index += 1
+            if item is None or self.invalid or self.unique_ids.duplicates:
+                # Данные уже некорректны, запись в БД не нужна
+                chunk.clear()
+                continue
+
+            chunk.append(item)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+
+        self.raise_errors()
+        if chunk:
+            yield chunk
+
+
+__all__ = ('StreamingItemsValidator',)
@@ -1,9 +1,10 @@
 from enum import Enum, unique
 
 from sqlalchemy import (
-    Column, Date, Enum as PgEnum, ForeignKey, ForeignKeyConstraint, Integer,
+    Column, Computed, Date, Enum as PgEnum, ForeignKey, ForeignKeyConstraint, Index, Integer,
     MetaData, String, Table, Float, DateTime
 )
+from sqlalchemy.dialects.postgresql import ARRAY, INT4RANGE
 
 # SQLAlchemy рекомендует использовать единый формат для генерации названий для
 # индексов и внешних ключей.
@@ -33,7 +34,11 @@ couriers_table = Table(
     'couriers',
     metadata,
     Column('courier_id', Integer, primary_key=True),
-    Column('courier_type', PgEnum(CourierType, name='type'), nullable=False)
+    Column('courier_type', PgEnum(CourierType, name='type'), nullable=False),
+    # Денормализованные копии couriers_regions и couriers_working_hours,
+    # поддерживаются триггерами (см. миграцию b7e2f4c9a613)
+    Column('regions', ARRAY(Integer), nullable=False, server_default='{}'),
+    Column('working_hours', ARRAY(INT4RANGE), nullable=False, server_default='{}')
 )
 
 regions_table = Table(
@@ -75,7 +80,9 @@ orders_table = Table(
     Column('region', Integer, nullable=False),
     Column('assignment_time', DateTime, default=None),
     Column('delivery_start_time', DateTime, default=None),
-    Column('completion_time', DateTime, default=None)
+    Column('completion_time', DateTime, default=None),
+    # Денормализованная копия orders_delivery_hours, поддерживается триггерами
+    Column('delivery_hours', ARRAY(INT4RANGE), nullable=False, server_default='{}')
 )
 
 delivery_hours_table = Table(
@@ -83,7 +90,12 @@ delivery_hours_table = Table(
     metadata,
     Column('delivery_hours_id', Integer, primary_key=True),
     Column('time_start', Integer, nullable=False),
-    Column('time_finish', Integer, nullable=False)
+    Column('time_finish', Integer, nullable=False),
+    # [time_start, time_finish) диапазон для поиска пересечений с рабочими
+    # часами курьеров с помощью GiST индекса
+    Column('time_range', INT4RANGE, Computed('int4range(time_start, time_finish)', persisted=True),
+           nullable=False),
+    Index(None, 'time_range', postgresql_using='gist')
 )
 
 orders_delivery_hours_table = Table(
@@ -93,3 +105,41 @@ orders_delivery_hours_table = Table(
     Column('delivery_hours_id', Integer,
            ForeignKey('delivery_hours.delivery_hours_id'), primary_key=True)
 )
+
+# Статистика курьеров, обновляется при завершении заказов, чтобы рейтинг и
+# заработок читались по первичному ключу, а не пересчитывались по всей истории
+# заказов.
+couriers_stats_table = Table(
+    'couriers_stats',
+    metadata,
+    Column('courier_id', Integer, ForeignKey('couriers.courier_id'), primary_key=True),
+    # Кол-во развозов (назначенных одновременно заказов), все заказы которых
+    # доставлены
+    Column('completed_sequences', Integer, nullable=False, server_default='0')
+)
+
+couriers_regions_stats_table = Table(
+    'couriers_regions_stats',
+    metadata,
+    Column('courier_id', Integer, ForeignKey('couriers.courier_id'), primary_key=True),
+    Column('region', Integer, primary_key=True),
+    # Сумма длительностей доставок в регионе, секунды
+    Column('delivery_time_sum', Float, nullable=False),
+    Column('deliveries_count', Integer, nullable=False)
+)
+
+# Горячие запросы фильтруют заказы по условиям courier_id IS NULL (поиск
+# заказов для назначения) и courier_id = X AND completion_time IS NULL
+# (заказы курьера в работе), поэтому для них созданы частичные индексы.
+Index(None, orders_table.c.region, orders_table.c.weight, orders_table.c.order_id,
+      postgresql_where=orders_table.c.courier_id.is_(None))
+Index(None, orders_table.c.courier_id, orders_table.c.assignment_time,
+      postgresql_where=orders_table.c.completion_time.is_(None))
+# История заказов курьера (рейтинг, заработок)
+Index(None, orders_table.c.courier_id, orders_table.c.completion_time)
+
+# Индексы для внешних ключей: первичные ключи таблиц связей начинаются с
+# courier_id/order_id и для поиска по второму столбцу не подходят.
+Index(None, couriers_regions_table.c.region_id)
+Index(None, couriers_working_hours_table.c.working_hours_id)
+Index(None, orders_delivery_hours_table.c.delivery_hours_id)
@@ -0,0 +1,129 @@
+"""
+Утилита для заполнения и проверки статистики курьеров (таблиц couriers_stats
+и couriers_regions_stats), которую обработчики обновляют при завершении
+заказов.
+
+    store-stats backfill  # пересчитать статистику по таблице orders
+    store-stats check     # сравнить статистику с пересчитанной, код 1 при расхождениях
+"""
+import argparse
+import logging
+import os
+
+from sqlalchemy import create_engine, text
+
+from store.utils.pg import DEFAULT_PG_URL
+
+
+EXPECTED_REGIONS_STATS = """
+    SELECT courier_id, region,
+           sum(extract(epoch FROM completion_time - delivery_start_time)) AS delivery_time_sum,
+           count(*) AS deliveries_count
+    FROM orders
+    WHERE courier_id IS NOT NULL AND completion_time IS NOT NULL
+    GROUP BY courier_id, region
+"""
+
+# Развоз - заказы курьера с одинаковым assignment_time, завершен, когда
+# доставлены все его заказы
+EXPECTED_STATS = """
+    SELECT courier_id, count(*) AS completed_sequences
+    FROM (
+        SELECT courier_id
+        FROM orders
+        WHERE courier_id IS NOT NULL AND assignment_time IS NOT NULL
+        GROUP BY courier_id, assignment_time
+        HAVING bool_and(completion_time IS NOT NULL)
+    ) AS sequences
+    GROUP BY courier_id
+"""
+
+BACKFILL = (
+    # Блокировка не дает обработчикам завершать заказы во время пересчета
+    'LOCK TABLE orders IN SHARE MODE',
+    'DELETE FROM couriers_regions_stats',
+    'DELETE FROM couriers_stats',
+    """
+    INSERT INTO couriers_regions_stats (courier_id, region, delivery_time_sum, deliveries_count)
+    {0}
+    """.format(EXPECTED_REGIONS_STATS),
+    """
+    INSERT INTO couriers_stats (courier_id, completed_sequences)
+    {0}
+    """.format(EXPECTED_STATS),
+)
+
+# Суммы длительностей хранятся в double precision и при инкрементальном
+# обновлении могут разойтись с пересчитанными в пределах погрешности
+DELIVERY_TIME_TOLERANCE = 0.001
+
+CHECKS = {
+    'couriers_regions_stats': """
+        SELECT courier_id, region,
+               expected.delivery_time_sum AS expected_delivery_time_sum,
+               actual.delivery_time_sum AS actual_delivery_time_sum,
+               expected.deliveries_count AS expected_deliveries_count,
+               actual.deliveries_count AS actual_deliveries_count
+        FROM ({0}) AS expected
+        FULL JOIN couriers_regions_stats AS actual USING (courier_id, region)
+        WHERE expected.deliveries_count IS DISTINCT FROM actual.deliveries_count
+           OR abs(expected.delivery_time_sum - actual.delivery_time_sum) > {1}
+        ORDER BY courier_id, region
+    """.format(EXPECTED_REGIONS_STATS, DELIVERY_TIME_TOLERANCE),
+    'couriers_stats': """
+        SELECT courier_id,
+               coalesce(expected.completed_sequences, 0) AS expected_completed_sequences,
+               coalesce(actual.completed_sequences, 0) AS actual_completed_sequences
+        FROM ({0}) AS expected
+        FULL JOIN couriers_stats AS actual USING (courier_id)
+        WHERE coalesce(expected.completed_sequences, 0) <> coalesce(actual.completed_sequences, 0)
+        ORDER BY courier_id
+    """.format(EXPECTED_STATS),
+}
+
+log = logging.getLogger(__name__)
+
+parser = argparse.ArgumentParser(
+    description='Backfill and check couriers stats',
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+parser.add_argument('--pg-url', default=os.getenv('STORE_PG_URL', DEFAULT_PG_URL),
+                    help='Database URL [env var: STORE_PG_URL]')
+parser.add_argument('command', choices=('backfill', 'check'))
+
+
+def backfill(conn):
+    with conn.begin():
+        for query in BACKFILL:
+            conn.execute(text(query))
+    log.info('Couriers stats are backfilled')
+
+
+def check(conn) -> bool:
+    consistent = True
+    for table, query in CHECKS.items():
+        for row in conn.execute(text(query)):
+            consistent = False
+            log.error('%s mismatch: %s', table, dict(row))
+    if consistent:
+        log.info('Couriers stats are consistent')
+    return consistent
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    args = parser.parse_args()
+
+    engine = create_engine(args.pg_url)
+    try:
+        with engine.connect() as conn:
+            if args.command == 'backfill':
+                backfill(conn)
+            elif not check(conn):
+                exit(1)
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
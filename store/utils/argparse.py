@@ -14,6 +14,10 @@ def validate(type: Callable, constrain: Callable):
 
 
 positive_int = validate(int, constrain=lambda x: x > 0)
+positive_float = validate(float, constrain=lambda x: x > 0)
+non_negative_int = validate(int, constrain=lambda x: x >= 0)
+non_negative_float = validate(float, constrain=lambda x: x >= 0)
+sample_rate = validate(float, constrain=lambda x: 0 <= x <= 1)
 
 
 def clear_environ(rule: Callable):
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Hashable, Iterable, Mapping, Optional, Tuple
+
+import asyncpg
+from aiohttp.web_app import Application
+from configargparse import Namespace
+
+
+CHANNEL = 'couriers_cache'
+# Полезная нагрузка NOTIFY ограничена 8000 байт, при инвалидации большего
+# числа курьеров кеш очищается целиком.
+NOTIFY_MAX_IDS = 500
+CLEAR = '*'
+RECONNECT_DELAY = 1
+
+log = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    LRU кеш ограниченного размера, записи которого устаревают через ttl
+    секунд. max_size=0 отключает кеш.
+
+    Чтение из БД может начаться до инвалидации записи, а закончиться после
+    нее - чтобы не положить в кеш устаревшие данные, перед чтением нужно
+    получить token(), и передать его в set(): если с тех пор была хоть одна
+    инвалидация, значение не сохраняется.
+    """
+    __slots__ = ('max_size', 'ttl', 'clock', 'entries', 'hits', 'misses',
+                 'invalidations')
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def token(self) -> int:
+        return self.invalidations
+
+    def set(self, key: Hashable, value: Any, token: int):
+        if not self.enabled or token != self.invalidations:
+            return
+
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        self.invalidations += 1
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        self.invalidations += 1
+        self.entries.clear()
+
+    @property
+    def stats(self) -> Mapping[str, int]:
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
+
+
+class CouriersCache(LRUCache):
+    """
+    Кеш профилей курьеров (строк COURIERS_QUERY) по courier_id.
+
+    Изменившие курьеров обработчики вызывают notify() внутри транзакции -
+    PostgreSQL доставит уведомление остальным процессам только после
+    коммита, а после выхода из транзакции - invalidate() для своего кеша.
+    """
+    __slots__ = ()
+
+    async def notify(self, conn, courier_ids: Iterable[int]):
+        if not self.enabled:
+            return
+
+        courier_ids = list(courier_ids)
+        if len(courier_ids) > NOTIFY_MAX_IDS:
+            payload = CLEAR
+        else:
+            payload = ','.join(map(str, courier_ids))
+        if payload:
+            await conn.execute('SELECT pg_notify($1, $2)', CHANNEL, payload)
+
+    def handle_notification(self, connection, pid, channel, payload: str):
+        if payload == CLEAR:
+            self.clear()
+        else:
+            self.invalidate(int(courier_id) for courier_id in payload.split(','))
+
+
+async def listen(pg_url: str, subscriptions: Iterable[Tuple[str, Callable, Callable[[], Any]]]):
+    """
+    Слушает каналы subscriptions (channel, callback, on_connect) через одно
+    соединение и переподключается при его потере.
+
+    Уведомления транзакции доставляются одному соединению в порядке вызова
+    pg_notify, даже если каналы разные, поэтому обработчик, отправивший
+    уведомление replica_writes раньше couriers_cache, может рассчитывать,
+    что роутер реплики узнает об изменении до инвалидации кеша (иначе
+    процесс успел бы заново положить в кеш прочитанного с реплики курьера).
+
+    Пока соединения нет, уведомления могут быть потеряны, поэтому после
+    каждого подключения вызываются on_connect (например, кеш очищается).
+    """
+    subscriptions = list(subscriptions)
+    channels = [channel for channel, _, _ in subscriptions]
+    while True:
+        try:
+            conn = await asyncpg.connect(pg_url)
+        except (OSError, asyncpg.PostgresError):
+            log.warning('Unable to listen %r channels, retrying in %ds', channels, RECONNECT_DELAY)
+            await asyncio.sleep(RECONNECT_DELAY)
+            continue
+
+        terminated = asyncio.Event()
+        conn.add_termination_listener(lambda _: terminated.set())
+        try:
+            for channel, callback, _ in subscriptions:
+                await conn.add_listener(channel, callback)
+            for _, _, on_connect in subscriptions:
+                on_connect()
+            await terminated.wait()
+            log.warning('Lost connection listening %r channels', channels)
+        finally:
+            await conn.close()
+
+
+def subscribe(app: Application, channel: str, callback: Callable, on_connect: Callable[[], Any]):
+    """
+    Подписка на канал общего LISTEN соединения процесса (см. setup_listener).
+    """
+    app['pg_subscriptions'].append((channel, callback, on_connect))
+
+
+async def setup_couriers_cache(app: Application, args: Namespace):
+    app['couriers_cache'] = cache = CouriersCache(
+        max_size=args.couriers_cache_size, ttl=args.couriers_cache_ttl
+    )
+    if cache.enabled:
+        subscribe(app, CHANNEL, cache.handle_notification, cache.clear)
+    yield
+
+
+async def setup_listener(app: Application, args: Namespace):
+    """
+    Слушает каналы, на которые подписались setup_replica и
+    setup_couriers_cache, поэтому должен выполняться после них.
+    """
+    subscriptions = app['pg_subscriptions']
+    if not subscriptions:
+        yield
+        return
+
+    log.info('Listening %s notifications', ', '.join(channel for channel, _, _ in subscriptions))
+    task = asyncio.ensure_future(listen(str(args.pg_url), subscriptions))
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
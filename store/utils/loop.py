@@ -0,0 +1,29 @@
+"""
+Выбор реализации event loop. По умолчанию используется стандартный asyncio,
+uvloop (libuv) - необязательная зависимость (pip install store[uvloop]),
+используется, только если выбран параметром --event-loop.
+"""
+import asyncio
+import logging
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+
+EVENT_LOOPS = {'asyncio': asyncio.DefaultEventLoopPolicy}
+if uvloop is not None:
+    EVENT_LOOPS['uvloop'] = uvloop.EventLoopPolicy
+DEFAULT_EVENT_LOOP = 'asyncio'
+
+log = logging.getLogger(__name__)
+
+
+def set_event_loop(name: str):
+    """
+    Устанавливает политику, с которой будут создаваться новые event loop'ы.
+    Должна вызываться до создания event loop (до run_app).
+    """
+    log.info('Using %s event loop', name)
+    asyncio.set_event_loop_policy(EVENT_LOOPS[name]())
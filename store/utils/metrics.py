@@ -0,0 +1,96 @@
+"""
+Метрики Prometheus, отдаются обработчиком GET /metrics.
+
+В pre-fork режиме (--workers) у каждого рабочего процесса свои значения
+метрик. Чтобы GET /metrics (который обработает любой из процессов) отдавал
+сумму по всем процессам, нужно задать переменную окружения
+PROMETHEUS_MULTIPROC_DIR - пустой каталог, в котором процессы будут хранить
+значения метрик:
+https://github.com/prometheus/client_python#multiprocess-mode-eg-gunicorn
+"""
+import os
+from typing import Any, Dict
+
+from prometheus_client import REGISTRY, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy.sql import ClauseElement
+
+
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# Запросы к БД и обработчики быстрые, кроме импорта и назначения заказов
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_DURATION = Histogram(
+    'store_http_request_duration_seconds', 'HTTP requests latency',
+    ('handler', 'method', 'status'), buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'store_http_requests_in_progress', 'HTTP requests being handled',
+    ('handler', 'method'), multiprocess_mode='livesum'
+)
+
+PG_POOL_ACQUIRE_DURATION = Histogram(
+    'store_pg_pool_acquire_seconds', 'Time waiting for a database connection from the pool',
+    buckets=LATENCY_BUCKETS
+)
+PG_QUERY_DURATION = Histogram(
+    'store_pg_query_duration_seconds', 'Database queries execution time',
+    ('query',), buckets=LATENCY_BUCKETS
+)
+
+SOLVER_DURATION = Histogram(
+    'store_solver_duration_seconds', 'Orders assignment solving time',
+    ('strategy',), buckets=LATENCY_BUCKETS
+)
+SOLVER_ORDERS = Histogram(
+    'store_solver_orders', 'Orders available to courier (problem size n)',
+    ('strategy',), buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+)
+SOLVER_CAPACITY = Histogram(
+    'store_solver_capacity_kg', 'Courier carrying capacity (problem capacity)',
+    ('strategy',), buckets=(10, 15, 25, 50)
+)
+
+# Текст SQL запроса -> имя для метрик, заполняется модулями с запросами
+# (см. store.api.handlers.query)
+QUERY_NAMES: Dict[str, str] = {}
+UNKNOWN_QUERY = 'other'
+
+
+def register_query_names(owner: Any, prefix: str = ''):
+    """
+    Дает имена SQL запросам - строковым константам (атрибутам в верхнем
+    регистре) модуля или класса: CLAIM_ORDERS -> claim_orders.
+    """
+    for attr, value in vars(owner).items():
+        if attr.isupper() and attr != 'URL_PATH' and isinstance(value, str):
+            QUERY_NAMES[value] = prefix + attr.lower()
+
+
+def query_name(query: Any) -> str:
+    if isinstance(query, str):
+        return QUERY_NAMES.get(query, UNKNOWN_QUERY)
+
+    # Запросы SQLAlchemy, которые строятся на каждый запрос (вставка
+    # нескольких строк, фильтры списков), называются по типу и таблице
+    if isinstance(query, ClauseElement):
+        table = getattr(query, 'table', None)
+        return query.__visit_name__ if table is None else '{} {}'.format(query.__visit_name__, table.name)
+    return UNKNOWN_QUERY
+
+
+def generate_metrics() -> bytes:
+    if MULTIPROC_DIR_ENV not in os.environ:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead(pid: int):
+    """
+    Удаляет значения метрик-датчиков завершившегося рабочего процесса.
+    """
+    if MULTIPROC_DIR_ENV in os.environ:
+        multiprocess.mark_process_dead(pid)
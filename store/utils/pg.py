@@ -1,17 +1,28 @@
+import asyncio
 import logging
 import os
 from collections import AsyncIterable
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
+from time import perf_counter
 from types import SimpleNamespace
-from typing import Union
+from typing import Any, Iterable, Optional, Tuple, Union
 
 from aiohttp.web_app import Application
 from alembic.config import Config
+from asyncpg.pool import Pool
 from asyncpgsa import PG
+from asyncpgsa.connection import SAConnection
 from asyncpgsa.transactionmanager import ConnectionTransactionContextManager
 from configargparse import Namespace
-from sqlalchemy import Numeric, cast, func
-from sqlalchemy.sql import Select
+from sqlalchemy import Integer, Numeric, any_, bindparam, cast, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import ColumnElement, Select
+from sqlalchemy.types import TypeEngine
+from yarl import URL
+
+from store.utils.metrics import PG_POOL_ACQUIRE_DURATION, PG_QUERY_DURATION, query_name
+from store.utils.tracing import fingerprint, span, tracing
 
 
 CENSORED = '***'
@@ -21,35 +32,253 @@ MAX_INTEGER = 2147483647
 
 PROJECT_PATH = Path(__file__).parent.parent.resolve()
 
+# Как часто проверяется занятость пула соединений, секунд
+POOL_SAMPLE_INTERVAL = 0.1
+
 
 log = logging.getLogger(__name__)
 
 
-async def setup_pg(app: Application, args: Namespace) -> PG:
-    db_info = args.pg_url.with_password(CENSORED)
+@contextmanager
+def observe_query(query):
+    name = query_name(query)
+    # SQL в трассу добавляется, только если запрос трассируется
+    traced = span('pg.query', query=name, sql=fingerprint(query)) if tracing() else nullcontext()
+    started = perf_counter()
+    with traced:
+        try:
+            yield
+        finally:
+            PG_QUERY_DURATION.labels(name).observe(perf_counter() - started)
+
+
+class TimedConnection(SAConnection):
+    """
+    Соединение, замеряющее время выполнения запросов (метрика
+    store_pg_query_duration_seconds с именем запроса).
+    """
+    async def execute(self, query, *args, **kwargs):
+        with observe_query(query):
+            return await super().execute(query, *args, **kwargs)
+
+    async def executemany(self, query, args, **kwargs):
+        with observe_query(query):
+            return await super().executemany(query, args, **kwargs)
+
+    async def fetch(self, query, *args, **kwargs):
+        with observe_query(query):
+            return await super().fetch(query, *args, **kwargs)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        with observe_query(query):
+            return await super().fetchrow(query, *args, **kwargs)
+
+    async def fetchval(self, query, *args, **kwargs):
+        with observe_query(query):
+            return await super().fetchval(query, *args, **kwargs)
+
+
+async def acquire(pool: Pool, timeout: Optional[float] = None):
+    """
+    Берет соединение из пула, замеряя время ожидания свободного соединения.
+    :return: контекстный менеджер соединения (для возврата в пул) и соединение
+    """
+    started = perf_counter()
+    with span('pg.acquire'):
+        acquire_context = pool.acquire(timeout=timeout)
+        con = await acquire_context.__aenter__()
+    PG_POOL_ACQUIRE_DURATION.observe(perf_counter() - started)
+    return acquire_context, con
+
+
+class TimedAcquire:
+    """
+    Соединение из пула без транзакции, с замером времени ожидания.
+    """
+    __slots__ = ('pool', 'timeout', 'acquire_context')
+
+    def __init__(self, pool: Pool, timeout: Optional[float] = None):
+        self.pool = pool
+        self.timeout = timeout
+        self.acquire_context = None
+
+    async def __aenter__(self):
+        self.acquire_context, con = await acquire(self.pool, self.timeout)
+        return con
+
+    async def __aexit__(self, *exc_info):
+        await self.acquire_context.__aexit__(*exc_info)
+
+
+class TimedTransaction(ConnectionTransactionContextManager):
+    """
+    Транзакция, замеряющая время ожидания свободного соединения из пула.
+    """
+    __slots__ = ()
+
+    async def __aenter__(self):
+        self.acquire_context, con = await acquire(self.pool, self.timeout)
+
+        self.transaction = con.transaction(**self.trans_kwargs)
+        try:
+            await self.transaction.__aenter__()
+        except Exception:
+            await asyncio.shield(self.acquire_context.__aexit__())
+            raise
+        return con
+
+
+class TimedPG(PG):
+    __slots__ = ()
+
+    def transaction(self, **kwargs):
+        return TimedTransaction(self.pool, **kwargs)
+
+    def acquire(self, timeout: Optional[float] = None) -> TimedAcquire:
+        return TimedAcquire(self.pool, timeout)
+
+
+async def connect_pg(pg_url: URL, args: Namespace) -> TimedPG:
+    """
+    Создает пул соединений с параметрами --pg-* и проверяет подключение.
+    """
+    db_info = pg_url.with_password(CENSORED)
     log.info('Connecting to database: %s', db_info)
 
-    app['pg'] = PG()
-    await app['pg'].init(
-        str(args.pg_url),
+    pg = TimedPG()
+    await pg.init(
+        str(pg_url),
+        connection_class=TimedConnection,
         min_size=args.pg_pool_min_size,
-        max_size=args.pg_pool_max_size
+        max_size=args.pg_pool_max_size,
+        max_queries=args.pg_max_queries,
+        max_inactive_connection_lifetime=args.pg_max_inactive_connection_lifetime,
+        statement_cache_size=args.pg_statement_cache_size,
+        command_timeout=args.pg_command_timeout
     )
-    await app['pg'].fetchval('SELECT 1')
+    await pg.fetchval('SELECT 1')
     log.info('Connected to database %s', db_info)
+    return pg
+
+
+async def disconnect_pg(pg: PG, pg_url: URL):
+    db_info = pg_url.with_password(CENSORED)
+    log.info('Disconnecting from database %s', db_info)
+    await pg.pool.close()
+    log.info('Disconnected from database %s', db_info)
+
+
+async def setup_pg(app: Application, args: Namespace) -> PG:
+    app['pg'] = await connect_pg(args.pg_url, args)
+
+    monitor = None
+    if args.pg_pool_monitor_interval:
+        monitor = asyncio.ensure_future(
+            monitor_pool(app['pg'].pool, args.pg_pool_max_size, args.pg_pool_monitor_interval)
+        )
 
     try:
         yield
     finally:
-        log.info('Disconnecting from database %s', db_info)
-        await app['pg'].pool.close()
-        log.info('Disconnected from database %s', db_info)
+        if monitor is not None:
+            monitor.cancel()
+            await asyncio.gather(monitor, return_exceptions=True)
+        await disconnect_pg(app['pg'], args.pg_url)
+
+
+def pool_usage(pool: Pool) -> Tuple[int, int]:
+    """
+    Кол-во открытых и кол-во свободных соединений пула.
+    """
+    # get_size() и get_idle_size() появились в asyncpg 0.25
+    if hasattr(pool, 'get_idle_size'):
+        return pool.get_size(), pool.get_idle_size()
+
+    holders = [holder for holder in pool._holders if holder._con is not None]
+    return len(holders), sum(holder._in_use is None for holder in holders)
+
+
+class PoolMonitor:
+    """
+    Считает, какую долю проверок все соединения пула были заняты: в это время
+    новые запросы ждут, пока освободится соединение.
+    """
+    __slots__ = ('pool', 'max_size', 'samples', 'saturated')
+
+    def __init__(self, pool: Pool, max_size: int):
+        self.pool = pool
+        self.max_size = max_size
+        self.samples = 0
+        self.saturated = 0
+
+    def sample(self):
+        size, idle = pool_usage(self.pool)
+        self.samples += 1
+        if size >= self.max_size and not idle:
+            self.saturated += 1
+
+    def report(self, interval: float):
+        if self.saturated:
+            log.warning(
+                'Database pool of %d connections was saturated %.0f%% of last %gs, '
+                'consider increasing --pg-pool-max-size',
+                self.max_size, self.saturated / self.samples * 100, interval
+            )
+        self.samples = self.saturated = 0
+
+
+async def monitor_pool(pool: Pool, max_size: int, interval: float):
+    """
+    Раз в interval секунд пишет в лог предупреждение, если за это время
+    пул соединений был полностью занят.
+    """
+    monitor = PoolMonitor(pool, max_size)
+    samples = max(1, round(interval / POOL_SAMPLE_INTERVAL))
+    while True:
+        for _ in range(samples):
+            await asyncio.sleep(POOL_SAMPLE_INTERVAL)
+            monitor.sample()
+        monitor.report(interval)
 
 
 def rounded(column, fraction: int = 2):
     return func.round(cast(column, Numeric), fraction)
 
 
+def array_param(values: Optional[Iterable[Any]] = None, type_: TypeEngine = Integer,
+                key: Optional[str] = None) -> ColumnElement:
+    """
+    Передает значения одним параметром-массивом: $1::integer[]. Для запросов
+    из реестра (см. store.utils.statements) значения не передаются, а
+    параметру дается имя key.
+    """
+    if values is not None:
+        values = list(values)
+    return cast(bindparam(key, values, ARRAY(type_)), ARRAY(type_))
+
+
+def any_of(values: Optional[Iterable[Any]] = None, type_: TypeEngine = Integer,
+           key: Optional[str] = None) -> ColumnElement:
+    """
+    ANY($1::integer[]) для сравнения со значениями массива, например
+    column.op('&&')(any_of(ranges, INT4RANGE)).
+    """
+    return any_(array_param(values, type_, key))
+
+
+def equals_any(column: ColumnElement, values: Optional[Iterable[Any]] = None, type_: TypeEngine = Integer,
+               key: Optional[str] = None) -> ColumnElement:
+    """
+    Условие column = ANY($1::integer[]) вместо or_(column == value, ...).
+
+    В or_ для каждого значения добавляется параметр, поэтому текст запроса
+    зависит от кол-ва значений: asyncpg готовит (и кеширует) отдельный
+    statement на каждую длину списка, а длинные списки упираются в
+    MAX_QUERY_ARGS. С массивом текст запроса один и тот же.
+    """
+    return column == any_of(values, type_, key)
+
+
 def make_alembic_config(cmd_opts: Union[Namespace, SimpleNamespace],
                         base_path: str = PROJECT_PATH) -> Config:
     """
@@ -0,0 +1,177 @@
+"""
+Pre-fork режим: мастер-процесс запускает несколько рабочих процессов, которые
+принимают соединения на одном, заранее привязанном сокете (ядро само
+распределяет соединения между ними).
+
+Мастер не обслуживает запросы и не создает event loop, он только следит за
+рабочими процессами:
+
+* перезапускает процессы, завершившиеся без его ведома (падение, OOM killer);
+* по SIGHUP поочередно заменяет рабочие процессы новыми (rolling restart),
+  так что сокет все время кто-то обслуживает;
+* по SIGTERM и SIGINT передает SIGTERM рабочим процессам, дожидается их
+  завершения и завершается сам.
+"""
+import logging
+import os
+import signal
+from time import monotonic, sleep
+from typing import Callable, Dict, Optional, Set
+
+from setproctitle import setproctitle
+
+
+log = logging.getLogger(__name__)
+
+# Процесс, проработавший меньше, считается упавшим при запуске: перед его
+# перезапуском выдерживается пауза, чтобы не перезапускать его в цикле
+MIN_UPTIME = 1
+RESPAWN_DELAY = 1
+
+SIGNALS = {signal.SIGCHLD, signal.SIGHUP, signal.SIGINT, signal.SIGTERM}
+
+
+def exit_code(status: int) -> int:
+    """
+    Код завершения процесса по статусу waitpid(), для завершенных сигналом -
+    номер сигнала со знаком минус.
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def split_pool_size(size: int, workers: int) -> int:
+    """
+    Размер пула (соединений с БД, процессов solver) одного рабочего процесса,
+    чтобы все процессы вместе открывали не больше size (но хотя бы по одному).
+    """
+    return max(1, size // workers)
+
+
+class Master:
+    """
+    Запускает workers процессов, каждый из которых вызывает target() и
+    завершается, когда target вернет управление. on_exit(pid) вызывается
+    мастером для каждого завершившегося процесса.
+    """
+    def __init__(self, workers: int, target: Callable[[], None], title: str = None,
+                 on_exit: Optional[Callable[[int], None]] = None):
+        self.workers = workers
+        self.target = target
+        self.title = title
+        self.on_exit = on_exit
+        # pid рабочего процесса -> время запуска
+        self.processes: Dict[int, float] = {}
+        # Процессы, остановленные мастером: их завершение ожидаемо
+        self.stopping: Set[int] = set()
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.processes[pid] = monotonic()
+            log.info('Started worker %d', pid)
+            return pid
+
+        # Рабочий процесс: сигналы обрабатываются так же, как в процессе без
+        # мастера (aiohttp сам завершается по SIGINT и SIGTERM)
+        code = 0
+        try:
+            signal.pthread_sigmask(signal.SIG_SETMASK, set())
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            if self.title:
+                setproctitle('{}: worker'.format(self.title))
+            self.target()
+        except BaseException:
+            log.exception('Worker %d failed', os.getpid())
+            code = 1
+        finally:
+            # os._exit() не выполняет atexit, буферизованные логи нужно
+            # записать явно
+            logging.shutdown()
+            os._exit(code)
+
+    def exited(self, pid: int):
+        del self.processes[pid]
+        self.stopping.discard(pid)
+        if self.on_exit is not None:
+            self.on_exit(pid)
+
+    def terminate(self, pid: int):
+        self.stopping.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """
+        Забирает статусы завершившихся процессов и запускает вместо
+        неожиданно завершившихся новые.
+        """
+        while self.processes:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+
+            started = self.processes.get(pid)
+            if started is None:
+                continue
+            stopped = pid in self.stopping
+            self.exited(pid)
+            if stopped:
+                log.info('Worker %d stopped', pid)
+                continue
+
+            log.error('Worker %d exited unexpectedly with status %d', pid, exit_code(status))
+            if monotonic() - started < MIN_UPTIME:
+                sleep(RESPAWN_DELAY)
+            self.spawn()
+
+    def restart(self):
+        """
+        Заменяет рабочие процессы по одному: новый процесс запускается до
+        остановки старого.
+        """
+        log.info('Restarting %d workers', len(self.processes))
+        for pid in list(self.processes):
+            if pid not in self.processes:
+                continue
+            self.spawn()
+            self.terminate(pid)
+            # Остальные процессы могли упасть, пока ожидалась остановка
+            # этого - их статусы заберет reap() по SIGCHLD
+            os.waitpid(pid, 0)
+            self.exited(pid)
+            log.info('Worker %d stopped', pid)
+
+    def stop(self):
+        log.info('Stopping %d workers', len(self.processes))
+        for pid in list(self.processes):
+            self.terminate(pid)
+        for pid in list(self.processes):
+            os.waitpid(pid, 0)
+            self.exited(pid)
+
+    def run(self):
+        # Сигналы блокируются и забираются sigwait(), без обработчиков:
+        # так сигнал не может прийти посреди fork() или waitpid()
+        signal.pthread_sigmask(signal.SIG_BLOCK, SIGNALS)
+        try:
+            for _ in range(self.workers):
+                self.spawn()
+
+            while True:
+                signum = signal.sigwait(SIGNALS)
+                if signum == signal.SIGCHLD:
+                    self.reap()
+                elif signum == signal.SIGHUP:
+                    self.restart()
+                else:
+                    self.stop()
+                    return
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, SIGNALS)
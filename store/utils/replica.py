@@ -0,0 +1,217 @@
+"""
+Чтение с реплики PostgreSQL (--pg-replica-url).
+
+GET обработчики читают курьеров и заказы с реплики, без транзакции и
+блокировок, чтобы не занимать соединения основного сервера, нужные импорту,
+назначению и завершению заказов. Реплика отстает от основного сервера,
+поэтому:
+
+* обработчики, изменившие курьеров или заказы, вызывают
+  ReplicaRouter.notify() внутри транзакции: следующие --pg-replica-staleness
+  секунд эти курьеры и заказы читаются с основного сервера. Остальные
+  процессы (--workers) узнают об изменениях через LISTEN/NOTIFY. Если
+  изменились и курьеры, notify() вызывается раньше CouriersCache.notify():
+  так процесс, получив инвалидацию кеша, уже не прочитает курьера с реплики;
+* отставание реплики проверяется раз в LAG_CHECK_INTERVAL секунд, если оно
+  приближается к --pg-replica-staleness (или реплика недоступна), все чтения
+  идут на основной сервер.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Hashable, Iterable, Optional
+
+import asyncpg
+from aiohttp.web_app import Application
+from asyncpgsa import PG
+from configargparse import Namespace
+
+from store.utils.cache import CLEAR, NOTIFY_MAX_IDS, subscribe
+from store.utils.pg import connect_pg, disconnect_pg
+
+
+CHANNEL = 'replica_writes'
+LAG_CHECK_INTERVAL = 1
+
+# На основном сервере (реплика не настроена, а --pg-replica-url указывает на
+# него же) и на догнавшей основной сервер реплике отставание 0
+REPLICA_LAG = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+'''
+
+log = logging.getLogger(__name__)
+
+
+class RecentWrites:
+    """
+    Идентификаторы, измененные за последние window секунд. mark_all()
+    считает измененными все идентификаторы (например, когда уведомления об
+    изменениях могли быть потеряны).
+    """
+    __slots__ = ('window', 'clock', 'deadlines', 'all_until')
+
+    def __init__(self, window: float, clock: Callable[[], float] = monotonic):
+        self.window = window
+        self.clock = clock
+        # Идентификатор -> момент, до которого он считается измененным.
+        # Сроки добавляются по возрастанию, поэтому истекшие всегда в начале.
+        self.deadlines = OrderedDict()
+        self.all_until = float('-inf')
+
+    def mark(self, keys: Iterable[Hashable]):
+        now = self.clock()
+        deadline = now + self.window
+        for key in keys:
+            self.deadlines[key] = deadline
+            self.deadlines.move_to_end(key)
+        self.prune(now)
+
+    def mark_all(self):
+        self.all_until = self.clock() + self.window
+        self.deadlines.clear()
+
+    def prune(self, now: float):
+        while self.deadlines:
+            key, deadline = next(iter(self.deadlines.items()))
+            if deadline > now:
+                break
+            del self.deadlines[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        now = self.clock()
+        if now < self.all_until:
+            return True
+        self.prune(now)
+        return key in self.deadlines
+
+    def __len__(self) -> int:
+        self.prune(self.clock())
+        return len(self.deadlines)
+
+
+class ReplicaRouter:
+    """
+    Выбирает, откуда читать курьеров и заказы: с реплики или с основного
+    сервера. Без реплики (replica=None) все запросы идут на основной сервер.
+    """
+    __slots__ = ('primary', 'replica', 'staleness', 'couriers', 'orders', 'lagging')
+
+    def __init__(self, primary: PG, replica: Optional[PG] = None, staleness: float = 0,
+                 clock: Callable[[], float] = monotonic):
+        self.primary = primary
+        self.replica = replica
+        self.staleness = staleness
+        self.couriers = RecentWrites(staleness, clock)
+        self.orders = RecentWrites(staleness, clock)
+        # До первой проверки отставания реплика не используется
+        self.lagging = True
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica is not None
+
+    def choose(self, couriers: Iterable[int] = (), orders: Iterable[int] = ()) -> PG:
+        """
+        Реплика, если она не отстает и указанные курьеры и заказы не
+        изменялись последние staleness секунд, иначе основной сервер.
+        """
+        if not self.enabled or self.lagging:
+            return self.primary
+        if any(courier_id in self.couriers for courier_id in couriers) or \
+                any(order_id in self.orders for order_id in orders):
+            return self.primary
+        return self.replica
+
+    async def notify(self, conn, couriers: Iterable[int] = (), orders: Iterable[int] = ()):
+        """
+        Вызывается внутри транзакции, изменившей курьеров и заказы: этот
+        процесс сразу читает их с основного сервера, остальные - после
+        коммита, когда PostgreSQL доставит им уведомление.
+        """
+        if not self.enabled:
+            return
+
+        couriers, orders = list(couriers), list(orders)
+        self.couriers.mark(couriers)
+        self.orders.mark(orders)
+
+        # Полезная нагрузка NOTIFY ограничена, при большом числе изменений
+        # все чтения на время staleness идут на основной сервер
+        if len(couriers) + len(orders) > NOTIFY_MAX_IDS:
+            payload = CLEAR
+        else:
+            payload = ';'.join(
+                '{}:{}'.format(kind, ','.join(map(str, ids)))
+                for kind, ids in (('couriers', couriers), ('orders', orders)) if ids
+            )
+        if payload:
+            await conn.execute('SELECT pg_notify($1, $2)', CHANNEL, payload)
+
+    def handle_notification(self, connection, pid, channel, payload: str):
+        if payload == CLEAR:
+            self.mark_all()
+            return
+
+        for part in payload.split(';'):
+            kind, ids = part.split(':')
+            writes = self.couriers if kind == 'couriers' else self.orders
+            writes.mark(int(id_) for id_ in ids.split(','))
+
+    def mark_all(self):
+        self.couriers.mark_all()
+        self.orders.mark_all()
+
+    async def check_lag(self) -> Optional[float]:
+        """
+        Проверяет отставание реплики, секунд (None, если реплика недоступна).
+        Реплика используется, пока отставание с учетом времени до следующей
+        проверки меньше staleness.
+        """
+        try:
+            lag = await self.replica.fetchval(REPLICA_LAG, timeout=LAG_CHECK_INTERVAL)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+            lag = None
+
+        lagging = lag is None or float(lag) + LAG_CHECK_INTERVAL >= self.staleness
+        if lagging and not self.lagging:
+            log.warning('Replica is %s, reading from primary',
+                        'unavailable' if lag is None else 'lagging {:.1f}s behind'.format(lag))
+        elif not lagging and self.lagging:
+            log.info('Replica caught up, reading from replica')
+        self.lagging = lagging
+        return lag
+
+
+async def monitor_lag(router: ReplicaRouter):
+    while True:
+        await asyncio.sleep(LAG_CHECK_INTERVAL)
+        await router.check_lag()
+
+
+async def setup_replica(app: Application, args: Namespace):
+    """
+    Подключается к реплике, если указан --pg-replica-url. Должен выполняться
+    после setup_pg.
+    """
+    if args.pg_replica_url is None:
+        app['pg_router'] = ReplicaRouter(app['pg'])
+        yield
+        return
+
+    replica = await connect_pg(args.pg_replica_url, args)
+    app['pg_router'] = router = ReplicaRouter(app['pg'], replica, args.pg_replica_staleness)
+    await router.check_lag()
+
+    # Уведомления доставляются только подписчикам основного сервера
+    subscribe(app, CHANNEL, router.handle_notification, router.mark_all)
+    task = asyncio.ensure_future(monitor_lag(router))
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await disconnect_pg(replica, args.pg_replica_url)
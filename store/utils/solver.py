@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+from typing import List, Mapping, NamedTuple
+
+from aiohttp.web_app import Application
+from configargparse import Namespace
+
+from store.api.domain import CouriersOrdersGreedyResolver, CouriersOrdersVectorizedResolver
+from store.utils.metrics import SOLVER_CAPACITY, SOLVER_DURATION, SOLVER_ORDERS
+from store.utils.tracing import span
+
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+EXACT = 'exact'
+GREEDY = 'greedy'
+STRATEGIES = {
+    EXACT: CouriersOrdersVectorizedResolver,
+    GREEDY: CouriersOrdersGreedyResolver,
+}
+
+log = logging.getLogger(__name__)
+
+
+class SolverResult(NamedTuple):
+    ids: List[int]
+    strategy: str
+    duration: float
+
+
+def resolve(resolver_cls, orders: Mapping[int, float], max_weight: float) -> List[int]:
+    """
+    Запускает решатель синхронно. Функция объявлена на уровне модуля, чтобы
+    ее можно было передать в ProcessPoolExecutor (она должна сериализоваться
+    pickle).
+    """
+    return resolver_cls(orders_=orders, max_weight=max_weight).resolve()
+
+
+class OrdersSolver:
+    """
+    Решает задачу о назначении заказов в executor'е, чтобы CPU-bound вычисления
+    не блокировали event loop. Если решение не найдено за timeout секунд,
+    возвращается результат жадного алгоритма.
+
+    Точное решение (динамическое программирование) требует
+    O(кол-во заказов * грузоподъемность * 100) операций, поэтому, если размер
+    задачи превышает exact_threshold, сразу используется жадный алгоритм.
+    """
+    __slots__ = ('executor', 'timeout', 'exact_threshold')
+
+    def __init__(self, executor: Executor, timeout: float = None,
+                 exact_threshold: int = None):
+        self.executor = executor
+        self.timeout = timeout
+        self.exact_threshold = exact_threshold
+
+    def choose_strategy(self, orders: Mapping[int, float], max_weight: float) -> str:
+        if self.exact_threshold is None:
+            return EXACT
+        cells = len(orders) * int(max_weight * 100)
+        return EXACT if cells <= self.exact_threshold else GREEDY
+
+    async def resolve_orders(self, orders: Mapping[int, float], max_weight: float,
+                             strategy: str = None) -> SolverResult:
+        strategy = strategy or self.choose_strategy(orders, max_weight)
+        with span('solver', strategy=strategy, orders=len(orders), capacity=max_weight):
+            started = perf_counter()
+
+            if strategy == GREEDY:
+                # Жадный алгоритм работает за O(n log n), отправлять его в
+                # executor дороже, чем выполнить на месте.
+                ids = resolve(STRATEGIES[GREEDY], orders, max_weight)
+                return self.observe(SolverResult(ids, GREEDY, perf_counter() - started), orders, max_weight)
+
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor, resolve, STRATEGIES[strategy], orders, max_weight
+            )
+            try:
+                with span('solver.executor'):
+                    ids = await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                # Задача в процессе/потоке executor'а не может быть прервана и
+                # доработает в фоне, но ее результат уже никому не нужен.
+                log.warning('Solver timed out after %.2fs on %d orders, falling back to greedy',
+                            self.timeout, len(orders))
+                with span('solver.greedy_fallback'):
+                    ids = resolve(STRATEGIES[GREEDY], orders, max_weight)
+                strategy = GREEDY
+
+            return self.observe(SolverResult(ids, strategy, perf_counter() - started), orders, max_weight)
+
+    @staticmethod
+    def observe(result: SolverResult, orders: Mapping[int, float], max_weight: float) -> SolverResult:
+        """
+        Записывает время решения и размер задачи в метрики.
+        """
+        SOLVER_DURATION.labels(result.strategy).observe(result.duration)
+        SOLVER_ORDERS.labels(result.strategy).observe(len(orders))
+        SOLVER_CAPACITY.labels(result.strategy).observe(max_weight)
+        return result
+
+
+async def setup_solver(app: Application, args: Namespace):
+    log.info('Starting %s solver pool with %d workers', args.solver_executor, args.solver_workers)
+    executor = EXECUTORS[args.solver_executor](max_workers=args.solver_workers)
+    app['solver'] = OrdersSolver(executor, timeout=args.solver_timeout,
+                                 exact_threshold=args.solver_exact_threshold)
+
+    try:
+        yield
+    finally:
+        log.info('Stopping solver pool')
+        executor.shutdown(wait=False)
@@ -0,0 +1,99 @@
+"""
+Реестр SQL запросов, которые обработчики выполняют на каждый запрос.
+
+Выражение SQLAlchemy компилируется в SQL с позиционными параметрами ($1, $2,
+...) один раз, при регистрации, а не при каждом вызове, как это делает
+asyncpgsa. Текст запроса всегда один и тот же, поэтому asyncpg готовит его
+(PREPARE) на каждом соединении один раз и затем берет из своего кеша
+подготовленных запросов (statement_cache_size).
+"""
+from typing import Any, Callable, Dict, Iterator, Mapping, Tuple
+
+from asyncpgsa.connection import _dialect, execute_defaults
+from sqlalchemy.sql import ClauseElement
+
+from store.utils.metrics import QUERY_NAMES
+
+
+class Statement:
+    """
+    Скомпилированный запрос: SQL и имена параметров в порядке $1, $2, ...
+    Значения, переданные в выражение заранее (например, в values()),
+    используются, если параметр не передан при вызове.
+    """
+    __slots__ = ('name', 'sql', 'params', 'defaults', 'processors')
+
+    def __init__(self, name: str, query: ClauseElement):
+        compiled = execute_defaults(query).compile(dialect=_dialect)
+
+        self.name = name
+        self.params: Tuple[str, ...] = tuple(sorted(compiled.params))
+        self.defaults: Dict[str, Any] = dict(compiled.params)
+        self.sql: str = compiled.string % {
+            key: '$' + str(i) for i, key in enumerate(self.params, start=1)
+        }
+        # Функции преобразования значений (например, Enum -> str), их
+        # asyncpgsa применяет при каждой компиляции
+        processors = compiled._bind_processors
+        self.processors: Dict[str, Callable] = {key: processors[key] for key in self.params if key in processors}
+
+    def args(self, values: Mapping[str, Any]) -> list:
+        unknown = set(values) - set(self.params)
+        if unknown:
+            raise TypeError(f'Unknown params of statement {self.name!r}: {", ".join(sorted(unknown))}')
+
+        args = []
+        for key in self.params:
+            value = values[key] if key in values else self.defaults[key]
+            if key in self.processors:
+                value = self.processors[key](value)
+            args.append(value)
+        return args
+
+    def __repr__(self):
+        return f'<Statement {self.name!r}: {self.sql}>'
+
+
+class StatementsRegistry(Mapping):
+    """
+    Запросы, доступные по имени:
+
+        STATEMENTS.register('courier', COURIERS_QUERY.where(
+            couriers_table.c.courier_id == bindparam('courier_id')
+        ))
+        await STATEMENTS.fetchrow(conn, 'courier', courier_id=1)
+    """
+    def __init__(self):
+        self.statements: Dict[str, Statement] = {}
+
+    def register(self, name: str, query: ClauseElement) -> Statement:
+        if name in self.statements:
+            raise ValueError(f'Statement {name!r} is already registered')
+        self.statements[name] = statement = Statement(name, query)
+        QUERY_NAMES[statement.sql] = name
+        return statement
+
+    def __getitem__(self, name: str) -> Statement:
+        return self.statements[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.statements)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    async def fetch(self, conn, name: str, **values):
+        statement = self.statements[name]
+        return await conn.fetch(statement.sql, *statement.args(values))
+
+    async def fetchrow(self, conn, name: str, **values):
+        statement = self.statements[name]
+        return await conn.fetchrow(statement.sql, *statement.args(values))
+
+    async def fetchval(self, conn, name: str, **values):
+        statement = self.statements[name]
+        return await conn.fetchval(statement.sql, *statement.args(values))
+
+    async def execute(self, conn, name: str, **values):
+        statement = self.statements[name]
+        return await conn.execute(statement.sql, *statement.args(values))
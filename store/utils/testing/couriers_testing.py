@@ -12,7 +12,7 @@ from store.api.handlers import (
     CouriersImportsView, CouriersView
 )
 from store.api.schema import (
-    CouriersIdsSchema, CourierGetResponseSchema, CourierItemSchema,
+    CouriersIdsSchema, CourierGetResponseSchema, CourierItemSchema, CouriersListResponseSchema
 )
 from store.utils.pg import MAX_INTEGER
 
@@ -128,6 +128,24 @@ async def get_courier(
         return data
 
 
+async def list_couriers(
+        client: TestClient,
+        params: Optional[Mapping[str, Any]] = None,
+        expected_status: Union[int, EnumMeta] = HTTPStatus.OK,
+        **request_kwargs
+) -> Optional[List[dict]]:
+    response = await client.get(
+        CouriersImportsView.URL_PATH, params=params, **request_kwargs
+    )
+    assert response.status == expected_status
+
+    if response.status == HTTPStatus.OK:
+        data = await response.json()
+        errors = CouriersListResponseSchema().validate(data)
+        assert errors == {}
+        return data['data']
+
+
 async def get_courier_for_testing(
         client: TestClient,
         courier_id: int,
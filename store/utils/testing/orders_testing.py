@@ -9,10 +9,12 @@ from aiohttp.typedefs import StrOrURL
 from aiohttp.web_urldispatcher import DynamicResource
 
 from store.api.handlers import (
-    OrdersImportsView, OrdersView, OrdersAssignmentView, OrdersCompletionView
+    OrdersImportsView, OrdersView, OrdersAssignmentView, OrdersBatchAssignmentView, OrdersCompletionView,
+    OrdersBatchCompletionView
 )
 from store.api.schema import (
-    OrdersIdsSchema, OrdersGetResponseSchema, OrdersAssignPostResponseSchema, OrdersCompletePostResponseSchema
+    OrdersIdsSchema, OrdersGetResponseSchema, OrdersAssignPostResponseSchema, OrdersCompletePostResponseSchema,
+    OrdersListResponseSchema, OrdersAssignBatchPostResponseSchema, OrdersCompleteBatchPostResponseSchema
 )
 from store.utils.pg import MAX_INTEGER
 
@@ -128,6 +130,24 @@ async def get_order(
         return data
 
 
+async def list_orders(
+        client: TestClient,
+        params: Optional[Mapping[str, Any]] = None,
+        expected_status: Union[int, EnumMeta] = HTTPStatus.OK,
+        **request_kwargs
+) -> Optional[List[dict]]:
+    response = await client.get(
+        OrdersImportsView.URL_PATH, params=params, **request_kwargs
+    )
+    assert response.status == expected_status
+
+    if response.status == HTTPStatus.OK:
+        data = await response.json()
+        errors = OrdersListResponseSchema().validate(data)
+        assert errors == {}
+        return data['data']
+
+
 async def assign_orders(
         client: TestClient,
         courier_id: int,
@@ -146,6 +166,25 @@ async def assign_orders(
         return data
 
 
+async def assign_orders_batch(
+        client: TestClient,
+        couriers_ids: List[int],
+        expected_status: Union[int, EnumMeta] = HTTPStatus.OK,
+        **request_kwargs
+) -> dict:
+    response = await client.post(
+        OrdersBatchAssignmentView.URL_PATH, json={'couriers': [{'id': id_} for id_ in couriers_ids]},
+        **request_kwargs,
+    )
+    assert response.status == expected_status
+
+    if response.status == HTTPStatus.OK:
+        data = await response.json()
+        errors = OrdersAssignBatchPostResponseSchema().validate(data)
+        assert errors == {}
+        return data
+
+
 async def complete_orders(
         client: TestClient,
         courier_id: int,
@@ -166,3 +205,21 @@ async def complete_orders(
         errors = OrdersCompletePostResponseSchema().validate(data)
         assert errors == {}
         return data
+
+
+async def complete_orders_batch(
+        client: TestClient,
+        items: List[Mapping[str, Any]],
+        expected_status: Union[int, EnumMeta] = HTTPStatus.OK,
+        **request_kwargs
+) -> dict:
+    response = await client.post(
+        OrdersBatchCompletionView.URL_PATH, json={'data': items}, **request_kwargs,
+    )
+    assert response.status == expected_status
+
+    if response.status == HTTPStatus.OK:
+        data = await response.json()
+        errors = OrdersCompleteBatchPostResponseSchema().validate(data)
+        assert errors == {}
+        return data
@@ -0,0 +1,130 @@
+"""
+Трассировка медленных запросов: для выбранных запросов записывается дерево
+интервалов (span) - обработчик, запросы к БД, этапы поиска заказов и решения
+задачи о назначении. Трассы запросов, выполнявшихся дольше порога, хранятся
+в кольцевом буфере и отдаются обработчиком GET /debug/slow.
+
+Текущий span хранится в contextvars: асинхронные функции, вызванные
+обработчиком, видят span своего запроса. Если запрос не трассируется,
+span() только читает contextvar и ничего не записывает.
+"""
+import re
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter, time
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from asyncpgsa.connection import _dialect
+from sqlalchemy.sql import ClauseElement
+
+
+# Длина SQL в трассе: достаточно, чтобы узнать запрос
+FINGERPRINT_LENGTH = 200
+WHITESPACE = re.compile(r'\s+')
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'started', 'duration', 'children')
+
+    def __init__(self, name: str, attrs: Dict[str, Any] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.started = perf_counter()
+        self.duration: Optional[float] = None
+        self.children: List['Span'] = []
+
+    def finish(self):
+        self.duration = perf_counter() - self.started
+
+    def to_dict(self, origin: float = None) -> Dict[str, Any]:
+        """
+        Время начала отсчитывается от начала корневого span, мс.
+        """
+        origin = self.started if origin is None else origin
+        return {
+            'name': self.name,
+            'start_ms': round((self.started - origin) * 1000, 3),
+            'duration_ms': None if self.duration is None else round(self.duration * 1000, 3),
+            **self.attrs,
+            'children': [child.to_dict(origin) for child in self.children],
+        }
+
+
+CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """
+    Добавляет дочерний span к текущему, если запрос трассируется.
+    """
+    parent = CURRENT_SPAN.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = CURRENT_SPAN.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        CURRENT_SPAN.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attrs) -> Iterator[Span]:
+    """
+    Начинает трассировку: корневой span запроса.
+    """
+    root = Span(name, attrs)
+    token = CURRENT_SPAN.set(root)
+    try:
+        yield root
+    finally:
+        root.finish()
+        CURRENT_SPAN.reset(token)
+
+
+def tracing() -> bool:
+    return CURRENT_SPAN.get() is not None
+
+
+def fingerprint(query: Any) -> str:
+    """
+    SQL запроса без лишних пробелов, обрезанный до FINGERPRINT_LENGTH.
+    Значения параметров не попадают в трассу.
+    """
+    if isinstance(query, ClauseElement):
+        query = query.compile(dialect=_dialect)
+    sql = WHITESPACE.sub(' ', str(query)).strip()
+    if len(sql) > FINGERPRINT_LENGTH:
+        sql = sql[:FINGERPRINT_LENGTH] + '...'
+    return sql
+
+
+class SlowRequests:
+    """
+    Кольцевой буфер трасс запросов, выполнявшихся дольше threshold секунд.
+    """
+    __slots__ = ('threshold', 'traces')
+
+    def __init__(self, size: int, threshold: float):
+        self.threshold = threshold
+        self.traces: Deque[Dict[str, Any]] = deque(maxlen=size)
+
+    def add(self, root: Span, force: bool = False):
+        """
+        :param force: записать трассу независимо от времени выполнения
+        """
+        if not self.traces.maxlen or (not force and root.duration < self.threshold):
+            return
+        self.traces.append({'time': time() - root.duration, **root.to_dict()})
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        Трассы, начиная с последней.
+        """
+        return list(reversed(self.traces))
@@ -1,4 +1,8 @@
+from random import randint, seed
+
+from store.api.domain.couriers_orders_greedy_resolver import CouriersOrdersGreedyResolver
 from store.api.domain.couriers_orders_resolver import CouriersOrdersResolver
+from store.api.domain.couriers_orders_vectorized_resolver import CouriersOrdersVectorizedResolver
 import pytest
 
 CASES = (
@@ -53,9 +57,54 @@ CASES = (
 )
 
 
+RESOLVERS = (CouriersOrdersResolver, CouriersOrdersVectorizedResolver)
+
+
+@pytest.mark.parametrize('resolver', RESOLVERS)
 @pytest.mark.parametrize('w, p, max_w, expected_w', CASES)
-async def test_knapsack_resolver(w, p, max_w, expected_w):
-    actual_w = await CouriersOrdersResolver(orders_=w, max_weight=max_w, values_=p).resolve_orders()
+async def test_knapsack_resolver(resolver, w, p, max_w, expected_w):
+    actual_w = await resolver(orders_=w, max_weight=max_w, values_=p).resolve_orders()
     actual_w.sort()
     expected_w.sort()
     assert actual_w == expected_w
+
+
+@pytest.mark.parametrize('max_w', (0.5, 10, 15))
+@pytest.mark.parametrize('values', (False, True))
+async def test_vectorized_resolver_matches_resolver(max_w, values):
+    # both engines have to pick the very same orders, not only the same amount
+    seed(max_w)
+    w = {order_id: randint(1, 500) / 100 for order_id in range(100)}
+    p = [randint(1, 10) for _ in range(len(w))] if values else None
+
+    expected_w = await CouriersOrdersResolver(orders_=w, max_weight=max_w, values_=p).resolve_orders()
+    actual_w = await CouriersOrdersVectorizedResolver(orders_=w, max_weight=max_w, values_=p).resolve_orders()
+    assert actual_w == expected_w
+
+
+@pytest.mark.parametrize('resolver', RESOLVERS)
+async def test_knapsack_resolver_many_orders(resolver):
+    # the chosen items are found at the very bottom of the table, so reconstruction
+    # has to walk through all 10k items (recursive version failed with RecursionError)
+    w = {order_id: 0.01 for order_id in range(10000)}
+    actual_w = await resolver(orders_=w, max_weight=1).resolve_orders()
+    assert actual_w == list(range(100))
+
+
+@pytest.mark.parametrize('values', (False, True))
+async def test_greedy_resolver_bound(values):
+    seed(values)
+    w = {order_id: randint(1, 5000) / 100 for order_id in range(200)}
+    p = [randint(1, 100) for _ in range(len(w))] if values else [1] * len(w)
+
+    exact_w = await CouriersOrdersVectorizedResolver(orders_=w, max_weight=50, values_=p).resolve_orders()
+    greedy_w = await CouriersOrdersGreedyResolver(orders_=w, max_weight=50, values_=p).resolve_orders()
+    exact_p = sum(p[order_id] for order_id in exact_w)
+    greedy_p = sum(p[order_id] for order_id in greedy_w)
+
+    assert sum(w[order_id] for order_id in greedy_w) <= 50
+    if values:
+        assert 2 * greedy_p >= exact_p
+    else:
+        # with equal values taking the lightest orders first is optimal
+        assert greedy_p == exact_p
@@ -38,6 +38,11 @@ CASES = (
         ValidationError
     ),
 
+    (
+        ["10:45-10:30"],
+        ValidationError
+    ),
+
     (
         ["16:40-16:40"],
         ValidationError
@@ -0,0 +1,79 @@
+from random import randint, seed
+from time import perf_counter
+
+import pytest
+from marshmallow import ValidationError
+
+from store.api.domain import UniqueIdsValidator
+from store.api.schema import CouriersPostRequestSchema, OrdersPostRequestSchema
+from store.utils.testing.couriers_testing import generate_couriers
+from store.utils.testing.orders_testing import generate_orders
+
+
+def find_duplicates_quadratic(ids):
+    """
+    the previous implementation of the schemas, kept as a reference
+    """
+    ids_set, ids_list = set(), list()
+    for id_ in ids:
+        ids_set.add(id_)
+        ids_list.append(id_)
+    return [item for item in ids_set if ids_list.count(item) > 1]
+
+
+CASES = (
+    [],
+    [1, 2, 3],
+    [1, 1],
+    [3, 1, 2, 3, 1, 1],
+    [2 ** 31 - 1, 0, 2 ** 31 - 1, 8, 16, 0],
+)
+
+
+@pytest.mark.parametrize('ids', CASES)
+def test_unique_ids_validator(ids):
+    expected = find_duplicates_quadratic(ids)
+    if expected:
+        with pytest.raises(ValidationError) as error:
+            UniqueIdsValidator.validate_unique_ids(ids)
+        assert error.value.messages == {'data': {'validation_error': [{'id': i} for i in expected]}}
+    else:
+        UniqueIdsValidator.validate_unique_ids(ids)
+
+
+def test_unique_ids_validator_random():
+    seed(0)
+    for _ in range(100):
+        ids = [randint(0, 100) for _ in range(randint(0, 200))]
+        validator = UniqueIdsValidator()
+        for id_ in ids:
+            validator.add(id_)
+        assert validator.find_duplicates() == find_duplicates_quadratic(ids)
+
+
+# 10 000 items (the largest import allowed by the schemas) with every id
+# repeated must be validated in linear time
+VALIDATION_TIME_LIMIT = 0.1
+
+
+@pytest.mark.parametrize('ids', (
+    list(range(10000)),
+    [i % 5000 for i in range(10000)],
+))
+def test_unique_ids_validator_benchmark(ids):
+    started = perf_counter()
+    try:
+        UniqueIdsValidator.validate_unique_ids(ids)
+    except ValidationError:
+        pass
+    assert perf_counter() - started < VALIDATION_TIME_LIMIT
+
+
+@pytest.mark.parametrize('schema, items', (
+    (CouriersPostRequestSchema(), generate_couriers(couriers_num=5000) * 2),
+    (OrdersPostRequestSchema(), generate_orders(orders_num=5000) * 2),
+))
+def test_import_schemas_report_duplicates(schema, items):
+    with pytest.raises(ValidationError) as error:
+        schema.load({'data': items})
+    assert len(error.value.messages['data']['validation_error']) == 5000
@@ -16,7 +16,16 @@ async def migrated_postgres(alembic_config, postgres):
 
 
 @pytest.fixture
-def arguments(aiomisc_unused_port, migrated_postgres):
+def extra_arguments():
+    """
+    Дополнительные аргументы для запуска приложения, тесты могут
+    переопределить их с помощью pytest.mark.parametrize.
+    """
+    return []
+
+
+@pytest.fixture
+def arguments(aiomisc_unused_port, migrated_postgres, extra_arguments):
     """
     Аргументы для запуска приложения.
     """
@@ -25,7 +34,8 @@ def arguments(aiomisc_unused_port, migrated_postgres):
             '--log-level=debug',
             '--api-address=127.0.0.1',
             f'--api-port={aiomisc_unused_port}',
-            f'--pg-url={migrated_postgres}'
+            f'--pg-url={migrated_postgres}',
+            *extra_arguments
         ]
     )
 
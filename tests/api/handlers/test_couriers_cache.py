@@ -0,0 +1,24 @@
+from http import HTTPStatus
+
+from store.api.handlers import CacheStatsView
+from store.utils.testing.couriers_testing import generate_courier, get_courier_for_testing, import_couriers
+
+
+async def get_cache_stats(client):
+    response = await client.get(CacheStatsView.URL_PATH)
+    assert response.status == HTTPStatus.OK
+    return (await response.json())['couriers']
+
+
+async def test_couriers_cache_invalidated_by_patch(api_client):
+    courier = generate_courier(courier_id=1, courier_type='foot', regions=[1, 2], working_hours=['09:00-18:00'])
+    await import_couriers(api_client, [courier])
+
+    for _ in range(3):
+        assert (await get_courier_for_testing(api_client, 1))['regions'] == [1, 2]
+    stats = await get_cache_stats(api_client)
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+    response = await api_client.patch('/couriers/1', json={'regions': [3]})
+    assert response.status == HTTPStatus.OK
+    assert (await get_courier_for_testing(api_client, 1))['regions'] == [3]
@@ -60,6 +60,7 @@ CASES = (
 )
 
 
+@pytest.mark.parametrize('extra_arguments', ([], ['--pg-denormalized-reads']))
 @pytest.mark.parametrize('courier, orders_assign, orders_complete_ids, expected_status, expected_courier', CASES)
 async def test_couriers_get(api_client, courier, orders_assign, orders_complete_ids, expected_status, expected_courier):
     await import_couriers(api_client, [courier], HTTPStatus.CREATED)
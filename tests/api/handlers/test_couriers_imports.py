@@ -1,4 +1,7 @@
+import logging
 from http import HTTPStatus
+from time import perf_counter
+from store.api.handlers import CouriersImportsView
 from store.utils.pg import MAX_INTEGER
 import pytest
 
@@ -7,6 +10,8 @@ from store.utils.testing.couriers_testing import (
     import_couriers, compare_couriers
 )
 
+log = logging.getLogger(__name__)
+
 LONGEST_STR = 'ё' * 256
 CASES = (
     # just courier
@@ -93,6 +98,24 @@ CASES = (
         HTTPStatus.BAD_REQUEST
     ),
 
+    # inverted interval within the same hour, must not reach the
+    # int4range(time_start, time_finish) of the denormalization triggers
+    (
+        [
+            {
+            "courier_id": 1,
+            "courier_type": "foot",
+            "regions": [
+                1
+            ],
+            "working_hours": [
+                "10:45-10:30"
+            ]
+            }
+        ],
+        HTTPStatus.BAD_REQUEST
+    ),
+
 
 
     # standart input
@@ -139,6 +162,7 @@ CASES = (
 )
 
 
+@pytest.mark.parametrize('extra_arguments', ([], ['--streaming-imports']))
 @pytest.mark.parametrize('couriers, expected_status', CASES)
 async def test_couriers_import(api_client, couriers, expected_status):
     data = await import_couriers(api_client, couriers, expected_status)
@@ -149,15 +173,46 @@ async def test_couriers_import(api_client, couriers, expected_status):
             imported_courier = await get_courier_for_testing(api_client, courier['courier_id'])
             assert compare_couriers(courier, imported_courier)
 
-"""
-# the largest input possible
-    (
-        generate_couriers(
-            couriers_num=10000,
-            start_courier_id=MAX_INTEGER - 10000,
-            # regions=[MAX_INTEGER for i in range(10000)],
-            # working_hours=["09:00-18:00" for i in range(10000)]
-        ),
-        HTTPStatus.CREATED
-    ),
-"""
\ No newline at end of file
+
+# 10 000 couriers with regions and working hours are written to the db with
+# COPY and set-based INSERT ... SELECT well under a second
+IMPORT_TIME_LIMIT = 1
+# The whole request also parses and validates the payload with marshmallow,
+# which alone takes ~0.7s for 10 000 couriers on a developer machine, so the
+# end-to-end limit leaves room for that and for slower CI machines
+REQUEST_TIME_LIMIT = 3
+
+
+def generate_import_benchmark_couriers():
+    return generate_couriers(
+        couriers_num=10000,
+        start_courier_id=MAX_INTEGER - 10000,
+        regions=[1, 2, 3],
+        working_hours=["09:00-13:00", "14:00-18:00"]
+    )
+
+
+async def test_couriers_import_db_benchmark(api_client):
+    couriers = generate_import_benchmark_couriers()
+    started = perf_counter()
+    async with api_client.server.app['pg'].transaction() as conn:
+        await CouriersImportsView.copy_couriers(conn, couriers)
+    elapsed = perf_counter() - started
+    log.info('wrote %d couriers to db in %.3fs', len(couriers), elapsed)
+    assert elapsed < IMPORT_TIME_LIMIT
+
+    courier = couriers[-1]
+    assert compare_couriers(courier, await get_courier_for_testing(api_client, courier['courier_id']))
+
+
+@pytest.mark.parametrize('extra_arguments', ([], ['--streaming-imports']))
+async def test_couriers_import_benchmark(api_client):
+    couriers = generate_import_benchmark_couriers()
+    started = perf_counter()
+    await import_couriers(api_client, couriers, HTTPStatus.CREATED)
+    elapsed = perf_counter() - started
+    log.info('imported %d couriers in %.3fs', len(couriers), elapsed)
+    assert elapsed < REQUEST_TIME_LIMIT
+
+    courier = couriers[-1]
+    assert compare_couriers(courier, await get_courier_for_testing(api_client, courier['courier_id']))
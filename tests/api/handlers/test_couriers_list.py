@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+
+from store.api.handlers import CouriersImportsView
+from store.utils.testing.couriers_testing import (
+    compare_courier_groups, generate_courier, generate_couriers, import_couriers, list_couriers
+)
+
+COURIERS = [
+    generate_courier(courier_id=1, courier_type='foot', regions=[1, 2], working_hours=['09:00-18:00']),
+    generate_courier(courier_id=2, courier_type='car', regions=[2], working_hours=[]),
+    generate_courier(courier_id=5, courier_type='car', regions=[], working_hours=['10:00-11:00', '12:00-13:00']),
+]
+
+CASES = (
+    ({}, HTTPStatus.OK, [1, 2, 5]),
+    ({'after': 1}, HTTPStatus.OK, [2, 5]),
+    ({'after': 1, 'limit': 1}, HTTPStatus.OK, [2]),
+    ({'after': 5}, HTTPStatus.OK, []),
+    ({'region': 2}, HTTPStatus.OK, [1, 2]),
+    ({'type': 'car'}, HTTPStatus.OK, [2, 5]),
+    ({'type': 'car', 'region': 2}, HTTPStatus.OK, [2]),
+    ({'limit': 0}, HTTPStatus.BAD_REQUEST, None),
+    ({'type': 'plane'}, HTTPStatus.BAD_REQUEST, None),
+    ({'unknown': 1}, HTTPStatus.BAD_REQUEST, None),
+)
+
+
+@pytest.mark.parametrize('extra_arguments', ([], ['--pg-denormalized-reads']))
+@pytest.mark.parametrize('params, expected_status, expected_ids', CASES)
+async def test_couriers_list(api_client, params, expected_status, expected_ids):
+    await import_couriers(api_client, COURIERS)
+    couriers = await list_couriers(api_client, params, expected_status)
+
+    if expected_status == HTTPStatus.OK:
+        # Курьеры отсортированы по courier_id
+        assert [courier['courier_id'] for courier in couriers] == expected_ids
+        expected = [courier for courier in COURIERS if courier['courier_id'] in expected_ids]
+        assert compare_courier_groups(couriers, expected)
+
+
+async def test_couriers_list_pages(api_client):
+    couriers = generate_couriers(couriers_num=250, regions=[1], working_hours=['09:00-18:00'])
+    await import_couriers(api_client, couriers)
+
+    listed, after = [], None
+    while True:
+        params = {'limit': 100} if after is None else {'limit': 100, 'after': after}
+        page = await list_couriers(api_client, params)
+        if not page:
+            break
+        listed.extend(page)
+        after = page[-1]['courier_id']
+
+    assert compare_courier_groups(listed, couriers)
+
+
+async def test_couriers_list_gzip(api_client):
+    await import_couriers(api_client, COURIERS)
+
+    response = await api_client.get(CouriersImportsView.URL_PATH, headers={'Accept-Encoding': 'gzip'})
+    assert response.status == HTTPStatus.OK
+    assert response.headers['Content-Encoding'] == 'gzip'
+    # Клиент распаковывает ответ сам
+    data = await response.json()
+    assert compare_courier_groups(data['data'], COURIERS)
@@ -28,6 +28,17 @@ CASES = (
         dict({'courier_id': 1, 'courier_type': 'foot', 'regions': [], 'working_hours': []}),
         list([])
     ),
+
+    # inverted interval within the same hour is rejected before the
+    # denormalization triggers build int4range(time_start, time_finish)
+    (
+        {'courier_id': 1, 'courier_type': 'foot', 'regions': [1], 'working_hours': ['09:00-18:00']},
+        list([]),
+        dict({'working_hours': ['10:45-10:30']}),
+        HTTPStatus.BAD_REQUEST,
+        None,
+        list([])
+    ),
 )
 
 
@@ -0,0 +1,74 @@
+import datetime
+from http import HTTPStatus
+
+import pytest
+
+from store.api.domain import ISODatetimeFormatConverter
+from store.db.schema import couriers_regions_stats_table, couriers_stats_table
+from store.db.stats import backfill, check
+from store.utils.testing.couriers_testing import generate_courier, get_courier, import_couriers, patch_courier
+from store.utils.testing.orders_testing import assign_orders, complete_orders, generate_order, import_orders
+
+CASES = (
+    # one sequence of two orders in different regions, both delivered
+    (
+        [generate_order(order_id=1, weight=1.0, region=1, delivery_hours=['09:00-18:00']),
+         generate_order(order_id=2, weight=1.0, region=2, delivery_hours=['09:00-18:00'])],
+        [(1, 10), (2, 30)],
+        {'completed_sequences': 1, 'deliveries': 2}
+    ),
+
+    # sequence is not completed until every order is delivered
+    (
+        [generate_order(order_id=1, weight=1.0, region=1, delivery_hours=['09:00-18:00']),
+         generate_order(order_id=2, weight=1.0, region=1, delivery_hours=['09:00-18:00'])],
+        [(1, 10)],
+        {'completed_sequences': 0, 'deliveries': 1}
+    ),
+)
+
+
+async def assign_and_complete(client, courier_id, completions):
+    assignment = await assign_orders(client, courier_id)
+    assign_time = await ISODatetimeFormatConverter.parse_iso_string(assignment['assign_time'])
+    for order_id, minutes in completions:
+        complete_time = assign_time + datetime.timedelta(minutes=minutes)
+        await complete_orders(client, courier_id, order_id, complete_time.isoformat('T') + 'Z')
+
+
+@pytest.mark.parametrize('orders, completions, expected', CASES)
+async def test_couriers_stats(api_client, migrated_postgres_connection, orders, completions, expected):
+    courier = generate_courier(courier_id=1, courier_type='foot', regions=[1, 2], working_hours=['09:00-18:00'])
+    await import_couriers(api_client, [courier])
+    await import_orders(api_client, orders)
+    await assign_and_complete(api_client, 1, completions)
+
+    conn = migrated_postgres_connection
+    stats = conn.execute(couriers_stats_table.select()).fetchall()
+    assert sum(row['completed_sequences'] for row in stats) == expected['completed_sequences']
+    regions_stats = conn.execute(couriers_regions_stats_table.select()).fetchall()
+    assert sum(row['deliveries_count'] for row in regions_stats) == expected['deliveries']
+    assert check(conn)
+
+    # broken stats are found by the checker and fixed by backfill
+    conn.execute(couriers_regions_stats_table.delete())
+    assert check(conn) == (expected['deliveries'] == 0)
+    backfill(conn)
+    assert check(conn)
+
+
+async def test_couriers_stats_sequence_completed_by_patch(api_client, migrated_postgres_connection):
+    courier = generate_courier(courier_id=1, courier_type='foot', regions=[1, 2], working_hours=['09:00-18:00'])
+    await import_couriers(api_client, [courier])
+    await import_orders(api_client, [
+        generate_order(order_id=1, weight=1.0, region=1, delivery_hours=['09:00-18:00']),
+        generate_order(order_id=2, weight=1.0, region=2, delivery_hours=['09:00-18:00']),
+    ])
+    await assign_and_complete(api_client, 1, [(1, 10)])
+
+    # the courier leaves region 2, so the only undelivered order is declined
+    await patch_courier(api_client, 1, {'regions': [1]})
+    assert check(migrated_postgres_connection)
+
+    actual_courier = await get_courier(api_client, 1, HTTPStatus.OK)
+    assert actual_courier['earnings'] == 1000
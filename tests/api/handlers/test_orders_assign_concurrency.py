@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from collections import Counter
+from time import perf_counter
+
+import pytest
+
+from store.db.schema import orders_table
+from store.utils.testing.couriers_testing import generate_couriers, import_couriers
+from store.utils.testing.orders_testing import assign_orders, generate_orders, import_orders
+
+log = logging.getLogger(__name__)
+
+COURIERS_NUM = 300
+
+CASES = (
+    # orders are scarce: most couriers compete for the same ones
+    200,
+    # enough orders for every courier
+    3000,
+)
+
+
+@pytest.mark.parametrize('extra_arguments', (['--pg-pool-max-size=20'],))
+@pytest.mark.parametrize('orders_num', CASES)
+async def test_orders_assign_concurrency(api_client, migrated_postgres_connection, orders_num):
+    couriers = generate_couriers(couriers_num=COURIERS_NUM, start_courier_id=1, courier_type='bike',
+                                 regions=[1], working_hours=['09:00-18:00'])
+    orders = generate_orders(orders_num=orders_num, start_order_id=1, region=1, delivery_hours=['10:00-12:00'])
+    await import_couriers(api_client, couriers)
+    await import_orders(api_client, orders)
+
+    started = perf_counter()
+    assignments = await asyncio.gather(*[
+        assign_orders(api_client, courier['courier_id']) for courier in couriers
+    ])
+    duration = perf_counter() - started
+    log.info('%d parallel assignments on %d orders: %.2f requests/s',
+             COURIERS_NUM, orders_num, COURIERS_NUM / duration)
+
+    # Ни один заказ не назначен дважды
+    assigned = Counter(order['id'] for assignment in assignments for order in assignment['orders'])
+    assert all(count == 1 for count in assigned.values())
+
+    # Ответы совпадают с тем, что записано в БД
+    rows = migrated_postgres_connection.execute(
+        orders_table.select().where(orders_table.c.courier_id.isnot(None))
+    ).fetchall()
+    assert {row['order_id']: row['courier_id'] for row in rows} == {
+        order['id']: courier['courier_id']
+        for courier, assignment in zip(couriers, assignments) for order in assignment['orders']
+    }
+
@@ -113,6 +113,19 @@ CASES = (
       HTTPStatus.BAD_REQUEST
     ),
 
+    # inverted interval within the same hour (int4range(645, 630) is invalid)
+    (
+        [{
+            "order_id": 1,
+            "weight": 1,
+            "region": 12,
+            "delivery_hours": [
+                "10:45-10:30"
+            ],
+        }],
+      HTTPStatus.BAD_REQUEST
+    ),
+
 
 
     # standart input
@@ -150,6 +163,7 @@ CASES = (
 )
 
 
+@pytest.mark.parametrize('extra_arguments', ([], ['--streaming-imports']))
 @pytest.mark.parametrize('orders, expected_status', CASES)
 async def test_orders_import(api_client, orders, expected_status):
     data = await import_orders(api_client, orders, expected_status)
@@ -0,0 +1,50 @@
+import datetime
+from http import HTTPStatus
+
+import pytest
+
+from store.api.domain import ISODatetimeFormatConverter
+
+from store.utils.testing.couriers_testing import generate_courier, import_couriers
+from store.utils.testing.orders_testing import (
+    assign_orders, complete_orders, generate_order, import_orders, list_orders
+)
+
+COURIER = generate_courier(courier_id=1, courier_type='car', regions=[1], working_hours=['09:00-18:00'])
+
+ORDERS = [
+    generate_order(order_id=1, weight=1.0, region=1, delivery_hours=['09:00-18:00']),
+    generate_order(order_id=2, weight=1.0, region=1, delivery_hours=['09:00-18:00']),
+    generate_order(order_id=3, weight=1.0, region=2, delivery_hours=['09:00-18:00']),
+]
+
+CASES = (
+    ({}, HTTPStatus.OK, [1, 2, 3]),
+    ({'after': 1, 'limit': 1}, HTTPStatus.OK, [2]),
+    ({'region': 2}, HTTPStatus.OK, [3]),
+    ({'courier_id': 1}, HTTPStatus.OK, [1, 2]),
+    ({'state': 'unassigned'}, HTTPStatus.OK, [3]),
+    ({'state': 'assigned'}, HTTPStatus.OK, [2]),
+    ({'state': 'completed'}, HTTPStatus.OK, [1]),
+    ({'state': 'lost'}, HTTPStatus.BAD_REQUEST, None),
+    ({'after': -1}, HTTPStatus.BAD_REQUEST, None),
+)
+
+
+@pytest.mark.parametrize('extra_arguments', ([], ['--pg-denormalized-reads']))
+@pytest.mark.parametrize('params, expected_status, expected_ids', CASES)
+async def test_orders_list(api_client, params, expected_status, expected_ids):
+    await import_couriers(api_client, [COURIER])
+    await import_orders(api_client, ORDERS)
+    assignment = await assign_orders(api_client, COURIER['courier_id'])
+    assign_time = await ISODatetimeFormatConverter.parse_iso_string(assignment['assign_time'])
+    complete_time = assign_time + datetime.timedelta(minutes=10)
+    await complete_orders(api_client, COURIER['courier_id'], 1, complete_time.isoformat('T') + 'Z')
+
+    orders = await list_orders(api_client, params, expected_status)
+
+    if expected_status == HTTPStatus.OK:
+        assert [order['order_id'] for order in orders] == expected_ids
+        for order in orders:
+            assert bool(order['assign_time']) == (order['order_id'] != 3)
+            assert bool(order['complete_time']) == (order['order_id'] == 1)
@@ -19,6 +19,20 @@ CASES = (
         HTTPStatus.OK,
         []
     ),
+
+    # ends of intervals are not counted: touching intervals don't intersect
+    (
+        {'courier_id': 1, 'courier_type': 'foot', 'regions': [1, 2], 'working_hours': ["09:00-12:00", "18:00-20:00"]},
+        [
+            {'order_id': 1, 'weight': 0.1, 'region': 1, 'delivery_hours': ["12:00-15:00"]},
+            {'order_id': 2, 'weight': 0.1, 'region': 2, 'delivery_hours': ["11:59-15:00"]},
+            {'order_id': 3, 'weight': 0.1, 'region': 3, 'delivery_hours': ["09:00-12:00"]},
+            {'order_id': 4, 'weight': 0.1, 'region': 1, 'delivery_hours': ["07:00-09:00", "19:00-19:30"]},
+            {'order_id': 5, 'weight': 10.1, 'region': 1, 'delivery_hours': ["09:00-12:00"]},
+        ],
+        HTTPStatus.OK,
+        [2, 4]
+    ),
 )
 
 
@@ -32,3 +46,4 @@ async def test_orders_post_assign(api_client, courier, orders, expected_status,
     third_assignment = await assign_orders(api_client, courier['courier_id'], expected_status)
 
     assert first_assignment == second_assignment and second_assignment == third_assignment
+    assert [order['id'] for order in first_assignment['orders']] == orders_assigned_ids
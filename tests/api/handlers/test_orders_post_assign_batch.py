@@ -0,0 +1,66 @@
+from http import HTTPStatus
+
+import pytest
+from store.api.handlers import OrdersBatchAssignmentView
+from store.utils.testing.couriers_testing import import_couriers
+
+from store.utils.testing.orders_testing import assign_orders, assign_orders_batch, import_orders
+
+CASES = (
+    # couriers without regions or working hours get nothing
+    (
+        [{'courier_id': 1, 'courier_type': 'foot', 'regions': [], 'working_hours': []},
+         {'courier_id': 2, 'courier_type': 'foot', 'regions': [1], 'working_hours': []}],
+        [{'order_id': 1, 'weight': 0.1, 'region': 1, 'delivery_hours': ["09:00-18:00"]}],
+        {1: [], 2: []}
+    ),
+
+    # order available to both couriers goes to the first one only
+    (
+        [{'courier_id': 1, 'courier_type': 'foot', 'regions': [1], 'working_hours': ["09:00-12:00"]},
+         {'courier_id': 2, 'courier_type': 'foot', 'regions': [1, 2], 'working_hours': ["11:00-15:00"]}],
+        [{'order_id': 1, 'weight': 5, 'region': 1, 'delivery_hours': ["11:00-12:00"]},
+         {'order_id': 2, 'weight': 5, 'region': 2, 'delivery_hours': ["12:00-13:00"]},
+         {'order_id': 3, 'weight': 5, 'region': 1, 'delivery_hours': ["12:00-13:00"]}],
+        {1: [1], 2: [2, 3]}
+    ),
+
+    # capacity is checked per courier type
+    (
+        [{'courier_id': 1, 'courier_type': 'foot', 'regions': [1], 'working_hours': ["09:00-18:00"]},
+         {'courier_id': 2, 'courier_type': 'car', 'regions': [1], 'working_hours': ["09:00-18:00"]}],
+        [{'order_id': 1, 'weight': 30, 'region': 1, 'delivery_hours': ["09:00-18:00"]},
+         {'order_id': 2, 'weight': 9, 'region': 1, 'delivery_hours': ["09:00-18:00"]}],
+        {1: [2], 2: [1]}
+    ),
+)
+
+
+@pytest.mark.parametrize('couriers, orders, expected', CASES)
+async def test_orders_post_assign_batch(api_client, couriers, orders, expected):
+    await import_couriers(api_client, couriers, HTTPStatus.CREATED)
+    await import_orders(api_client, orders, HTTPStatus.CREATED)
+    couriers_ids = [courier['courier_id'] for courier in couriers]
+
+    first_assignment = await assign_orders_batch(api_client, couriers_ids)
+    second_assignment = await assign_orders_batch(api_client, couriers_ids)
+
+    assert first_assignment == second_assignment
+    assigned = {
+        courier['courier_id']: sorted(order['id'] for order in courier['orders'])
+        for courier in first_assignment['couriers']
+    }
+    assert assigned == expected
+
+    # Назначения видны обработчику для одного курьера
+    for courier_id, orders_ids in expected.items():
+        assignment = await assign_orders(api_client, courier_id)
+        assert sorted(order['id'] for order in assignment['orders']) == orders_ids
+
+
+async def test_orders_post_assign_batch_unknown_courier(api_client):
+    await import_couriers(api_client, [{'courier_id': 1, 'courier_type': 'foot', 'regions': [], 'working_hours': []}])
+
+    response = await api_client.post(OrdersBatchAssignmentView.URL_PATH, json={'couriers': [{'id': 1}, {'id': 2}]})
+    assert response.status == HTTPStatus.BAD_REQUEST
+    assert await response.json() == {'validation_error': {'couriers': [{'id': 2}]}}
@@ -0,0 +1,94 @@
+import datetime
+from http import HTTPStatus
+
+import pytest
+
+from store.api.domain import ISODatetimeFormatConverter
+from store.db.schema import orders_table
+from store.db.stats import check
+from store.utils.testing.couriers_testing import get_courier, import_couriers
+from store.utils.testing.orders_testing import assign_orders, complete_orders_batch, import_orders
+
+COURIERS = [
+    {'courier_id': 1, 'courier_type': 'foot', 'regions': [1, 2], 'working_hours': ["09:00-18:00"]},
+    {'courier_id': 2, 'courier_type': 'foot', 'regions': [3], 'working_hours': ["09:00-18:00"]},
+]
+
+ORDERS = [
+    {'order_id': 1, 'weight': 1, 'region': 1, 'delivery_hours': ["09:00-18:00"]},
+    {'order_id': 2, 'weight': 1, 'region': 2, 'delivery_hours': ["09:00-18:00"]},
+    {'order_id': 3, 'weight': 1, 'region': 1, 'delivery_hours': ["09:00-18:00"]},
+    {'order_id': 4, 'weight': 1, 'region': 3, 'delivery_hours': ["09:00-18:00"]},
+]
+
+CASES = (
+    # items are given out of order: chain is built by completion time
+    (
+        [(1, 3, 30), (1, 1, 10), (1, 2, 20)],
+        ['completed', 'completed', 'completed'],
+        {1: 0, 2: 10, 3: 20},
+        1
+    ),
+
+    # orders of different couriers have independent chains
+    (
+        [(1, 1, 10), (2, 4, 15)],
+        ['completed', 'completed'],
+        {1: 0, 4: 0},
+        0
+    ),
+
+    # per item errors do not fail the batch
+    (
+        [(1, 1, 10), (2, 2, 10), (1, 5, 10), (1, 3, 0)],
+        ['completed', 'not_assigned', 'not_assigned', 'invalid_complete_time'],
+        {1: 0},
+        0
+    ),
+)
+
+
+@pytest.mark.parametrize('items, expected_statuses, expected_start_minutes, expected_sequences', CASES)
+async def test_orders_post_complete_batch(api_client, migrated_postgres_connection, items, expected_statuses,
+                                          expected_start_minutes, expected_sequences):
+    await import_couriers(api_client, COURIERS)
+    await import_orders(api_client, ORDERS)
+
+    assign_times = {}
+    for courier in COURIERS:
+        assignment = await assign_orders(api_client, courier['courier_id'])
+        assign_times[courier['courier_id']] = \
+            await ISODatetimeFormatConverter.parse_iso_string(assignment['assign_time'])
+
+    def make_items():
+        return [
+            {'courier_id': courier_id, 'order_id': order_id,
+             'complete_time': (assign_times[courier_id] + datetime.timedelta(minutes=minutes)).isoformat('T') + 'Z'}
+            for courier_id, order_id, minutes in items
+        ]
+
+    result = await complete_orders_batch(api_client, make_items())
+    assert [item['status'] for item in result['orders']] == expected_statuses
+
+    # Повторная отправка (например, после потери ответа) ничего не меняет
+    repeated = await complete_orders_batch(api_client, make_items())
+    assert [item['status'] for item in repeated['orders']] == [
+        'already_completed' if status == 'completed' else status for status in expected_statuses
+    ]
+
+    rows = migrated_postgres_connection.execute(
+        orders_table.select().where(orders_table.c.completion_time.isnot(None))
+    ).fetchall()
+    assert {
+        row['order_id']: (row['delivery_start_time'] - row['assignment_time']) / datetime.timedelta(minutes=1)
+        for row in rows
+    } == expected_start_minutes
+
+    assert check(migrated_postgres_connection)
+    courier = await get_courier(api_client, 1)
+    assert courier['earnings'] == expected_sequences * 1000
+
+
+async def test_orders_post_complete_batch_duplicates(api_client):
+    item = {'courier_id': 1, 'order_id': 1, 'complete_time': '2021-01-01T10:00:00Z'}
+    await complete_orders_batch(api_client, [item, item], HTTPStatus.BAD_REQUEST)
@@ -0,0 +1,39 @@
+import pytest
+
+from store.utils.testing.couriers_testing import (
+    generate_courier, get_courier_for_testing, import_couriers, patch_courier
+)
+from store.utils.testing.orders_testing import assign_orders, generate_order, get_order, import_orders
+
+
+@pytest.fixture
+def extra_arguments(migrated_postgres):
+    """
+    Та же БД в роли реплики: отставание 0, поэтому GET обработчики читают
+    через пул реплики.
+    """
+    return [f'--pg-replica-url={migrated_postgres}', '--couriers-cache-size=0']
+
+
+async def test_replica_reads_own_writes(api_client):
+    router = api_client.server.app['pg_router']
+    assert router.enabled and not router.lagging
+
+    await import_couriers(api_client, [
+        generate_courier(courier_id=1, courier_type='foot', regions=[1], working_hours=['09:00-18:00'])
+    ])
+    await import_orders(api_client, [
+        generate_order(order_id=1, weight=1, region=1, delivery_hours=['09:00-18:00'])
+    ])
+    assert router.choose(couriers=[1], orders=[1]) is router.replica
+    assert (await get_courier_for_testing(api_client, 1))['regions'] == [1]
+    assert (await get_order(api_client, 1))['courier_id'] == -1
+
+    await assign_orders(api_client, 1)
+    assert router.choose(orders=[1]) is router.primary
+    assert (await get_order(api_client, 1))['courier_id'] == 1
+
+    await patch_courier(api_client, 1, {'regions': [2]})
+    assert router.choose(couriers=[1]) is router.primary
+    assert (await get_courier_for_testing(api_client, 1))['regions'] == [2]
+    assert (await get_order(api_client, 1))['courier_id'] == -1
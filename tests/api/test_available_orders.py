@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from store.api.handlers.query import AvailableOrdersDefiner
+from store.utils.solver import OrdersSolver
+
+
+class FakeConnection:
+    """
+    Отвечает на CLAIM_ORDERS так, как будто заказы taken заблокированы
+    другими транзакциями.
+    """
+    def __init__(self, taken):
+        self.taken = set(taken)
+        self.claims = []
+
+    async def fetch(self, query, orders_ids):
+        self.claims.append(sorted(orders_ids))
+        return [{'order_id': id_} for id_ in orders_ids if id_ not in self.taken]
+
+
+@pytest.fixture
+def definer():
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        yield AvailableOrdersDefiner(OrdersSolver(executor, timeout=10))
+    finally:
+        executor.shutdown()
+
+
+CASES = (
+    # nothing is taken: the first solution is locked as is
+    ({1: 4, 2: 9, 3: 6}, 10, [], [1, 3]),
+    # a chosen order is taken: solved again without it
+    ({1: 4, 2: 5, 3: 6, 4: 9.5}, 10, [3], [1, 2]),
+    # everything is taken
+    ({1: 4, 2: 5}, 10, [1, 2], []),
+)
+
+
+@pytest.mark.parametrize('available, max_weight, taken, expected', CASES)
+async def test_claim_orders(definer, available, max_weight, taken, expected):
+    conn = FakeConnection(taken)
+    ids = await definer.claim_orders(conn, dict(available), max_weight)
+
+    assert sorted(ids) == expected
+    assert not set(ids) & set(taken)
+    assert sum(available[id_] for id_ in ids) <= max_weight
+
+
+async def test_claim_orders_resolves_on_locked(definer):
+    # Каждое решение теряет один заказ: после CLAIM_ATTEMPTS попыток заказы
+    # выбираются из тех, что удалось заблокировать
+    available = {id_: 1 for id_ in range(10)}
+    conn = FakeConnection(taken=[])
+    locked = set()
+
+    async def fetch(query, orders_ids):
+        conn.claims.append(orders_ids)
+        # Первый из заказов каждого запроса достается другой транзакции
+        conn.taken.add(orders_ids[0])
+        locked.update(orders_ids[1:])
+        return [{'order_id': id_} for id_ in orders_ids[1:]]
+
+    conn.fetch = fetch
+    ids = await definer.claim_orders(conn, available, max_weight=5)
+
+    assert len(conn.claims) == definer.CLAIM_ATTEMPTS
+    assert ids and set(ids) <= locked
+    assert not set(ids) & conn.taken
+    assert len(ids) <= 5
+
+
+def make_courier(courier_id, carrying_capacity=10):
+    return {
+        'courier_id': courier_id, 'regions': [1], 'carrying_capacity': carrying_capacity,
+        'working_hours': [{'time_start': 540, 'time_finish': 1080}],
+    }
+
+
+def make_orders(weights):
+    return [
+        {'order_id': id_, 'weight': weight, 'region': 1, 'time_start': [600], 'time_finish': [660]}
+        for id_, weight in weights.items()
+    ]
+
+
+BATCH_CASES = (
+    # nothing is taken: only the chosen orders are locked
+    ({1: 4, 2: 9, 3: 6, 4: 10, 5: 10}, 1, [], {1: [1, 3]}),
+    # a chosen order is taken: the courier is solved again without it
+    ({1: 4, 2: 5, 3: 6, 4: 9.5}, 1, [3], {1: [1, 2]}),
+    # orders are shared between couriers: the first one lost its order and
+    # gets the one left after the second
+    ({1: 10, 2: 10, 3: 10}, 2, [1], {1: [3], 2: [2]}),
+    # everything is taken
+    ({1: 4, 2: 5}, 2, [1, 2], {1: [], 2: []}),
+)
+
+
+@pytest.mark.parametrize('weights, couriers_num, taken, expected', BATCH_CASES)
+async def test_claim_orders_batch(definer, weights, couriers_num, taken, expected):
+    conn = FakeConnection(taken)
+    couriers = [make_courier(courier_id) for courier_id in range(1, couriers_num + 1)]
+    couriers_orders = await definer.claim_orders_batch(conn, couriers, make_orders(weights))
+
+    assert {courier_id: sorted(ids) for courier_id, ids in couriers_orders.items()} == expected
+    # Блокируются только выбранные решением заказы, а не все кандидаты
+    claimed = {id_ for claim in conn.claims for id_ in claim}
+    chosen = {id_ for ids in couriers_orders.values() for id_ in ids}
+    assert claimed - set(taken) == chosen
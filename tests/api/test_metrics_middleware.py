@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+import pytest
+from aiohttp.web_app import Application
+from aiohttp.web_exceptions import HTTPNotFound
+from aiohttp.web_response import Response
+from aiohttp.web_urldispatcher import View
+from prometheus_client import REGISTRY
+
+from store.api.middleware import metrics_middleware
+
+
+class PingView(View):
+    async def get(self):
+        return Response(text='pong')
+
+
+class MissingView(View):
+    async def get(self):
+        raise HTTPNotFound()
+
+
+class FailingView(View):
+    async def get(self):
+        raise RuntimeError
+
+
+def count(handler, status):
+    value = REGISTRY.get_sample_value('store_http_request_duration_seconds_count', {
+        'handler': handler, 'method': 'GET', 'status': str(status)
+    })
+    return value or 0
+
+
+CASES = (
+    ('/ping', 'PingView', HTTPStatus.OK),
+    ('/missing', 'MissingView', HTTPStatus.NOT_FOUND),
+    ('/failing', 'FailingView', HTTPStatus.INTERNAL_SERVER_ERROR),
+    ('/unknown', 'unmatched', HTTPStatus.NOT_FOUND),
+)
+
+
+@pytest.mark.parametrize('path,handler,status', CASES)
+async def test_metrics_middleware(aiohttp_client, path, handler, status):
+    app = Application(middlewares=[metrics_middleware])
+    app.router.add_route('*', '/ping', PingView)
+    app.router.add_route('*', '/missing', MissingView)
+    app.router.add_route('*', '/failing', FailingView)
+    client = await aiohttp_client(app)
+
+    before = count(handler, status)
+    response = await client.get(path)
+    assert response.status == status
+    assert count(handler, status) == before + 1
+    assert REGISTRY.get_sample_value('store_http_requests_in_progress', {
+        'handler': handler, 'method': 'GET'
+    }) == 0
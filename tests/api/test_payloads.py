@@ -0,0 +1,112 @@
+import gzip
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal
+from time import perf_counter
+
+import pytest
+
+from store.api.payloads import ENCODERS, AsyncGenJSONListPayload, JsonPayload, orjson, set_encoder
+from store.utils.testing.couriers_testing import generate_couriers
+
+log = logging.getLogger(__name__)
+
+AVAILABLE_ENCODERS = [name for name in ENCODERS if name != 'orjson' or orjson is not None]
+
+PAYLOADS = {
+    'courier': {
+        'courier_id': 1, 'courier_type': 'foot', 'regions': list(range(20)),
+        'working_hours': ['09:00-13:00', '14:00-18:00'], 'rating': 4.17, 'earnings': 1000
+    },
+    'order': {
+        'order_id': 1, 'weight': Decimal('0.23'), 'region': 12, 'delivery_hours': ['09:00-18:00'],
+        'courier_id': 2, 'assignment_time': datetime(2021, 3, 28, 10, 0, 0, 123456),
+        'delivery_start_time': datetime(2021, 3, 28, 10, 0), 'completion_time': datetime(2021, 3, 28, 10, 30)
+    },
+    'import': {'couriers': [{'id': courier_id} for courier_id in range(10000)]},
+    'couriers': {'data': generate_couriers(couriers_num=1000, regions=[1, 2, 3], working_hours=['09:00-18:00'])},
+}
+
+# serialization must be faster than 1 MB/s even on slow CI machines,
+# the actual throughput is logged (run pytest with --log-cli-level=info to see it)
+MIN_BYTES_PER_SECOND = 1024 ** 2
+
+
+@pytest.fixture(params=AVAILABLE_ENCODERS)
+def encoder(request):
+    try:
+        yield set_encoder(request.param)
+    finally:
+        set_encoder('json')
+
+
+@pytest.mark.parametrize('name', PAYLOADS)
+def test_encoders_benchmark(encoder, name):
+    expected = json.loads(ENCODERS['json'](PAYLOADS[name]))
+    assert json.loads(encoder(PAYLOADS[name])) == expected
+
+    size, runs = 0, 0
+    started = perf_counter()
+    while perf_counter() - started < 0.2:
+        size += len(encoder(PAYLOADS[name]))
+        runs += 1
+    bytes_per_second = size / (perf_counter() - started)
+    throughput = '{} {}: {:.1f} MB/s'.format(encoder.__name__, name, bytes_per_second / 1024 ** 2)
+    log.info(throughput)
+    assert bytes_per_second > MIN_BYTES_PER_SECOND, throughput
+
+
+def test_encoders_convert_types(encoder):
+    data = json.loads(encoder(PAYLOADS['order']))
+    assert data['weight'] == 0.23
+    assert data['assignment_time'] == '2021-03-28T10:00:00.123456'
+
+
+class Writer:
+    def __init__(self):
+        self.buffer = b''
+        self.writes = 0
+
+    async def write(self, data):
+        self.buffer += data
+        self.writes += 1
+
+
+async def rows(items):
+    for item in items:
+        yield item
+
+
+async def test_payloads(encoder):
+    assert json.loads(JsonPayload(PAYLOADS['courier'])._value) == PAYLOADS['courier']
+
+    writer = Writer()
+    await AsyncGenJSONListPayload(rows(PAYLOADS['couriers']['data'])).write(writer)
+    assert json.loads(writer.buffer) == PAYLOADS['couriers']
+
+
+@pytest.mark.parametrize('items, chunking, expected_writes', (
+    # empty list is written at once
+    ([], {}, 1),
+    # 64 KB chunks by default
+    (PAYLOADS['import']['couriers'], {}, 2),
+    (PAYLOADS['import']['couriers'], {'chunk_size': 1024}, 126),
+    # chunk_rows flushes the buffer earlier than chunk_size
+    (PAYLOADS['import']['couriers'], {'chunk_rows': 1000}, 11),
+    (PAYLOADS['import']['couriers'], {'chunk_size': 1}, 10001),
+))
+async def test_list_payload_chunks(items, chunking, expected_writes):
+    writer = Writer()
+    await AsyncGenJSONListPayload(rows(items), **chunking).write(writer)
+    assert json.loads(writer.buffer) == {'data': items}
+    assert writer.writes == expected_writes
+
+
+async def test_list_payload_gzip():
+    payload = AsyncGenJSONListPayload(rows(PAYLOADS['import']['couriers']), root_object='couriers', gzip=True)
+    assert payload.headers['Content-Encoding'] == 'gzip'
+
+    writer = Writer()
+    await payload.write(writer)
+    assert json.loads(gzip.decompress(writer.buffer)) == PAYLOADS['import']
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from aiohttp.web_exceptions import HTTPBadRequest, HTTPRequestEntityTooLarge
+from marshmallow import ValidationError
+
+from store.api.schema import MAX_IMPORT_ITEMS, CourierItemSchema, CouriersPostRequestSchema
+from store.api.streaming import StreamingItemsValidator
+from store.utils.testing.couriers_testing import generate_courier
+
+
+class ChunkedStream:
+    """
+    Отдает тело запроса маленькими частями, как aiohttp StreamReader.
+    """
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def read(self, n: int = -1) -> bytes:
+        size = self.chunk_size if n else 0
+        data, self.body = self.body[:size], self.body[size:]
+        return data
+
+
+async def validate(body: bytes, chunk_size: int = 2, **kwargs):
+    validator = StreamingItemsValidator(CourierItemSchema(), 'couriers', 'courier_id', chunk_size, **kwargs)
+    return [
+        [courier['courier_id'] for courier in chunk]
+        async for chunk in validator.iterate_chunks(ChunkedStream(body))
+    ]
+
+
+CASES = (
+    # invalid couriers are reported by their index
+    [generate_courier(courier_id=1), generate_courier(courier_id=-2), 5, generate_courier(courier_id=3)],
+    # not unique ids
+    [generate_courier(courier_id=1), generate_courier(courier_id=2), generate_courier(courier_id=1)],
+    # unknown field
+    [{**generate_courier(courier_id=1), 'field': 'value'}],
+)
+
+
+async def test_streaming_validator_yields_chunks():
+    couriers = [generate_courier(courier_id=i, regions=[1], working_hours=['09:00-18:00']) for i in range(5)]
+    chunks = await validate(json.dumps({'data': couriers}).encode())
+    assert chunks == [[0, 1], [2, 3], [4]]
+
+
+BODY_CASES = (
+    # too many couriers
+    {'data': [
+        generate_courier(courier_id=i, regions=[1], working_hours=[]) for i in range(MAX_IMPORT_ITEMS + 1)
+    ]},
+    # unknown field of the request, before and after data
+    {'field': 'value', 'data': []},
+    {'data': [generate_courier(courier_id=1)], 'field': 'value'},
+)
+
+
+@pytest.mark.parametrize('body', [{'data': couriers} for couriers in CASES] + list(BODY_CASES))
+async def test_streaming_validator_errors_match_schema(body):
+    with pytest.raises(ValidationError) as expected:
+        CouriersPostRequestSchema().load(body)
+
+    with pytest.raises(ValidationError) as streamed:
+        await validate(json.dumps(body).encode(), chunk_size=1000)
+
+    assert streamed.value.messages == expected.value.messages
+
+
+@pytest.mark.parametrize('body, error', (
+    (b'{"couriers": []}', ValidationError),
+    (b'{"data": {}}', ValidationError),
+    (b'{"data": [', HTTPBadRequest),
+))
+async def test_streaming_validator_rejects_malformed_body(body, error):
+    with pytest.raises(error):
+        await validate(body)
+
+
+async def test_streaming_validator_limits_body_size():
+    couriers = [generate_courier(courier_id=i) for i in range(10)]
+    body = json.dumps({'data': couriers}).encode()
+    with pytest.raises(HTTPRequestEntityTooLarge):
+        await validate(body, max_size=len(body) - 1)
+    assert len(await validate(body, max_size=len(body))) == 5
@@ -0,0 +1,49 @@
+from http import HTTPStatus
+
+import pytest
+from aiohttp.web_app import Application
+from aiohttp.web_exceptions import HTTPNotFound
+from aiohttp.web_response import Response
+from aiohttp.web_urldispatcher import View
+
+from store.api.middleware import TRACE_HEADER, tracing_middleware
+from store.utils.tracing import SlowRequests, span
+
+
+class PingView(View):
+    async def get(self):
+        with span('pg.query', query='ping'):
+            return Response(text='pong')
+
+
+class MissingView(View):
+    async def get(self):
+        raise HTTPNotFound()
+
+
+CASES = (
+    # Трассировка выключена
+    ('/ping', 0, {}, 0, None),
+    # Запрос с заголовком трассируется всегда
+    ('/ping', 0, {TRACE_HEADER: '1'}, 1, HTTPStatus.OK),
+    # Трассируются все запросы, но сохраняются только медленные
+    ('/ping', 1, {}, 0, None),
+    ('/missing', 0, {TRACE_HEADER: '1'}, 1, HTTPStatus.NOT_FOUND),
+)
+
+
+@pytest.mark.parametrize('path,sample_rate,headers,traces,status', CASES)
+async def test_tracing_middleware(aiohttp_client, path, sample_rate, headers, traces, status):
+    app = Application(middlewares=[tracing_middleware])
+    app['trace_sample_rate'] = sample_rate
+    app['slow_requests'] = SlowRequests(10, threshold=60)
+    app.router.add_route('*', '/ping', PingView)
+    app.router.add_route('*', '/missing', MissingView)
+    client = await aiohttp_client(app)
+
+    await client.get(path, headers=headers)
+    slow = app['slow_requests'].list()
+    assert len(slow) == traces
+    if traces:
+        assert slow[0]['status'] == status
+        assert slow[0]['path'] == path
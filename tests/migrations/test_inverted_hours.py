@@ -0,0 +1,44 @@
+"""
+До исправления проверки минут API принимал интервалы вида 10:45-10:30,
+миграции с int4range должны применяться и к таким данным.
+"""
+from alembic.command import upgrade
+from alembic.config import Config
+from sqlalchemy import create_engine
+
+
+SEED = (
+    "INSERT INTO couriers (courier_id, courier_type) VALUES (1, 'foot')",
+    'INSERT INTO working_hours (working_hours_id, time_start, time_finish) VALUES (1, 645, 630), (2, 540, 1080)',
+    'INSERT INTO couriers_working_hours (courier_id, working_hours_id) VALUES (1, 1), (1, 2)',
+    'INSERT INTO orders (order_id, weight, region) VALUES (1, 1, 1)',
+    'INSERT INTO delivery_hours (delivery_hours_id, time_start, time_finish) VALUES (1, 645, 630), (2, 540, 1080)',
+    'INSERT INTO orders_delivery_hours (order_id, delivery_hours_id) VALUES (1, 1), (1, 2)',
+)
+
+
+def test_migrations_repair_inverted_hours(alembic_config: Config, postgres):
+    upgrade(alembic_config, 'c2128e80fc9a')
+    engine = create_engine(postgres)
+    try:
+        with engine.begin() as conn:
+            for query in SEED:
+                conn.execute(query)
+
+        upgrade(alembic_config, 'head')
+
+        with engine.connect() as conn:
+            assert conn.execute(
+                'SELECT time_start, time_finish FROM working_hours ORDER BY working_hours_id'
+            ).fetchall() == [(630, 645), (540, 1080)]
+            assert conn.execute(
+                'SELECT time_start, time_finish FROM delivery_hours ORDER BY delivery_hours_id'
+            ).fetchall() == [(630, 645), (540, 1080)]
+            assert conn.execute(
+                'SELECT array_to_string(working_hours, \',\') FROM couriers'
+            ).scalar() == '[630,645),[540,1080)'
+            assert conn.execute(
+                'SELECT array_to_string(delivery_hours, \',\') FROM orders'
+            ).scalar() == '[630,645),[540,1080)'
+    finally:
+        engine.dispose()
@@ -0,0 +1,81 @@
+import pytest
+
+from store.utils.cache import CLEAR, NOTIFY_MAX_IDS, CouriersCache, LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = LRUCache(max_size=2, ttl=10, clock=clock)
+    for key in (1, 2):
+        cache.set(key, str(key), cache.token())
+    assert cache.get(1) == '1'
+
+    cache.set(3, '3', cache.token())
+    assert cache.get(2) is None
+    assert cache.get(1) == '1'
+    assert cache.get(3) == '3'
+    assert cache.stats == {'size': 2, 'max_size': 2, 'hits': 3, 'misses': 1, 'invalidations': 0}
+
+
+def test_cache_expires_entries(clock):
+    cache = LRUCache(max_size=2, ttl=10, clock=clock)
+    cache.set(1, '1', cache.token())
+    clock.now = 9
+    assert cache.get(1) == '1'
+    clock.now = 10
+    assert cache.get(1) is None
+    assert cache.stats['size'] == 0
+
+
+def test_cache_skips_values_read_before_invalidation(clock):
+    cache = LRUCache(max_size=2, ttl=10, clock=clock)
+    token = cache.token()
+    # another request changes the courier while the value is being read
+    cache.invalidate([2])
+    cache.set(1, 'stale', token)
+    assert cache.get(1) is None
+
+
+@pytest.mark.parametrize('max_size', (0, 1))
+def test_cache_size(clock, max_size):
+    cache = LRUCache(max_size=max_size, ttl=10, clock=clock)
+    cache.set(1, '1', cache.token())
+    assert (cache.get(1) == '1') is bool(max_size)
+
+
+class Connection:
+    def __init__(self):
+        self.queries = []
+
+    async def execute(self, *args):
+        self.queries.append(args)
+
+
+@pytest.mark.parametrize('courier_ids, payload', (
+    ([], None),
+    ([1, 2], '1,2'),
+    (range(NOTIFY_MAX_IDS + 1), CLEAR),
+))
+async def test_couriers_cache_notifications(clock, courier_ids, payload):
+    cache = CouriersCache(max_size=NOTIFY_MAX_IDS + 1, ttl=10, clock=clock)
+    conn = Connection()
+    await cache.notify(conn, courier_ids)
+    assert [query[-1] for query in conn.queries] == ([payload] if payload else [])
+
+    for courier_id in range(NOTIFY_MAX_IDS + 1):
+        cache.set(courier_id, courier_id, cache.token())
+    if payload:
+        cache.handle_notification(None, 0, 'couriers_cache', payload)
+    assert [courier_id for courier_id in courier_ids if cache.get(courier_id) is not None] == []
@@ -0,0 +1,37 @@
+import pytest
+
+from store.db.schema import couriers_table
+from store.utils.metrics import QUERY_NAMES, UNKNOWN_QUERY, query_name, register_query_names
+
+
+class View:
+    URL_PATH = '/view'
+    SELECT_ONE = 'SELECT 1'
+    limit = 'SELECT 2'
+
+
+def test_register_query_names():
+    register_query_names(View, prefix='View.')
+    assert query_name('SELECT 1') == 'View.select_one'
+    assert '/view' not in QUERY_NAMES
+    assert 'SELECT 2' not in QUERY_NAMES
+
+
+CASES = (
+    ('SELECT 42', UNKNOWN_QUERY),
+    (couriers_table.insert().values([{'courier_id': 1, 'courier_type': 'foot'}]), 'insert couriers'),
+    (couriers_table.delete(), 'delete couriers'),
+    (couriers_table.select(), 'select'),
+    (None, UNKNOWN_QUERY),
+)
+
+
+@pytest.mark.parametrize('query,expected', CASES)
+def test_query_name(query, expected):
+    assert query_name(query) == expected
+
+
+def test_statements_are_named():
+    from store.api.handlers.query import STATEMENTS
+
+    assert query_name(STATEMENTS['courier'].sql) == 'courier'
@@ -0,0 +1,67 @@
+import pytest
+from asyncpgsa.connection import compile_query
+from sqlalchemy import or_
+
+from store.db.schema import orders_table
+from store.utils.pg import MAX_QUERY_ARGS, PoolMonitor, equals_any
+
+
+def make_update(ids):
+    return orders_table.update().values({'courier_id': None}).where(equals_any(orders_table.c.order_id, ids))
+
+
+@pytest.mark.parametrize('ids', ([1], list(range(1000)), list(range(MAX_QUERY_ARGS + 1))))
+def test_equals_any_passes_one_array_param(ids):
+    sql, params = compile_query(make_update(ids))
+    assert sql == compile_query(make_update([0]))[0]
+    assert params == [None, ids]
+
+
+def test_or_chain_sql_depends_on_ids_count():
+    # То, от чего избавляет equals_any: каждое кол-во идентификаторов дает
+    # отдельный текст запроса
+    def make_or_update(ids):
+        return orders_table.update().values({'courier_id': None}).where(
+            or_(*[orders_table.c.order_id == id_ for id_ in ids]))
+
+    assert compile_query(make_or_update([1, 2]))[0] != compile_query(make_or_update([1, 2, 3]))[0]
+
+
+class FakePool:
+    def __init__(self, size, idle):
+        self.size, self.idle = size, idle
+
+    def get_size(self):
+        return self.size
+
+    def get_idle_size(self):
+        return self.idle
+
+
+@pytest.mark.parametrize('size,idle,saturated', (
+    (10, 0, True),
+    (10, 1, False),
+    # Пул еще может открыть новые соединения
+    (5, 0, False),
+))
+def test_pool_monitor_sample(size, idle, saturated):
+    monitor = PoolMonitor(FakePool(size, idle), max_size=10)
+    monitor.sample()
+    assert monitor.saturated == int(saturated)
+
+
+def test_pool_monitor_report(caplog):
+    pool = FakePool(10, 0)
+    monitor = PoolMonitor(pool, max_size=10)
+    monitor.sample()
+    pool.idle = 3
+    monitor.sample()
+
+    monitor.report(interval=10)
+    assert '50%' in caplog.text
+    assert monitor.samples == monitor.saturated == 0
+
+    caplog.clear()
+    monitor.sample()
+    monitor.report(interval=10)
+    assert not caplog.text
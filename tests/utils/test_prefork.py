@@ -0,0 +1,90 @@
+import os
+import signal
+import time
+
+import pytest
+
+from store.utils import prefork
+from store.utils.prefork import Master, split_pool_size
+
+
+CASES = (
+    (10, 1, 10),
+    (10, 4, 2),
+    (10, 20, 1),
+)
+
+
+@pytest.mark.parametrize('size,workers,expected', CASES)
+def test_split_pool_size(size, workers, expected):
+    assert split_pool_size(size, workers) == expected
+
+
+def read_pids(fd, count, timeout=10):
+    """
+    Читает pid запущенных рабочих процессов, которые они пишут в pipe.
+    """
+    pids, buffer, deadline = [], b'', time.monotonic() + timeout
+    while len(pids) < count:
+        assert time.monotonic() < deadline, 'workers were not started'
+        buffer += os.read(fd, 64)
+        *lines, buffer = buffer.split(b'\n')
+        pids.extend(int(line) for line in lines)
+    return pids
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+@pytest.fixture
+def master(monkeypatch):
+    monkeypatch.setattr(prefork, 'RESPAWN_DELAY', 0)
+    read_fd, write_fd = os.pipe()
+
+    def target():
+        os.write(write_fd, b'%d\n' % os.getpid())
+        signal.pause()
+
+    pid = os.fork()
+    if not pid:
+        try:
+            Master(2, target).run()
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    yield pid, read_fd
+
+    os.close(read_fd)
+    try:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    except (ProcessLookupError, ChildProcessError):
+        pass
+
+
+def test_master(master):
+    pid, read_fd = master
+    workers = read_pids(read_fd, 2)
+
+    # Упавший рабочий процесс перезапускается
+    os.kill(workers[0], signal.SIGKILL)
+    respawned, = read_pids(read_fd, 1)
+    assert respawned not in workers
+    workers = [workers[1], respawned]
+
+    # SIGHUP заменяет все рабочие процессы
+    os.kill(pid, signal.SIGHUP)
+    restarted = read_pids(read_fd, 2)
+    assert not set(restarted) & set(workers)
+
+    # SIGTERM останавливает рабочие процессы и мастер
+    os.kill(pid, signal.SIGTERM)
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert not any(is_alive(worker) for worker in workers + restarted)
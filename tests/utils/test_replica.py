@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+
+from store.utils import cache as cache_module
+from store.utils.cache import CLEAR, NOTIFY_MAX_IDS, CouriersCache, listen
+from store.utils.replica import LAG_CHECK_INTERVAL, RecentWrites, ReplicaRouter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+class Connection:
+    def __init__(self):
+        self.queries = []
+
+    async def execute(self, *args):
+        self.queries.append(args)
+
+
+class Replica:
+    def __init__(self, lag):
+        self.lag = lag
+
+    async def fetchval(self, query, timeout=None):
+        if isinstance(self.lag, Exception):
+            raise self.lag
+        return self.lag
+
+
+PRIMARY = 'primary'
+
+
+def make_router(clock, lag=0, staleness=5):
+    return ReplicaRouter(PRIMARY, Replica(lag), staleness=staleness, clock=clock)
+
+
+def test_recent_writes_expire(clock):
+    writes = RecentWrites(window=5, clock=clock)
+    writes.mark([1, 2])
+    clock.now = 3
+    writes.mark([2])
+    assert 1 in writes and 2 in writes
+
+    clock.now = 5
+    assert 1 not in writes
+    assert 2 in writes
+    assert len(writes) == 1
+
+    clock.now = 8
+    assert len(writes) == 0
+
+
+def test_recent_writes_mark_all(clock):
+    writes = RecentWrites(window=5, clock=clock)
+    writes.mark_all()
+    assert 1 in writes
+    clock.now = 5
+    assert 1 not in writes
+
+
+async def test_router_without_replica(clock):
+    router = ReplicaRouter(PRIMARY, clock=clock)
+    conn = Connection()
+    await router.notify(conn, couriers=[1])
+    assert conn.queries == []
+    assert router.choose() == PRIMARY
+
+
+CASES = (
+    # Реплика догнала основной сервер
+    (0, [], [], True),
+    # Недавно измененные курьеры и заказы читаются с основного сервера
+    (0, [1], [], False),
+    (0, [], [10], False),
+    # Отставание с учетом интервала проверки больше допустимого
+    (5 - LAG_CHECK_INTERVAL, [], [], False),
+    # Реплика недоступна
+    (OSError(), [], [], False),
+    (asyncio.TimeoutError(), [], [], False),
+)
+
+
+@pytest.mark.parametrize('lag,couriers,orders,replica', CASES)
+async def test_router_choose(clock, lag, couriers, orders, replica):
+    router = make_router(clock, lag)
+    assert router.choose() == PRIMARY
+
+    await router.check_lag()
+    await router.notify(Connection(), couriers=[1], orders=[10])
+    assert (router.choose(couriers, orders) == router.replica) is replica
+
+    # Через staleness секунд изменения есть и на реплике
+    clock.now = 5
+    assert (router.choose(couriers, orders) == router.replica) is (router.lagging is False)
+
+
+@pytest.mark.parametrize('couriers,orders,payload', (
+    ([], [], None),
+    ([1, 2], [], 'couriers:1,2'),
+    ([1], [10, 11], 'couriers:1;orders:10,11'),
+    ([], range(NOTIFY_MAX_IDS + 1), CLEAR),
+))
+async def test_router_notifications(clock, couriers, orders, payload):
+    router = make_router(clock)
+    conn = Connection()
+    await router.notify(conn, couriers=couriers, orders=orders)
+    assert [query[-1] for query in conn.queries] == ([payload] if payload else [])
+
+    # Уведомление получает другой процесс
+    other = make_router(clock)
+    await other.check_lag()
+    if payload:
+        other.handle_notification(None, 0, 'replica_writes', payload)
+    for courier_id in couriers:
+        assert other.choose(couriers=[courier_id]) == PRIMARY
+    for order_id in orders:
+        assert other.choose(orders=[order_id]) == PRIMARY
+    assert (other.choose(couriers=[3], orders=[12]) == PRIMARY) is (payload == CLEAR)
+
+
+class ListenConnection:
+    """
+    LISTEN соединение: уведомления всех каналов доставляются в порядке
+    отправки.
+    """
+    def __init__(self):
+        self.listeners = {}
+        self.connected = asyncio.Event()
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def add_termination_listener(self, callback):
+        self.connected.set()
+
+    def deliver(self, queries):
+        for _, channel, payload in queries:
+            self.listeners[channel](self, 0, channel, payload)
+
+    async def close(self):
+        pass
+
+
+async def test_router_marked_before_cache_invalidation(clock, monkeypatch):
+    # Процесс, изменивший курьера (PATCH /couriers/1)
+    conn = Connection()
+    await make_router(clock).notify(conn, couriers=[1])
+    await CouriersCache(max_size=10, ttl=10, clock=clock).notify(conn, [1])
+
+    # Другой процесс
+    router = make_router(clock)
+    await router.check_lag()
+    cache = CouriersCache(max_size=10, ttl=10, clock=clock)
+    reads = []
+
+    def handle_notification(*args):
+        # Прочитанный после инвалидации курьер должен быть актуальным
+        reads.append(router.choose(couriers=[1]))
+        CouriersCache.handle_notification(cache, *args)
+
+    listen_conn = ListenConnection()
+
+    async def connect(pg_url):
+        return listen_conn
+
+    monkeypatch.setattr(cache_module.asyncpg, 'connect', connect)
+    task = asyncio.ensure_future(listen('postgresql://', [
+        ('replica_writes', router.handle_notification, router.mark_all),
+        ('couriers_cache', handle_notification, cache.clear),
+    ]))
+    try:
+        await listen_conn.connected.wait()
+        await asyncio.sleep(0)
+        # Подключение могло пропустить уведомления
+        assert router.choose(couriers=[2]) == PRIMARY
+        clock.now = 5
+        assert router.choose(couriers=[1]) == router.replica
+
+        listen_conn.deliver(conn.queries)
+        assert reads == [PRIMARY]
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from store.api.domain import CouriersOrdersGreedyResolver, CouriersOrdersResolver
+from store.utils.solver import OrdersSolver
+
+ORDERS = {order_id: (order_id % 50 + 1) / 10 for order_id in range(2000)}
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        yield executor
+    finally:
+        executor.shutdown()
+
+
+async def test_solver_returns_exact_solution(executor):
+    orders = {0: 3.1, 1: 4.1, 2: 5.1, 3: 8.1, 4: 9.1}
+    result = await OrdersSolver(executor, timeout=10).resolve_orders(orders, 13.5)
+    assert result.ids == CouriersOrdersResolver(orders_=orders, max_weight=13.5).resolve()
+    assert result.strategy == 'exact'
+
+
+async def test_solver_falls_back_to_greedy_on_timeout(executor):
+    result = await OrdersSolver(executor, timeout=1e-6).resolve_orders(ORDERS, 50)
+    assert result.ids == CouriersOrdersGreedyResolver(orders_=ORDERS, max_weight=50).resolve()
+    assert result.strategy == 'greedy'
+    assert sum(ORDERS[order_id] for order_id in result.ids) <= 50
+
+
+@pytest.mark.parametrize('exact_threshold, expected_strategy', (
+    (None, 'exact'),
+    (len(ORDERS) * 5000, 'exact'),
+    (len(ORDERS) * 5000 - 1, 'greedy'),
+))
+async def test_solver_chooses_strategy_by_problem_size(executor, exact_threshold, expected_strategy):
+    solver = OrdersSolver(executor, timeout=10, exact_threshold=exact_threshold)
+    result = await solver.resolve_orders(ORDERS, 50)
+    assert result.strategy == expected_strategy
+    assert result.duration >= 0
@@ -0,0 +1,111 @@
+import enum
+
+import pytest
+from asyncpgsa.connection import compile_query
+from sqlalchemy import Column, Enum, Integer, MetaData, Table, bindparam
+
+from store.api.handlers.courier.couriers import CouriersView
+from store.api.handlers.query import STATEMENTS
+from store.db.schema import orders_table
+from store.utils.pg import equals_any
+from store.utils.statements import Statement, StatementsRegistry
+
+
+class Color(enum.Enum):
+    red = 'red'
+
+
+items_table = Table(
+    'items', MetaData(),
+    Column('item_id', Integer, primary_key=True),
+    Column('color', Enum(Color, name='color')),
+)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, sql, *args):
+        self.calls.append((sql, args))
+
+    async def fetch(self, sql, *args):
+        self.calls.append((sql, args))
+        # Идентификаторы, выданные последовательностью, не обязательно идут подряд
+        return [{'working_hours_id': 10}, {'working_hours_id': 12}]
+
+
+CASES = (
+    # Параметры нумеруются в порядке имен, как в asyncpgsa
+    (
+        orders_table.update().values(courier_id=bindparam('assigned_courier_id')).where(
+            equals_any(orders_table.c.order_id, key='orders_ids')
+        ),
+        {'orders_ids': [1, 2], 'assigned_courier_id': 3},
+        [3, [1, 2]],
+    ),
+    # Значения, переданные в выражение, используются по умолчанию
+    (
+        orders_table.update().values(courier_id=None).where(orders_table.c.order_id == bindparam('order_id')),
+        {'order_id': 1},
+        [None, 1],
+    ),
+    # Enum преобразуется в строку, как при компиляции asyncpgsa
+    (
+        items_table.update().values(color=bindparam('color')).where(items_table.c.item_id == bindparam('item_id')),
+        {'color': Color.red, 'item_id': 1},
+        ['red', 1],
+    ),
+)
+
+
+@pytest.mark.parametrize('query,values,expected_args', CASES)
+def test_statement_matches_compile_query(query, values, expected_args):
+    statement = Statement('test', query)
+
+    assert statement.sql == compile_query(query)[0]
+    assert statement.args(values) == expected_args
+
+
+def test_statement_rejects_unknown_params():
+    statement = Statement('test', orders_table.select().where(orders_table.c.order_id == bindparam('order_id')))
+    with pytest.raises(TypeError):
+        statement.args({'order_id': 1, 'courier_id': 1})
+
+
+def test_registry_rejects_duplicate_names():
+    registry = StatementsRegistry()
+    registry.register('order', orders_table.select())
+    with pytest.raises(ValueError):
+        registry.register('order', orders_table.select())
+
+
+async def test_registry_executes_same_sql():
+    registry = StatementsRegistry()
+    registry.register('unassign', orders_table.update().values(courier_id=None).where(
+        equals_any(orders_table.c.order_id, key='orders_ids')
+    ))
+    conn = FakeConnection()
+    await registry.execute(conn, 'unassign', orders_ids=[1])
+    await registry.execute(conn, 'unassign', orders_ids=list(range(1000)))
+
+    (first_sql, first_args), (second_sql, second_args) = conn.calls
+    assert first_sql == second_sql
+    assert first_args == (None, [1])
+    assert second_args == (None, list(range(1000)))
+
+
+def test_handlers_statements_have_denormalized_variants():
+    for name in ('courier', 'couriers', 'order', 'courier_orders'):
+        assert STATEMENTS[name].params == STATEMENTS[name + '_denormalized'].params
+
+
+async def test_courier_working_hours_linked_by_returned_ids():
+    conn = FakeConnection()
+    await CouriersView.add_working_hours(conn, 1, ['09:00-12:00', '14:00-18:00'])
+
+    (hours_sql, hours_args), (link_sql, link_args) = conn.calls
+    assert hours_sql == STATEMENTS['add_working_hours'].sql
+    assert hours_args == ([720, 1080], [540, 840])
+    assert link_sql == STATEMENTS['add_courier_working_hours'].sql
+    assert link_args == (1, [10, 12])
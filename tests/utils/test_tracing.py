@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from store.db.schema import couriers_table
+from store.utils.tracing import FINGERPRINT_LENGTH, SlowRequests, Span, fingerprint, span, trace, tracing
+
+
+def test_span_without_trace():
+    assert not tracing()
+    with span('pg.query') as child:
+        assert child is None
+
+
+async def test_trace_tree():
+    async def query(name):
+        with span('pg.query', query=name):
+            await asyncio.sleep(0)
+
+    with trace('CourierView', method='GET') as root:
+        assert tracing()
+        with span('solver', orders=3):
+            await asyncio.gather(query('first'), query('second'))
+    assert not tracing()
+
+    data = root.to_dict()
+    assert data['name'] == 'CourierView'
+    assert data['method'] == 'GET'
+    assert data['start_ms'] == 0
+    [solver] = data['children']
+    assert solver['orders'] == 3
+    assert [child['query'] for child in solver['children']] == ['first', 'second']
+    assert all(child['duration_ms'] is not None for child in solver['children'])
+
+
+def make_span(duration):
+    root = Span('CourierView')
+    root.duration = duration
+    return root
+
+
+CASES = (
+    # Быстрый запрос не сохраняется
+    (10, 1.0, [(0.5, False)], 0),
+    # Медленный запрос сохраняется
+    (10, 1.0, [(1.5, False)], 1),
+    # Запрос с заголовком сохраняется независимо от времени
+    (10, 1.0, [(0.5, True)], 1),
+    # Хранятся только последние size трасс
+    (2, 1.0, [(1.5, False)] * 3, 2),
+    # size=0 отключает буфер
+    (0, 1.0, [(1.5, True)], 0),
+)
+
+
+@pytest.mark.parametrize('size,threshold,requests,expected', CASES)
+def test_slow_requests(size, threshold, requests, expected):
+    slow = SlowRequests(size, threshold)
+    for duration, force in requests:
+        slow.add(make_span(duration), force=force)
+    assert len(slow.list()) == expected
+
+
+def test_slow_requests_latest_first():
+    slow = SlowRequests(10, 0)
+    for duration in (1, 2, 3):
+        slow.add(make_span(duration))
+    assert [item['duration_ms'] for item in slow.list()] == [3000, 2000, 1000]
+
+
+def test_fingerprint():
+    assert fingerprint('SELECT 1\n    FROM  couriers') == 'SELECT 1 FROM couriers'
+
+    sql = fingerprint(select([couriers_table]).where(couriers_table.c.courier_id == 1))
+    assert sql.startswith('SELECT couriers.courier_id')
+    # Значения параметров в трассу не попадают
+    assert sql.endswith('WHERE couriers.courier_id = %(courier_id_1)s')
+
+    assert len(fingerprint('SELECT ' + 'x, ' * 1000)) == FINGERPRINT_LENGTH + 3